@@ -0,0 +1,123 @@
+"""Сохраненный вход: подписанный токен с истекающим сроком действия на диске.
+
+После успешной проверки кода из SMS приложение записывает токен: данные входа (JSON)
+и их HMAC-SHA256 на локальном ключе. При запуске токен проверяется локально, без сети,
+и если он действителен, приложение открывается сразу на экране выбора ситуации.
+
+Выход: python main.py --logout или python -m auth clear
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "vasya")
+TOKEN_TTL = 30 * 24 * 3600  # Срок действия входа, с
+CLOCK_SKEW = 300  # Допустимое расхождение часов для времени выдачи, с
+KEY_BYTES = 32
+VERSION = 1
+
+
+def b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def write_private(path, data):
+    """Атомарно записывает файл, доступный только владельцу"""
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SessionCache:
+    """Токен входа и ключ подписи в каталоге данных приложения"""
+    def __init__(self, directory=DEFAULT_DIR, ttl=TOKEN_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.token_path = os.path.join(directory, "session.token")
+        self.key_path = os.path.join(directory, "session.key")
+
+    def key(self, create=False):
+        """Читает ключ подписи; при create=True создает его, если ключа нет"""
+        try:
+            with open(self.key_path, "rb") as f:
+                key = f.read()
+            if len(key) == KEY_BYTES:
+                return key
+        except FileNotFoundError:
+            pass
+        if not create:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        key = os.urandom(KEY_BYTES)
+        write_private(self.key_path, key)
+        return key
+
+    def sign(self, key, payload):
+        return hmac.new(key, payload, hashlib.sha256).digest()
+
+    def save(self, phone, now=None):
+        """Записывает токен после успешного входа"""
+        now = time.time() if now is None else now
+        claims = {"v": VERSION, "phone": phone, "iat": int(now), "exp": int(now + self.ttl)}
+        payload = json.dumps(claims, separators=(",", ":")).encode("utf-8")
+        token = f"{b64encode(payload)}.{b64encode(self.sign(self.key(create=True), payload))}"
+        write_private(self.token_path, token.encode("ascii"))
+        return claims
+
+    def load(self, now=None):
+        """Возвращает данные входа, если токен есть, подпись верна и срок не истек; иначе None"""
+        now = time.time() if now is None else now
+        try:
+            with open(self.token_path, "rb") as f:
+                token = f.read().decode("ascii").strip()
+            key = self.key()
+            if key is None:
+                return None
+            payload_text, _, signature_text = token.partition(".")
+            payload = b64decode(payload_text)
+            if not hmac.compare_digest(self.sign(key, payload), b64decode(signature_text)):
+                return None
+            claims = json.loads(payload)
+        except (OSError, ValueError):
+            return None
+        if claims.get("v") != VERSION or not claims["iat"] - CLOCK_SKEW <= now < claims["exp"]:
+            return None
+        return claims
+
+    def clear(self):
+        """Забывает вход; ключ тоже меняется, чтобы старые копии токена стали недействительны"""
+        for path in (self.token_path, self.key_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сохраненный вход в приложение")
+    parser.add_argument("command", choices=("status", "clear"))
+    args = parser.parse_args(argv)
+    cache = SessionCache()
+    if args.command == "clear":
+        cache.clear()
+        print("Сохраненный вход удален")
+        return
+    claims = cache.load()
+    if claims is None:
+        print("Сохраненного входа нет или он недействителен")
+    else:
+        print(f"Вход: {claims['phone']}, действует до {time.ctime(claims['exp'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Бенчмарк библиотеки отмазок: задержка запросов в зависимости от размера библиотеки.
+
+Для каждого размера собирается синтетический индекс (ситуация, тон и 1-2 дополнительных
+тега на запись, случайные веса) и замеряются открытие, подсчет по пересечению тегов,
+первый и повторный запрос и выбор записи.
+
+Запуск: python benchmarks/excuses_bench.py [--sizes 1000,10000,100000] [--output excuses.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from excuses import ExcuseLibrary, ExcusePicker, write_index  # noqa: E402
+
+SITUATIONS = ["late", "deadline", "saturday", "bar", "boss", "phone", "sick", "family"]
+TONES = ["polite", "funny", "bold", "sad"]
+EXTRA = [f"mood{i}" for i in range(10)]
+
+
+def synthetic(size, rng):
+    for number in range(size):
+        tags = (rng.choice(SITUATIONS), rng.choice(TONES)) + tuple(rng.sample(EXTRA, rng.randint(1, 2)))
+        yield f"Отмазка номер {number}: " + "очень " * rng.randint(0, 20) + "уважительная причина", tags, \
+            float(rng.randint(1, 5))
+
+
+def timed(func, repeats):
+    """Медиана одного вызова, мкс"""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+
+def bench_size(size, repeats, rng):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "excuses.idx")
+        started = time.perf_counter()
+        write_index(path, synthetic(size, rng))
+        build_s = time.perf_counter() - started
+        open_us = timed(lambda: ExcuseLibrary(path).close(), 20)
+        library = ExcuseLibrary(path)
+        pairs = [(situation, tone) for situation in SITUATIONS for tone in TONES]
+        count_us = timed(lambda: library.count(rng.choice(pairs)), repeats)
+        cold = []
+        for pair in pairs:
+            started = time.perf_counter()
+            library.query(pair)
+            cold.append((time.perf_counter() - started) * 1e6)
+        cached_us = timed(lambda: library.query(rng.choice(pairs)), repeats)
+        picker = ExcusePicker(library)
+        pick_tag_us = timed(lambda: picker.pick((rng.choice(SITUATIONS),)), repeats)
+        pick_pair_us = timed(lambda: picker.pick(rng.choice(pairs)), repeats)
+        result = {
+            "size": library.size,
+            "index_bytes": os.path.getsize(path),
+            "build_s": build_s,
+            "open_us": open_us,
+            "count_us": count_us,
+            "query_cold_us": statistics.median(cold),
+            "query_cached_us": cached_us,
+            "pick_tag_us": pick_tag_us,
+            "pick_pair_us": pick_pair_us,
+        }
+        library.close()
+        return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк библиотеки отмазок")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="размеры библиотеки через запятую")
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="записать результат в JSON")
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+    results = [bench_size(int(size), args.repeats, rng) for size in args.sizes.split(",")]
+    columns = list(results[0])
+    print("".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("".join(f"{result[column]:>16.2f}" if isinstance(result[column], float) else f"{result[column]:>16}"
+                      for column in columns))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
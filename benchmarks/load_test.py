@@ -0,0 +1,127 @@
+"""Нагрузочный тест серверного режима: сессии в секунду и задержка переходов.
+
+Каждый виртуальный клиент держит keep-alive соединение, открывает сессию, делает --steps
+нажатий случайных кнопок перехода и закрывает сессию.
+
+Запуск: python benchmarks/load_test.py [--url http://127.0.0.1:8770] [--sessions 5000]
+                                       [--concurrency 200] [--steps 6] [--spawn --workers 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from sms import ConnectionPool  # noqa: E402
+
+
+def percentile(samples, share):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+async def client(pool, counter, steps, latencies, errors):
+    """Проходит сессии одна за другой, пока не исчерпан общий счетчик"""
+    while counter[0] > 0:
+        counter[0] -= 1
+        try:
+            status, body = await pool.request("POST", "/sessions", {})
+            state = json.loads(body)
+            session = state["session"]
+            for _ in range(steps):
+                moves = [i for i, button in enumerate(state["buttons"]) if button["action"] in ("go", "map")]
+                started = time.perf_counter()
+                if moves:
+                    status, body = await pool.request("POST", f"/sessions/{session}/press",
+                                                      {"index": random.choice(moves)})
+                elif state["links"]:
+                    # Экраны со своей логикой (вход) переходят по ссылкам, а не по кнопкам
+                    status, body = await pool.request("POST", f"/sessions/{session}/go",
+                                                      {"target": random.choice(state["links"])})
+                else:
+                    break
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors.append(status)
+                    break
+                state = json.loads(body)
+            await pool.request("DELETE", f"/sessions/{session}", {})
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, KeyError) as e:
+            errors.append(repr(e))
+
+
+async def run(host, port, sessions, concurrency, steps):
+    counter = [sessions]
+    latencies = []
+    errors = []
+    pools = [ConnectionPool(host, port, size=1, timeout=30) for _ in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client(pool, counter, steps, latencies, errors) for pool in pools))
+    elapsed = time.perf_counter() - started
+    for pool in pools:
+        await pool.close()
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "sessions_per_s": (sessions - len(errors)) / elapsed,
+        "transitions": len(latencies),
+        "transition_p50_ms": percentile(latencies, 0.50) * 1000,
+        "transition_p99_ms": percentile(latencies, 0.99) * 1000,
+        "errors": len(errors),
+    }
+
+
+def spawn_server(port, workers):
+    """Запускает сервер в дочернем процессе и ждет, пока порт начнет принимать соединения"""
+    proc = subprocess.Popen([sys.executable, "-m", "server", "--port", str(port), "--workers", str(workers)],
+                            cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc
+        except OSError:
+            time.sleep(0.05)
+    proc.kill()
+    sys.exit("Сервер не запустился")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера сценария")
+    parser.add_argument("--url", default="http://127.0.0.1:8770")
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременных клиентов")
+    parser.add_argument("--steps", type=int, default=6, help="переходов в каждой сессии")
+    parser.add_argument("--spawn", action="store_true", help="запустить сервер самостоятельно")
+    parser.add_argument("--workers", type=int, default=1, help="процессов сервера при --spawn")
+    parser.add_argument("--output", help="записать результат в JSON")
+    args = parser.parse_args(argv)
+    parts = urlsplit(args.url)
+    host, port = parts.hostname, parts.port or 80
+    proc = spawn_server(port, args.workers) if args.spawn else None
+    try:
+        result = asyncio.run(run(host, port, args.sessions, args.concurrency, args.steps))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    result["workers"] = args.workers if args.spawn else None
+    for key, value in result.items():
+        print(f"{key:<20}{value:.2f}" if isinstance(value, float) else f"{key:<20}{value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""Бенчмарки запуска, переключения экранов и наведения на кнопки.
+
+Запуск: python benchmarks/run.py [--output results.json] [--baseline benchmarks/baseline.json]
+                                 [--threshold 0.2] [--save-baseline]
+
+Без $DISPLAY поднимается виртуальный X-сервер Xvfb. Все метрики - "меньше значит лучше";
+при ухудшении относительно базовой линии больше порога скрипт завершается с кодом 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+XVFB_DISPLAY = ":99"
+
+
+def start_display():
+    """Поднимает Xvfb, если нет настоящего дисплея; возвращает процесс или None"""
+    if os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        sys.exit("Нет $DISPLAY и не найден Xvfb: установите xvfb или запустите под X-сервером")
+    proc = subprocess.Popen([xvfb, XVFB_DISPLAY, "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = XVFB_DISPLAY
+    time.sleep(0.5)  # Даем серверу подняться
+    return proc
+
+
+def summarize(samples):
+    """Медиана, минимум и максимум выборки (в тех же единицах)"""
+    return {"median": statistics.median(samples), "min": min(samples), "max": max(samples)}
+
+
+def child_startup():
+    """Замер холодного старта в отдельном процессе: до отрисовки фона Registration"""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT_DIR)
+    import main
+    imported = time.perf_counter()
+    app = main.App()
+    created = time.perf_counter()
+    start = app.start_screen
+    deadline = created + 10
+    while time.perf_counter() < deadline:
+        app.update()
+        label = app.backgrounds.get(start, (None,))[0]
+        if label is None or label.cget("image"):
+            break
+    painted = time.perf_counter()
+    app.destroy()
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "init_ms": (created - imported) * 1000,
+        "first_paint_ms": (painted - started) * 1000,
+    }))
+
+
+def bench_startup(runs):
+    """Несколько холодных стартов подряд"""
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child-startup"],
+                             capture_output=True, text=True, check=True, cwd=ROOT_DIR)
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: summarize([r[key] for r in results]) for key in results[0]}
+
+
+def bench_in_process(repeats, storm):
+    """Переключение экранов, шторм наведений и пиковая память в одном процессе"""
+    sys.path.insert(0, ROOT_DIR)
+    import main
+    app = main.App()
+    app.update()
+    names = list(app.frame_builders)
+    first_visit = {}
+    for name in names:
+        started = time.perf_counter()
+        app.show_frame(name)
+        app.update_idletasks()
+        first_visit[name] = (time.perf_counter() - started) * 1000
+    warm = {name: [] for name in names}
+    for _ in range(repeats):
+        for name in names:
+            started = time.perf_counter()
+            app.show_frame(name)
+            app.update_idletasks()
+            warm[name].append((time.perf_counter() - started) * 1000)
+    # Шторм <Enter>/<Leave> по всем кнопкам экрана выбора ситуации
+    app.show_frame("choose_a_situation")
+    app.update()
+    buttons = [w for w in app.frames["choose_a_situation"].winfo_children() if isinstance(w, main.RoundedButton)]
+    started = time.perf_counter()
+    for _ in range(storm):
+        for button in buttons:
+            button.event_generate("<Enter>", when="now")
+            button.event_generate("<Leave>", when="now")
+        app.update_idletasks()
+    elapsed = time.perf_counter() - started
+    events = storm * len(buttons) * 2
+    # Смена темы: один проход по кнопкам всех построенных экранов
+    retheme = []
+    for name in app.theme.names() * max(repeats, 1):
+        started = time.perf_counter()
+        restyled = app.apply_theme(name)
+        app.update_idletasks()
+        retheme.append((time.perf_counter() - started) * 1000)
+    # Смена языка: перевод привязанных текстов построенных экранов (первый проход открывает каталог)
+    relocale = []
+    for locale in ("en", "ru") * max(repeats, 1):
+        started = time.perf_counter()
+        app.apply_locale(locale)
+        app.update_idletasks()
+        relocale.append((time.perf_counter() - started) * 1000)
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    app.destroy()
+    return {
+        "show_frame_first_ms": first_visit,
+        "show_frame_warm_ms": {name: statistics.median(samples) for name, samples in warm.items()},
+        "hover_us_per_event": elapsed / events * 1e6 if events else 0.0,
+        "hover_state_switch_us": main.RoundedButton.hover_latency() * 1e6,
+        "retheme_ms": statistics.median(retheme),
+        "retheme_buttons": restyled,
+        "relocale_ms": statistics.median(relocale),
+        "peak_rss_mb": peak_kb / 1024,
+    }
+
+
+def flatten(data, prefix=""):
+    """Превращает вложенные метрики в пары путь -> число"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """Ищет метрики, ухудшившиеся больше чем на threshold (доля)"""
+    current = flatten(results["metrics"])
+    reference = flatten(baseline["metrics"])
+    regressions = []
+    for path, old in sorted(reference.items()):
+        if path.endswith((".min", ".max")) or path not in current or old <= 0:
+            continue
+        change = (current[path] - old) / old
+        if change > threshold:
+            regressions.append((path, old, current[path], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки приложения")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "results.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимое ухудшение, доля (0.2 = 20%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результат как базовую линию")
+    parser.add_argument("--startup-runs", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20, help="повторов обхода всех экранов")
+    parser.add_argument("--storm", type=int, default=200, help="циклов наведения на каждую кнопку")
+    parser.add_argument("--child-startup", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    # Сравнимые замеры: всегда с экрана регистрации, независимо от сохраненного входа
+    os.environ.setdefault("VASYA_AUTH", "0")
+    display = start_display()
+    try:
+        if args.child_startup:
+            child_startup()
+            return 0
+        metrics = {"startup": bench_startup(args.startup_runs)}
+        metrics.update(bench_in_process(args.repeats, args.storm))
+    finally:
+        if display is not None:
+            display.terminate()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "metrics": metrics,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=1)
+    print(f"Результаты сохранены в {args.output}")
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"Базовая линия обновлена: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("Базовой линии нет, сравнение пропущено (используйте --save-baseline)")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for path, old, new, change in regressions:
+        print(f"РЕГРЕССИЯ {path}: {old:.3f} -> {new:.3f} (+{change:.0%})")
+    if regressions:
+        return 1
+    print(f"Регрессий нет (порог {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Общие части двоичных индексов, читаемых через mmap (библиотека отмазок, каталоги переводов).
+
+Массивы хранятся little-endian и выровнены на 4 байта, поэтому на little-endian машинах
+читаются из mmap без копирования. Ключ исходника (mtime_ns, размер) записывается в заголовок,
+чтобы индекс пересобирался при изменении исходного файла.
+"""
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+
+def pad4(f):
+    """Выравнивает позицию файла на 4 байта для прямого чтения массивов u32/f32"""
+    f.write(b"\0" * (-f.tell() % 4))
+
+
+def write_array(f, values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    f.write(values.tobytes())
+
+
+def read_array(buffer, typecode, offset, count):
+    """Массив из mmap без копирования (на little-endian машинах)"""
+    view = memoryview(buffer)[offset:offset + 4 * count]
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    values = array(typecode, view)
+    values.byteswap()
+    return values
+
+
+def source_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def close_mmap(mm):
+    try:
+        mm.close()
+    except BufferError:
+        pass  # Снаружи еще есть ссылки на массивы; mmap закроется сборщиком мусора
+
+
+def open_index(path, source, build, load):
+    """Открывает индекс load(path), пересобирая его build(path), если исходник изменился.
+
+    Если папку кэша нельзя записать, индекс собирается во временный файл, который удаляется
+    сразу после открытия: данные остаются доступны через mmap до закрытия индекса.
+    """
+    key = source_key(source)
+    try:
+        index = load(path)
+        if tuple(index.source_key) == key:
+            return index
+        index.close()
+    except (OSError, ValueError, struct.error):
+        pass
+    try:
+        build(path)
+    except OSError as e:
+        print(f"Не удалось сохранить индекс {path}, собираем временный: {str(e)}")
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1])
+        os.close(fd)
+        try:
+            build(tmp_path)
+            return load(tmp_path)
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass  # Windows не удаляет открытый файл; он останется во временной папке
+    return load(path)
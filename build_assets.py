@@ -0,0 +1,170 @@
+"""Сборка ресурсов: дедупликация и масштабирование картинок из images/ под размер окна.
+
+Запуск: python -m build_assets [--src images] [--out assets] [--size 400x830] [--variants 600x1245,800x1660]
+                               [--bundle images.bundle]
+
+Варианты под экраны с высокой плотностью пикселей попадают в манифест (files[...]["variants"])
+и в пакет под именами вида "имя@800x1660".
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+
+from bundle import write_bundle
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow нужен только для масштабирования
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+MANIFEST_NAME = "manifest.json"
+# Имена собранных файлов: <sha256[:16]>.png и варианты <sha256[:16]>@WxH.png (и их .tmp)
+OUTPUT_NAME = re.compile(r"[0-9a-f]{16}(@\d+x\d+)?\.png(\.tmp)?")
+# Картинки с близкими к окну пропорциями заполняют его целиком (с обрезкой краев)
+COVER_ASPECT_TOLERANCE = 0.1
+
+
+def content_hash(path):
+    """Возвращает sha256 содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def target_geometry(width, height, target_width, target_height):
+    """Вычисляет размер после масштабирования и область обрезки (или None)"""
+    aspect = width / height
+    target_aspect = target_width / target_height
+    if abs(aspect - target_aspect) / target_aspect <= COVER_ASPECT_TOLERANCE:
+        # Заполняем окно целиком, лишнее обрезаем по центру
+        scale = max(target_width / width, target_height / height)
+        scaled = (round(width * scale), round(height * scale))
+        left = (scaled[0] - target_width) // 2
+        top = (scaled[1] - target_height) // 2
+        return scaled, (left, top, left + target_width, top + target_height)
+    # Чужие пропорции (иконки и т.п.) вписываем в окно без искажений
+    scale = min(target_width / width, target_height / height, 1.0)
+    return (max(1, round(width * scale)), max(1, round(height * scale))), None
+
+
+def write_asset(src, dst, size):
+    """Масштабирует картинку и сохраняет оптимизированный PNG; возвращает размеры"""
+    if Image is None:
+        with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+            f_out.write(f_in.read())
+        return None
+    resample = getattr(Image, "Resampling", Image).LANCZOS
+    with Image.open(src) as img:
+        scaled, crop = target_geometry(img.width, img.height, *size)
+        out = img.resize(scaled, resample)
+        if crop:
+            out = out.crop(crop)
+        out.save(dst, format="PNG", optimize=True)
+        return out.width, out.height
+
+
+def check_out_dir(src_dir, out_dir):
+    """Проверяет, что out_dir - отдельная папка сборки: сборка удаляет в ней свои старые файлы"""
+    if os.path.realpath(src_dir) == os.path.realpath(out_dir):
+        raise ValueError(f"Папка сборки {out_dir} совпадает с папкой исходников")
+    if not os.path.isdir(out_dir):
+        return
+    if os.listdir(out_dir) and not os.path.isfile(os.path.join(out_dir, MANIFEST_NAME)):
+        raise ValueError(f"Папка {out_dir} не пуста и не похожа на папку сборки (нет {MANIFEST_NAME})")
+
+
+def build(src_dir, out_dir, size, variants=()):
+    """Собирает пакет ресурсов и манифест псевдонимов"""
+    check_out_dir(src_dir, out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    if Image is None:
+        print("Pillow не установлен: файлы будут скопированы без масштабирования")
+        variants = ()  # Без масштабирования варианты совпадали бы с основным файлом
+    files = {}
+    aliases = {}
+    for filename in sorted(os.listdir(src_dir)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        name = os.path.splitext(filename)[0]
+        src = os.path.join(src_dir, filename)
+        digest = content_hash(src)
+        aliases[name] = digest
+        if digest in files:
+            print(f"Дубликат: {filename} -> {files[digest]['file']}")
+            continue
+        out_name = f"{digest[:16]}.png"
+        tmp_path = os.path.join(out_dir, out_name + ".tmp")
+        dims = write_asset(src, tmp_path, size)
+        os.replace(tmp_path, os.path.join(out_dir, out_name))
+        files[digest] = {"file": out_name, "size": dims, "bytes": os.path.getsize(os.path.join(out_dir, out_name))}
+        if variants:
+            files[digest]["variants"] = {}
+        for variant in variants:
+            variant_name = f"{digest[:16]}@{variant[0]}x{variant[1]}.png"
+            tmp_path = os.path.join(out_dir, variant_name + ".tmp")
+            write_asset(src, tmp_path, variant)
+            os.replace(tmp_path, os.path.join(out_dir, variant_name))
+            files[digest]["variants"][f"{variant[0]}x{variant[1]}"] = variant_name
+            files[digest]["bytes"] += os.path.getsize(os.path.join(out_dir, variant_name))
+        print(f"Собрано: {filename} -> {out_name}")
+    manifest = {"version": 1, "geometry": list(size), "files": files, "aliases": aliases}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    # Удаляем файлы, оставшиеся от предыдущих сборок; чужие файлы и папки не трогаем
+    keep = {entry["file"] for entry in files.values()}
+    keep.update(name for entry in files.values() for name in entry.get("variants", {}).values())
+    for entry in os.scandir(out_dir):
+        if entry.name not in keep and OUTPUT_NAME.fullmatch(entry.name) and entry.is_file(follow_symlinks=False):
+            os.remove(entry.path)
+    total_in = sum(os.path.getsize(os.path.join(src_dir, f)) for f in os.listdir(src_dir)
+                   if f.lower().endswith(IMAGE_EXTENSIONS))
+    total_out = sum(entry["bytes"] for entry in files.values())
+    print(f"Итого: {len(aliases)} изображений, {len(files)} уникальных, {total_in} -> {total_out} байт")
+    return manifest
+
+
+def parse_size(value):
+    """Разбирает размер вида 400x830"""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_sizes(value):
+    """Разбирает список размеров через запятую"""
+    return [parse_size(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сборка пакета изображений для приложения")
+    parser.add_argument("--src", default=os.path.join(BASE_DIR, "images"), help="папка с исходными картинками")
+    parser.add_argument("--out", default=os.path.join(BASE_DIR, "assets"), help="папка для собранного пакета")
+    parser.add_argument("--size", type=parse_size, default=(400, 830), help="размер окна, например 400x830")
+    parser.add_argument("--variants", type=parse_sizes, default=[(600, 1245), (800, 1660)],
+                        help="дополнительные размеры для экранов высокой плотности через запятую ('' - без них)")
+    parser.add_argument("--bundle", default=os.path.join(BASE_DIR, "images.bundle"),
+                        help="файл единого пакета изображений")
+    parser.add_argument("--no-bundle", action="store_true", help="не собирать единый пакет")
+    args = parser.parse_args(argv)
+    try:
+        manifest = build(args.src, args.out, args.size, args.variants)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.no_bundle:
+        sources = []
+        for name, digest in manifest["aliases"].items():
+            entry = manifest["files"][digest]
+            sources.append((name, os.path.join(args.out, entry["file"])))
+            for size, filename in entry.get("variants", {}).items():
+                sources.append((f"{name}@{size}", os.path.join(args.out, filename)))
+        count, unique = write_bundle(args.bundle, sources)
+        print(f"Пакет {args.bundle}: {count} имен, {unique} файлов, {os.path.getsize(args.bundle)} байт")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Единый бинарный пакет изображений с доступом через mmap.
+
+Формат файла (все числа little-endian):
+    MAGIC (8 байт), число записей (u32),
+    записи индекса: длина имени (u16), имя в UTF-8, смещение (u64), длина (u64), формат (4 байта),
+    затем данные файлов. Псевдонимы ссылаются на одни и те же данные.
+"""
+import mmap
+import os
+import struct
+
+MAGIC = b"VASYABN1"
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<QQ4s")
+NAME_LEN = struct.Struct("<H")
+
+
+def file_format(path):
+    """Определяет формат по расширению файла (ровно 4 байта)"""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return {"jpeg": "jpg"}.get(ext, ext).encode("ascii")[:4].ljust(4, b"\0")
+
+
+def write_bundle(path, sources):
+    """Записывает пакет; sources - пары (имя, путь к файлу), одинаковые пути пишутся один раз"""
+    sources = list(sources)
+    names = [(name.encode("utf-8"), src) for name, src in sources]
+    index_size = HEADER.size + sum(NAME_LEN.size + len(name) + ENTRY.size for name, _ in names)
+    offsets = {}
+    blobs = []
+    offset = index_size
+    for _, src in names:
+        if src in offsets:
+            continue
+        with open(src, "rb") as f:
+            data = f.read()
+        offsets[src] = (offset, len(data))
+        blobs.append(data)
+        offset += len(data)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(names)))
+        for name, src in names:
+            data_offset, length = offsets[src]
+            f.write(NAME_LEN.pack(len(name)))
+            f.write(name)
+            f.write(ENTRY.pack(data_offset, length, file_format(src)))
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, path)
+    return len(names), len(blobs)
+
+
+class AssetBundle:
+    """Пакет изображений, открытый через mmap; данные подгружаются ОС только при обращении"""
+    def __init__(self, path):
+        self.path = path
+        self.index = {}  # Имя -> (смещение, длина, формат); у псевдонимов записи совпадают
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        try:
+            self.read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def read_index(self):
+        """Разбирает заголовок и индекс пакета"""
+        magic, count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} не является пакетом изображений")
+        pos = HEADER.size
+        for _ in range(count):
+            (name_len,) = NAME_LEN.unpack_from(self.mm, pos)
+            pos += NAME_LEN.size
+            name = bytes(self.mm[pos:pos + name_len]).decode("utf-8")
+            pos += name_len
+            offset, length, fmt = ENTRY.unpack_from(self.mm, pos)
+            pos += ENTRY.size
+            if offset + length > len(self.mm):
+                raise ValueError(f"Запись {name} выходит за пределы пакета {self.path}")
+            self.index[name] = (offset, length, fmt.rstrip(b"\0").decode("ascii"))
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def names(self):
+        return list(self.index)
+
+    def entry(self, name):
+        """Возвращает запись индекса (одинаковую у всех псевдонимов)"""
+        return self.index[name]
+
+    def data(self, entry):
+        """Срез данных без копирования"""
+        offset, length, _ = entry
+        return self.view[offset:offset + length]
+
+    def close(self):
+        """Закрывает отображение файла"""
+        self.view.release()
+        self.mm.close()
@@ -0,0 +1 @@
+"""Корень репозитория в sys.path для тестов (модули лежат в корне, без пакета)"""
@@ -0,0 +1,146 @@
+"""Резидентный режим: один прогретый экземпляр App принимает команды через Unix-сокет.
+
+Протокол: клиент отправляет одну строку JSON ({"cmd": "show", "frame": "Phone_loss"},
+{"cmd": "hide"}, {"cmd": "ping"}, {"cmd": "quit"}) и получает одну строку JSON в ответ.
+
+Модуль не импортирует tkinter, чтобы запускалка (launch.py) стартовала за миллисекунды.
+"""
+import json
+import os
+import socket
+import stat
+import threading
+
+REQUEST_LIMIT = 64 * 1024
+REPLY_TIMEOUT = 5.0  # Сколько ждать, пока главный поток Tk обработает команду, с
+
+
+class DaemonError(Exception):
+    """Резидентный режим недоступен (другой экземпляр уже запущен, нет Unix-сокетов и т.п.)"""
+
+
+def socket_path():
+    """Путь к сокету в личном каталоге пользователя"""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime or not os.path.isdir(runtime):
+        runtime = os.path.join("/tmp", f"vasya-{os.getuid()}")
+        try:
+            os.mkdir(runtime, 0o700)
+        except FileExistsError:
+            pass
+        check_private_dir(runtime)
+    return os.path.join(runtime, "vasya.sock")
+
+
+def check_private_dir(path):
+    """Каталог в общем /tmp мог заранее создать другой пользователь: принимаем его, только если
+    это наш каталог (не ссылка) с правами 0700"""
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise DaemonError(f"{path} не является личным каталогом пользователя (владелец и права 0700)")
+
+
+def send_command(command, path=None, timeout=REPLY_TIMEOUT):
+    """Отправляет команду резидентному экземпляру; None, если он не запущен"""
+    path = path or socket_path()
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+        client.sendall(json.dumps(command).encode("utf-8") + b"\n")
+        reply = client.makefile("rb").readline(REQUEST_LIMIT)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None  # Нет сокета или он остался от упавшего процесса
+    finally:
+        client.close()
+    if not reply:
+        raise DaemonError("Резидентный экземпляр закрыл соединение без ответа")
+    return json.loads(reply)
+
+
+def remove_stale(path):
+    """Удаляет сокет, оставшийся от завершившегося процесса; ошибка, если экземпляр жив"""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise DaemonError(f"{path} существует и не является сокетом")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.remove(path)
+        return
+    finally:
+        probe.close()
+    raise DaemonError("Резидентный экземпляр уже запущен")
+
+
+class DaemonServer:
+    """Принимает команды в фоновом потоке и выполняет их в главном потоке Tk через post"""
+    def __init__(self, post, handler, path=None):
+        if not hasattr(socket, "AF_UNIX"):
+            raise DaemonError("Unix-сокеты не поддерживаются на этой системе")
+        self.post = post
+        self.handler = handler  # handler(команда) -> ответ (dict), вызывается в главном потоке
+        self.path = path or socket_path()
+        remove_stale(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)  # Сокет доступен только владельцу с момента создания
+        try:
+            self.listener.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        self.listener.listen(16)
+        self.closed = False
+        self.thread = threading.Thread(target=self.accept_loop, name="daemon-server", daemon=True)
+        self.thread.start()
+
+    def accept_loop(self):
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except OSError:
+                return  # Сокет закрыт в close()
+            with connection:
+                connection.settimeout(REPLY_TIMEOUT)
+                try:
+                    self.serve(connection)
+                except (OSError, ValueError) as e:
+                    print(f"Ошибка команды резидентного режима: {str(e)}")
+
+    def serve(self, connection):
+        line = connection.makefile("rb").readline(REQUEST_LIMIT)
+        if not line:
+            return
+        command = json.loads(line)
+        done = threading.Event()
+        result = {}
+
+        def run():
+            try:
+                result.update(self.handler(command) or {})
+            except Exception as e:
+                result.update(ok=False, error=str(e))
+            done.set()
+
+        self.post(run)
+        if not done.wait(REPLY_TIMEOUT):
+            result = {"ok": False, "error": "Главный поток не ответил"}
+        connection.sendall(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def close(self):
+        """Перестает принимать команды и удаляет сокет"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.listener.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.listener.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
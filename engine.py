@@ -0,0 +1,175 @@
+"""Движок сценария без интерфейса: граф экранов как конечный автомат и таблица сессий.
+
+Tk-приложение и серверный режим (server.py) - два фронтенда одного движка: оба переходят
+между экранами только через Engine.go / Engine.press, которые проверяют ребра графа.
+"""
+import secrets
+import time
+from array import array
+
+from scenarios import ButtonSpec
+
+FREE = 0xFFFF  # Метка свободной ячейки в таблице сессий
+SLOT_BITS = 24  # Номер ячейки в id сессии
+PREFIX_BITS = 8  # Номер процесса-обработчика в id сессии
+# id сессии - 24 hex-символа: процесс (2), ячейка (6) и случайный 64-битный токен (16)
+ID_LENGTH = 24
+
+
+class EngineError(Exception):
+    """Недопустимый переход; текст можно показать клиенту"""
+
+
+class UnknownSession(EngineError):
+    """Сессия не существует, закрыта или истекла"""
+
+
+class ForeignSession(UnknownSession):
+    """Сессия создана другим процессом-обработчиком"""
+
+
+class SessionTable:
+    """Сессии в параллельных массивах: экран (2 байта), шаги (4), токен (8), время (8).
+
+    Токен выдается случайным при создании сессии и обнуляется при закрытии, поэтому id
+    нельзя угадать перебором номеров, а старый id ячейки перестает действовать.
+    """
+    def __init__(self, capacity=1024, prefix=0):
+        if not 0 <= prefix < 1 << PREFIX_BITS:
+            raise ValueError(f"Номер процесса {prefix} вне диапазона")
+        self.prefix = prefix
+        self.screens = array("H", [FREE]) * capacity
+        self.steps = array("I", [0]) * capacity
+        self.tokens = array("Q", [0]) * capacity
+        self.touched = array("d", [0.0]) * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.live = 0
+
+    def grow(self):
+        """Удваивает емкость; существующие id остаются действительными"""
+        capacity = len(self.screens)
+        if capacity >= 1 << SLOT_BITS:
+            raise EngineError("Слишком много сессий")
+        self.screens.extend(array("H", [FREE]) * capacity)
+        self.steps.extend(array("I", [0]) * capacity)
+        self.tokens.extend(array("Q", [0]) * capacity)
+        self.touched.extend(array("d", [0.0]) * capacity)
+        self.free.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def create(self, screen, now):
+        if not self.free:
+            self.grow()
+        slot = self.free.pop()
+        self.screens[slot] = screen
+        self.steps[slot] = 0
+        self.touched[slot] = now
+        token = 0
+        while not token:  # Нулевой токен означает закрытую сессию
+            token = secrets.randbits(64)
+        self.tokens[slot] = token
+        self.live += 1
+        return f"{self.prefix:02x}{slot:06x}{token:016x}"
+
+    def slot(self, session):
+        """Номер ячейки живой сессии; для чужого или устаревшего id - UnknownSession"""
+        try:
+            if not isinstance(session, str) or len(session) != ID_LENGTH:
+                raise ValueError
+            prefix, slot, token = int(session[:2], 16), int(session[2:8], 16), int(session[8:], 16)
+        except ValueError:
+            raise UnknownSession(f"Некорректный id сессии {session}") from None
+        if prefix != self.prefix:
+            raise ForeignSession(f"Сессия {session} принадлежит другому процессу")
+        if slot >= len(self.screens) or self.screens[slot] == FREE or self.tokens[slot] != token:
+            raise UnknownSession(f"Сессия {session} не найдена")
+        return slot
+
+    def release(self, slot):
+        self.screens[slot] = FREE
+        self.tokens[slot] = 0  # Старый id ячейки больше не действует
+        self.free.append(slot)
+        self.live -= 1
+
+
+class Engine:
+    """Конечный автомат экранов сценария"""
+    def __init__(self, scenario, clock=None, prefix=0):
+        self.clock = clock or time.monotonic
+        self.start_screen = scenario.start
+        self.names = tuple(scenario.screens)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # Для каждого экрана: допустимые переходы и кнопки (по номеру кнопки)
+        self.links = tuple(frozenset(self.index[link] for link in screen.links)
+                           for screen in scenario.screens.values())
+        self.buttons = tuple(tuple(widget for widget in screen.widgets if isinstance(widget, ButtonSpec))
+                             for screen in scenario.screens.values())
+        # Готовые описания экранов для клиентов, чтобы не собирать их на каждый запрос
+        self.views = tuple(
+            {
+                "screen": screen.name,
+                "builder": screen.builder,
+                "links": list(screen.links),
+                "buttons": [{"text": button.text, "action": button.action,
+                             "target": list(button.target) if isinstance(button.target, tuple) else button.target}
+                            for button in buttons],
+            }
+            for screen, buttons in zip(scenario.screens.values(), self.buttons)
+        )
+        self.sessions = SessionTable(prefix=prefix)
+        self.transitions = 0
+
+    def start(self, screen=None):
+        """Открывает сессию на стартовом (или указанном) экране; возвращает id сессии"""
+        screen = screen or self.start_screen
+        if screen not in self.index:
+            raise EngineError(f"Неизвестный экран {screen}")
+        return self.sessions.create(self.index[screen], self.clock())
+
+    def screen(self, session):
+        return self.names[self.sessions.screens[self.sessions.slot(session)]]
+
+    def go(self, session, target):
+        """Переход по ребру графа; возвращает имя нового экрана"""
+        sessions = self.sessions
+        slot = sessions.slot(session)
+        index = self.index.get(target)
+        if index is None or index not in self.links[sessions.screens[slot]]:
+            raise EngineError(f"Переход {self.names[sessions.screens[slot]]} -> {target} недоступен")
+        sessions.screens[slot] = index
+        sessions.steps[slot] += 1
+        sessions.touched[slot] = self.clock()
+        self.transitions += 1
+        return target
+
+    def press(self, session, number):
+        """Нажатие кнопки по номеру; возвращает (действие, цель) - переход уже выполнен"""
+        buttons = self.buttons[self.sessions.screens[self.sessions.slot(session)]]
+        if not 0 <= number < len(buttons):
+            raise EngineError(f"Нет кнопки с номером {number}")
+        button = buttons[number]
+        if button.action == "go":
+            self.go(session, button.target)
+        elif button.action == "map":
+            self.go(session, "map")
+        return button.action, button.target
+
+    def view(self, session):
+        """Состояние сессии для клиента"""
+        slot = self.sessions.slot(session)
+        view = dict(self.views[self.sessions.screens[slot]])
+        view["session"] = session
+        view["steps"] = self.sessions.steps[slot]
+        return view
+
+    def end(self, session):
+        self.sessions.release(self.sessions.slot(session))
+
+    def expire(self, ttl):
+        """Закрывает сессии, простаивающие дольше ttl секунд; возвращает их число"""
+        deadline = self.clock() - ttl
+        sessions = self.sessions
+        expired = [slot for slot, screen in enumerate(sessions.screens)
+                   if screen != FREE and sessions.touched[slot] < deadline]
+        for slot in expired:
+            sessions.release(slot)
+        return len(expired)
@@ -0,0 +1,353 @@
+"""Библиотека отмазок: скомпилированный индекс с поиском по тегам и взвешенным выбором.
+
+Исходник excuses.json описывает фрагменты: причины по ситуациям и вступления/концовки по тону.
+Библиотека - все их сочетания плюс записи, написанные целиком. Каждая запись помечена
+ситуацией, тоном и длиной (short/medium/long).
+
+Скомпилированный индекс открывается через mmap и читается лениво. Формат (little-endian):
+    заголовок: MAGIC, версия, число записей, число тегов, ключ исходника (mtime_ns, размер);
+    таблица тегов: длина имени (u16), имя, смещение секции (u64), число записей с тегом (u32);
+    смещения текстов (u32, записей + 1), веса (f32), тексты UTF-8;
+    секция тега: номера записей (u32), таблица псевдонимов - вероятности (f32) и псевдонимы (u32),
+    битовая маска записей.
+
+Выбор записи по пересечению тегов - O(1) по таблице псевдонимов (метод Уолкера-Воуза);
+таблицы для одиночных тегов лежат в индексе, для сочетаний строятся один раз и кэшируются.
+
+Сборка: python -m excuses build; проверка: python -m excuses query deadline polite [-n 5]
+"""
+import argparse
+import itertools
+import json
+import mmap
+import os
+import random
+import struct
+from array import array
+from collections import OrderedDict, deque
+
+from binindex import close_mmap, open_index, pad4, read_array, source_key, write_array
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILE = os.path.join(BASE_DIR, "excuses.json")
+INDEX_FILE = os.path.join(BASE_DIR, "__pycache__", "excuses.idx")
+MAGIC = b"VASYAEX1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQQ")
+TAG_ENTRY = struct.Struct("<QI")
+NAME_LEN = struct.Struct("<H")
+SHORT_TEXT = 70  # Границы тегов длины, символов
+LONG_TEXT = 130
+QUERY_CACHE = 256  # Сколько сочетаний тегов держать с готовыми таблицами псевдонимов
+RECENT_SIZE = 16  # Сколько последних показанных записей не повторять
+
+
+def length_tag(text):
+    if len(text) < SHORT_TEXT:
+        return "short"
+    return "medium" if len(text) < LONG_TEXT else "long"
+
+
+def expand(source):
+    """Разворачивает исходник в список (текст, теги, вес)"""
+    entries = []
+    for situation, reasons in source.get("situations", {}).items():
+        for tone, parts in source.get("tones", {}).items():
+            for opening, reason, closing in itertools.product(parts["openings"], reasons, parts["closings"]):
+                reason, weight = (reason, 1.0) if isinstance(reason, str) else reason
+                text = " ".join(part for part in (opening, reason, closing) if part)
+                entries.append((text, (situation, tone), float(weight)))
+    for entry in source.get("entries", ()):
+        entries.append((entry["text"], tuple(entry.get("tags", ())), float(entry.get("weight", 1.0))))
+    return entries
+
+
+def build_alias(weights):
+    """Таблица псевдонимов Уолкера-Воуза: (вероятности, псевдонимы) за O(n)"""
+    n = len(weights)
+    total = sum(weights)
+    prob = [1.0] * n
+    alias = list(range(n))
+    if not n or total <= 0:
+        return prob, alias
+    scaled = [weight * n / total for weight in weights]
+    small = [i for i, value in enumerate(scaled) if value < 1.0]
+    large = [i for i, value in enumerate(scaled) if value >= 1.0]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    return prob, alias
+
+
+def write_index(path, entries, source_key=(0, 0)):
+    """Записывает индекс; entries - (текст, теги, вес), одинаковые тексты объединяются"""
+    merged = OrderedDict()
+    for text, tags, weight in entries:
+        if text in merged:
+            merged[text][0].update(tags)
+            merged[text][1] = max(merged[text][1], weight)
+        else:
+            merged[text] = [set(tags), weight]
+    texts = list(merged)
+    weights = [merged[text][1] for text in texts]
+    postings = {}
+    for number, text in enumerate(texts):
+        for tag in merged[text][0] | {length_tag(text)}:
+            postings.setdefault(tag, []).append(number)
+    tags = sorted(postings)
+    encoded = [text.encode("utf-8") for text in texts]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    bitmap_bytes = (len(texts) + 7) // 8
+    table_size = sum(NAME_LEN.size + len(tag.encode("utf-8")) + TAG_ENTRY.size for tag in tags)
+
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(texts), len(tags), *source_key))
+        f.write(b"\0" * table_size)  # Таблица тегов дописывается, когда известны смещения секций
+        pad4(f)
+        write_array(f, offsets)
+        write_array(f, array("f", weights))
+        f.write(b"".join(encoded))
+        sections = []
+        for tag in tags:
+            pad4(f)
+            numbers = postings[tag]
+            sections.append((f.tell(), len(numbers)))
+            prob, alias = build_alias([weights[number] for number in numbers])
+            write_array(f, array("I", numbers))
+            write_array(f, array("f", prob))
+            write_array(f, array("I", alias))
+            mask = bytearray(bitmap_bytes)
+            for number in numbers:
+                mask[number >> 3] |= 1 << (number & 7)
+            f.write(mask)
+        f.seek(HEADER.size)
+        for tag, (offset, count) in zip(tags, sections):
+            name = tag.encode("utf-8")
+            f.write(NAME_LEN.pack(len(name)) + name + TAG_ENTRY.pack(offset, count))
+    os.replace(tmp_path, path)
+    return len(texts), len(tags)
+
+
+class Selection:
+    """Записи, подходящие под набор тегов, с таблицей псевдонимов для выбора за O(1)"""
+    __slots__ = ("ids", "prob", "alias", "size")
+
+    def __init__(self, ids, prob, alias):
+        self.ids = ids
+        self.prob = prob
+        self.alias = alias
+        self.size = len(ids)
+
+    def pick(self, rng=random.random):
+        """Случайная запись с вероятностью, пропорциональной весу"""
+        column = int(rng() * self.size)
+        if rng() >= self.prob[column]:
+            column = self.alias[column]
+        return self.ids[column]
+
+
+EMPTY = Selection((), (), ())
+
+
+class ExcuseLibrary:
+    """Индекс, открытый через mmap; секции тегов разбираются при первом обращении"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, tag_count, *self.source_key = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: неизвестный формат индекса")
+        self.tags = {}  # Тег -> (смещение секции, число записей)
+        position = HEADER.size
+        for _ in range(tag_count):
+            (length,) = NAME_LEN.unpack_from(self.mm, position)
+            name = bytes(self.mm[position + 2:position + 2 + length]).decode("utf-8")
+            position += NAME_LEN.size + length
+            self.tags[name] = TAG_ENTRY.unpack_from(self.mm, position)
+            position += TAG_ENTRY.size
+        position += -position % 4
+        self.offsets = read_array(self.mm, "I", position, self.size + 1)
+        self.weights = read_array(self.mm, "f", position + 4 * (self.size + 1), self.size)
+        self.text_base = position + 4 * (2 * self.size + 1)
+        self.masks = {}  # Тег -> битовая маска (int), читается лениво
+        self.members = {}  # Тег -> множество номеров, строится только для пересечений
+        self.queries = OrderedDict()  # frozenset тегов -> Selection (LRU)
+
+    def text(self, number):
+        start = self.text_base + self.offsets[number]
+        return self.mm[start:self.text_base + self.offsets[number + 1]].decode("utf-8")
+
+    def tag_selection(self, tag):
+        """Готовая выборка одного тега прямо из индекса"""
+        offset, count = self.tags[tag]
+        return Selection(read_array(self.mm, "I", offset, count),
+                         read_array(self.mm, "f", offset + 4 * count, count),
+                         read_array(self.mm, "I", offset + 8 * count, count))
+
+    def mask(self, tag):
+        mask = self.masks.get(tag)
+        if mask is None:
+            offset, count = self.tags[tag]
+            start = offset + 12 * count
+            mask = self.masks[tag] = int.from_bytes(self.mm[start:start + (self.size + 7) // 8], "little")
+        return mask
+
+    def has_tags(self, number, tags):
+        """Есть ли у записи все теги: по одному байту битовой маски каждого тега"""
+        for tag in tags:
+            section = self.tags.get(tag)
+            if section is None:
+                return False
+            offset, count = section
+            if not self.mm[offset + 12 * count + (number >> 3)] >> (number & 7) & 1:
+                return False
+        return True
+
+    def count(self, tags):
+        """Число записей со всеми тегами: пересечение битовых масок, без построения выборки"""
+        tags = list(tags)
+        if not tags:
+            return self.size
+        if any(tag not in self.tags for tag in tags):
+            return 0
+        mask = self.mask(tags[0])
+        for tag in tags[1:]:
+            mask &= self.mask(tag)
+        return mask.bit_count() if hasattr(mask, "bit_count") else bin(mask).count("1")
+
+    def query(self, tags):
+        """Выборка записей со всеми тегами; результат кэшируется вместе с таблицей псевдонимов"""
+        key = frozenset(tags)
+        selection = self.queries.get(key)
+        if selection is not None:
+            self.queries.move_to_end(key)
+            return selection
+        if any(tag not in self.tags for tag in key):
+            selection = EMPTY
+        elif len(key) == 1:
+            selection = self.tag_selection(next(iter(key)))
+        elif not key:
+            prob, alias = build_alias(self.weights)
+            selection = Selection(range(self.size), prob, alias)
+        else:
+            # Перебираем самый короткий список, остальные теги проверяем по множествам
+            ordered = sorted(key, key=lambda tag: self.tags[tag][1])
+            others = [self.member_set(tag) for tag in ordered[1:]]
+            ids = [number for number in self.tag_selection(ordered[0]).ids
+                   if all(number in members for members in others)]
+            prob, alias = build_alias([self.weights[number] for number in ids])
+            selection = Selection(ids, prob, alias) if ids else EMPTY
+        self.queries[key] = selection
+        if len(self.queries) > QUERY_CACHE:
+            self.queries.popitem(last=False)
+        return selection
+
+    def member_set(self, tag):
+        members = self.members.get(tag)
+        if members is None:
+            members = self.members[tag] = set(self.tag_selection(tag).ids)
+        return members
+
+    def close(self):
+        # Выборки одиночных тегов и массивы ссылаются на mmap; отпускаем их до закрытия
+        self.queries.clear()
+        self.members.clear()
+        self.offsets = self.weights = None
+        close_mmap(self.mm)
+
+
+class ExcusePicker:
+    """Случайные отмазки без повторов среди последних показанных"""
+    def __init__(self, library, recent=RECENT_SIZE, rng=random.random):
+        self.library = library
+        self.rng = rng
+        self.recent = deque(maxlen=recent)
+
+    def pick(self, tags):
+        """Номер записи или None, если под теги ничего не подходит"""
+        tags = tuple(tags)
+        selection = self.library.query(tags)
+        if not selection.size:
+            return None
+        # Недавние записи с этими тегами не повторяем; если других подходящих нет, разрешаем
+        # самую давнюю из них
+        avoid = set()
+        for number in reversed(self.recent):
+            if len(avoid) >= selection.size - 1:
+                break
+            if number not in avoid and self.library.has_tags(number, tags):
+                avoid.add(number)
+        for _ in range(8):
+            number = selection.pick(self.rng)
+            if number not in avoid:
+                break
+        else:
+            # Почти все записи выборки недавние: выбираем из оставшихся напрямую по весам
+            fresh = [number for number in selection.ids if number not in avoid]
+            point = self.rng() * sum(self.library.weights[number] for number in fresh)
+            for number in fresh:
+                point -= self.library.weights[number]
+                if point < 0:
+                    break
+        self.recent.append(number)
+        return number
+
+    def text(self, tags):
+        number = self.pick(tags)
+        return None if number is None else self.library.text(number)
+
+
+def build(source_path=SOURCE_FILE, index_path=INDEX_FILE):
+    """Компилирует excuses.json в индекс"""
+    with open(source_path, encoding="utf-8") as f:
+        source = json.load(f)
+    return write_index(index_path, expand(source), source_key(source_path))
+
+
+def open_library(source_path=SOURCE_FILE, index_path=INDEX_FILE):
+    """Открывает индекс, пересобирая его, если исходник изменился (как кэш сценариев)"""
+    return open_index(index_path, source_path, lambda path: build(source_path, path), ExcuseLibrary)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Библиотека отмазок")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="скомпилировать индекс")
+    build_parser.add_argument("--src", default=SOURCE_FILE)
+    build_parser.add_argument("--out", default=INDEX_FILE)
+    query = commands.add_parser("query", help="случайные отмазки по тегам")
+    query.add_argument("tags", nargs="*")
+    query.add_argument("-n", type=int, default=5)
+    commands.add_parser("stats", help="размер библиотеки и теги")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        count, tags = build(args.src, args.out)
+        print(f"Индекс {args.out}: {count} записей, {tags} тегов, {os.path.getsize(args.out)} байт")
+        return
+    library = open_library()
+    if args.command == "stats":
+        print(f"Записей: {library.size}")
+        for tag, (_, count) in sorted(library.tags.items()):
+            print(f"  {tag:<12}{count:>8}")
+        return
+    print(f"Подходит записей: {library.count(args.tags)}")
+    picker = ExcusePicker(library)
+    for _ in range(args.n):
+        text = picker.text(args.tags)
+        if text is None:
+            break
+        print(f"- {text}")
+
+
+if __name__ == "__main__":
+    main()
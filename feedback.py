@@ -0,0 +1,178 @@
+"""Хранилище отзывов: SQLite в режиме WAL с пакетной записью в фоновом потоке.
+
+Отправка отзыва только кладет его в очередь в памяти; фоновый поток записывает
+накопленное одной транзакцией. Чтение идет страницами, без загрузки всей истории.
+
+Обслуживание: python -m feedback export <файл.jsonl> | compact [--older-than-days N] | stats
+"""
+import argparse
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".local", "share", "vasya", "feedback.db")
+BATCH_SIZE = 256  # Максимум отзывов в одной транзакции
+FLUSH_INTERVAL = 0.5  # Как долго писатель копит отзывы перед записью, с
+PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    rating INTEGER,
+    text TEXT NOT NULL
+)
+"""
+
+
+def connect(path):
+    """Открывает базу в режиме WAL; synchronous=NORMAL не ждет fsync на каждый коммит"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute(SCHEMA)
+    return connection
+
+
+class FeedbackStore:
+    """Очередь отзывов в памяти и фоновый писатель"""
+    def __init__(self, path=DEFAULT_DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        connect(path).close()  # Создаем схему заранее, чтобы чтение работало сразу
+        self.writer = threading.Thread(target=self.write_loop, name="feedback-writer", daemon=True)
+        self.writer.start()
+
+    def submit(self, text, rating=None):
+        """Ставит отзыв в очередь и сразу возвращает управление"""
+        self.queue.put((time.time(), rating, text))
+
+    def write_loop(self):
+        """Фоновый поток: собирает пачку и записывает ее одной транзакцией"""
+        connection = connect(self.path)
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stop = False
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                try:
+                    with connection:
+                        connection.executemany("INSERT INTO feedback (created, rating, text) VALUES (?, ?, ?)", batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    print(f"Ошибка записи отзывов: {str(e)}")
+                for _ in batch:
+                    self.queue.task_done()
+                if stop:
+                    return
+        finally:
+            connection.close()
+
+    def flush(self):
+        """Ждет, пока все отправленные отзывы будут записаны"""
+        self.queue.join()
+
+    def close(self):
+        """Дописывает очередь и останавливает писателя"""
+        self.queue.put(None)
+        self.writer.join(timeout=5)
+
+    def iter_pages(self, page_size=PAGE_SIZE, after_id=0):
+        """Страницы отзывов по возрастанию id (постраничный проход по ключу, без OFFSET)"""
+        connection = connect(self.path)
+        try:
+            while True:
+                rows = connection.execute(
+                    "SELECT id, created, rating, text FROM feedback WHERE id > ? ORDER BY id LIMIT ?",
+                    (after_id, page_size),
+                ).fetchall()
+                if not rows:
+                    return
+                yield rows
+                after_id = rows[-1][0]
+        finally:
+            connection.close()
+
+    def count(self):
+        connection = connect(self.path)
+        try:
+            return connection.execute("SELECT COUNT(*) FROM feedback").fetchone()[0]
+        finally:
+            connection.close()
+
+    def export(self, out_path, page_size=PAGE_SIZE):
+        """Выгружает все отзывы в JSON Lines; память не зависит от размера истории"""
+        total = 0
+        with open(out_path, "w", encoding="utf-8") as f:
+            for page in self.iter_pages(page_size):
+                for row_id, created, rating, text in page:
+                    f.write(json.dumps({"id": row_id, "created": created, "rating": rating, "text": text},
+                                       ensure_ascii=False) + "\n")
+                total += len(page)
+        return total
+
+    def compact(self, older_than=None):
+        """Удаляет отзывы старше older_than (unix time), переносит WAL в базу и сжимает файл"""
+        connection = connect(self.path)
+        try:
+            removed = 0
+            if older_than is not None:
+                with connection:
+                    removed = connection.execute("DELETE FROM feedback WHERE created < ?", (older_than,)).rowcount
+            connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            connection.execute("VACUUM")
+            return removed
+        finally:
+            connection.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обслуживание хранилища отзывов")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="путь к базе отзывов")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="выгрузить отзывы в JSON Lines")
+    export.add_argument("output")
+    compact = commands.add_parser("compact", help="удалить старые отзывы и сжать базу")
+    compact.add_argument("--older-than-days", type=float, help="удалить отзывы старше N дней")
+    commands.add_parser("stats", help="показать число отзывов и размер базы")
+    args = parser.parse_args(argv)
+
+    store = FeedbackStore(args.db)
+    try:
+        if args.command == "export":
+            print(f"Выгружено отзывов: {store.export(args.output)}")
+        elif args.command == "compact":
+            older_than = time.time() - args.older_than_days * 86400 if args.older_than_days is not None else None
+            print(f"Удалено отзывов: {store.compact(older_than)}")
+        else:
+            print(f"Отзывов: {store.count()}, размер базы: {os.path.getsize(args.db)} байт")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
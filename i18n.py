@@ -0,0 +1,187 @@
+"""Локализация: каталоги сообщений, скомпилированные в двоичный индекс и читаемые через mmap.
+
+Ключ сообщения - исходная русская строка (как msgid в gettext), поэтому для русского
+каталог не нужен. Переводы лежат в locales/<язык>.json ({"ключ": "перевод"}); при первом
+переводе на язык каталог компилируется в __pycache__/locale-<язык>.cat и открывается через
+mmap. Запуск не зависит от числа языков: открывается только каталог выбранного.
+
+Формат каталога (little-endian):
+    заголовок: MAGIC, версия, число сообщений, ключ исходника (mtime_ns, размер);
+    смещения ключей (u32, сообщений + 1), смещения переводов (u32, сообщений + 1),
+    ключи UTF-8 по возрастанию байтов, переводы UTF-8.
+Поиск - двоичный поиск по ключам прямо в mmap; найденные переводы кэшируются.
+
+Сборка: python -m i18n build [язык]; проверка: python -m i18n get en "Назад"
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+from array import array
+
+from binindex import close_mmap, open_index, pad4, read_array, source_key, write_array
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCALES_DIR = os.path.join(BASE_DIR, "locales")
+CACHE_DIR = os.path.join(BASE_DIR, "__pycache__")
+DEFAULT_LOCALE = "ru"  # Язык ключей сообщений
+MAGIC = b"VASYAMO1"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+
+
+def source_path(locale, source_dir=LOCALES_DIR):
+    return os.path.join(source_dir, f"{locale}.json")
+
+
+def locale_names(source_dir=LOCALES_DIR):
+    """Языки, на которые есть перевод, включая язык ключей"""
+    try:
+        names = {name[:-5] for name in os.listdir(source_dir) if name.endswith(".json")}
+    except FileNotFoundError:
+        names = set()
+    return names | {DEFAULT_LOCALE}
+
+
+def catalog_path(locale, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, f"locale-{locale}.cat")
+
+
+def write_catalog(path, messages, source_key=(0, 0)):
+    """Записывает каталог; messages - словарь ключ -> перевод"""
+    pairs = sorted((key.encode("utf-8"), text.encode("utf-8")) for key, text in messages.items())
+    key_offsets = array("I", [0])
+    text_offsets = array("I", [0])
+    for key, text in pairs:
+        key_offsets.append(key_offsets[-1] + len(key))
+        text_offsets.append(text_offsets[-1] + len(text))
+    tmp_path = path + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(pairs), *source_key))
+        pad4(f)
+        write_array(f, key_offsets)
+        write_array(f, text_offsets)
+        f.write(b"".join(key for key, _ in pairs))
+        f.write(b"".join(text for _, text in pairs))
+    os.replace(tmp_path, path)
+    return len(pairs)
+
+
+class Catalog:
+    """Каталог одного языка, открытый через mmap"""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, *self.source_key = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: неизвестный формат каталога")
+        position = HEADER.size + (-HEADER.size % 4)
+        self.key_offsets = read_array(self.mm, "I", position, self.size + 1)
+        self.text_offsets = read_array(self.mm, "I", position + 4 * (self.size + 1), self.size + 1)
+        self.key_base = position + 8 * (self.size + 1)
+        self.text_base = self.key_base + self.key_offsets[self.size]
+        self.found = {}  # Ключ -> перевод; промахи не кэшируются (ими бывают тексты ошибок и отмазок)
+
+    def lookup(self, key):
+        """Перевод или None, если ключа в каталоге нет"""
+        text = self.found.get(key)
+        if text is not None:
+            return text
+        data = key.encode("utf-8")
+        mm = self.mm
+        offsets = self.key_offsets
+        base = self.key_base
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            probe = mm[base + offsets[middle]:base + offsets[middle + 1]]
+            if probe < data:
+                low = middle + 1
+            elif probe > data:
+                high = middle
+            else:
+                start = self.text_base + self.text_offsets[middle]
+                text = self.found[key] = mm[start:self.text_base + self.text_offsets[middle + 1]].decode("utf-8")
+                return text
+        return None
+
+    def close(self):
+        self.found.clear()
+        self.key_offsets = self.text_offsets = None
+        close_mmap(self.mm)
+
+
+def build(locale, source_dir=LOCALES_DIR, cache_dir=CACHE_DIR, path=None):
+    """Компилирует locales/<язык>.json в каталог (в path, если он задан)"""
+    source = source_path(locale, source_dir)
+    with open(source, encoding="utf-8") as f:
+        messages = json.load(f)
+    return write_catalog(path or catalog_path(locale, cache_dir), messages, source_key(source))
+
+
+def open_catalog(locale, source_dir=LOCALES_DIR, cache_dir=CACHE_DIR):
+    """Открывает каталог, пересобирая его, если исходник изменился"""
+    return open_index(catalog_path(locale, cache_dir), source_path(locale, source_dir),
+                      lambda path: build(locale, source_dir, cache_dir, path), Catalog)
+
+
+class Translator:
+    """Текущий язык; каталоги открываются при первом переводе на язык"""
+    def __init__(self, locale=DEFAULT_LOCALE, source_dir=LOCALES_DIR, cache_dir=CACHE_DIR):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.catalogs = {}  # Язык -> Catalog
+        self.locale = DEFAULT_LOCALE
+        self.switch(locale)
+
+    def available(self, locale):
+        return locale == DEFAULT_LOCALE or os.path.exists(source_path(locale, self.source_dir))
+
+    def switch(self, locale):
+        if not self.available(locale):
+            raise KeyError(f"Нет перевода на язык {locale}")
+        self.locale = locale
+
+    def gettext(self, key, **kwargs):
+        """Перевод сообщения на текущий язык; без перевода - сам ключ. kwargs подставляются в {поля}"""
+        text = key
+        if self.locale != DEFAULT_LOCALE:
+            catalog = self.catalogs.get(self.locale)
+            if catalog is None:
+                catalog = self.catalogs[self.locale] = open_catalog(self.locale, self.source_dir, self.cache_dir)
+            text = catalog.lookup(key) or key
+        return text.format(**kwargs) if kwargs else text
+
+    def close(self):
+        for catalog in self.catalogs.values():
+            catalog.close()
+        self.catalogs.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Каталоги переводов")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="скомпилировать каталоги")
+    build_parser.add_argument("locales", nargs="*", help="языки (по умолчанию все из locales/)")
+    get = commands.add_parser("get", help="перевести сообщение")
+    get.add_argument("locale")
+    get.add_argument("key")
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        locales = args.locales or sorted(locale_names() - {DEFAULT_LOCALE})
+        for locale in locales:
+            count = build(locale)
+            path = catalog_path(locale)
+            print(f"Каталог {path}: {count} сообщений, {os.path.getsize(path)} байт")
+        return
+    translator = Translator(args.locale)
+    print(translator.gettext(args.key))
+    translator.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Быстрый запуск: передает команду резидентному экземпляру или поднимает его.
+
+Запуск: python launch.py [--frame Phone_loss] [--hide | --quit] [--timing]
+        python launch.py --bench [--runs 10]    # холодный и теплый запуск
+
+Не импортирует tkinter и модули интерфейса: при живом экземпляре работа сводится
+к одному обмену строками через Unix-сокет.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from daemon import DaemonError, send_command, socket_path
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+START_TIMEOUT = 30.0  # Сколько ждать, пока новый экземпляр откроет сокет, с
+COLD_RUNS = 3
+
+
+def start_daemon():
+    """Запускает main.py --daemon в отдельной сессии, чтобы он пережил запускалку"""
+    return subprocess.Popen([sys.executable, os.path.join(BASE_DIR, "main.py"), "--daemon"],
+                            cwd=BASE_DIR, stdin=subprocess.DEVNULL, start_new_session=True)
+
+
+def launch(command):
+    """Отправляет команду; при необходимости запускает экземпляр. Возвращает (ответ, холодный ли запуск)"""
+    reply = send_command(command)
+    if reply is not None:
+        return reply, False
+    if command["cmd"] != "show":
+        return {"ok": False, "error": "Резидентный экземпляр не запущен"}, False
+    proc = start_daemon()
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        exited = proc.poll() is not None
+        if not exited:
+            time.sleep(0.02)
+        reply = send_command(command)
+        if reply is not None:
+            return reply, True
+        if exited:
+            # Параллельная запускалка могла поднять свой экземпляр раньше - тогда ответ уже получен выше
+            raise DaemonError(f"Экземпляр завершился с кодом {proc.returncode}")
+    raise DaemonError("Экземпляр не открыл сокет вовремя")
+
+
+def run_launcher(args):
+    """Один запуск запускалки в отдельном процессе; возвращает время до ответа, с"""
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__)] + args, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def bench(runs, frame):
+    """Сравнивает холодный запуск (новый экземпляр) и теплый (команда живому экземпляру)"""
+    if send_command({"cmd": "ping"}) is not None:
+        sys.exit("Резидентный экземпляр уже запущен: завершите его (launch.py --quit) перед замером")
+    cold = []
+    warm = []
+    try:
+        for _ in range(COLD_RUNS):
+            cold.append(run_launcher(["--frame", frame]))
+            warm.extend(run_launcher(["--frame", frame]) for _ in range(runs))
+            run_launcher(["--quit"])
+            while os.path.exists(socket_path()):
+                time.sleep(0.01)
+    finally:
+        send_command({"cmd": "quit"})
+    print(f"Холодный запуск: медиана {statistics.median(cold) * 1000:.0f} мс ({len(cold)} замеров)")
+    print(f"Теплый запуск:   медиана {statistics.median(warm) * 1000:.1f} мс ({len(warm)} замеров)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Быстрый запуск приложения через резидентный экземпляр")
+    parser.add_argument("--frame", help="сразу открыть указанный экран")
+    parser.add_argument("--hide", action="store_true", help="скрыть окно")
+    parser.add_argument("--quit", action="store_true", help="завершить резидентный экземпляр")
+    parser.add_argument("--timing", action="store_true", help="показать время запуска")
+    parser.add_argument("--bench", action="store_true", help="замерить холодный и теплый запуск")
+    parser.add_argument("--runs", type=int, default=10, help="теплых запусков на каждый холодный при --bench")
+    args = parser.parse_args(argv)
+    if args.bench:
+        bench(args.runs, args.frame or "Phone_loss")
+        return 0
+    started = time.perf_counter()
+    if args.quit:
+        command = {"cmd": "quit"}
+    elif args.hide:
+        command = {"cmd": "hide"}
+    else:
+        command = {"cmd": "show", "frame": args.frame}
+    try:
+        reply, cold = launch(command)
+    except (DaemonError, OSError, ValueError) as e:
+        print(f"Ошибка запуска: {str(e)}", file=sys.stderr)
+        return 1
+    if not reply.get("ok", False):
+        print(reply.get("error", "Команда не выполнена"), file=sys.stderr)
+        return 1
+    if args.timing:
+        print(f"{'Холодный' if cold else 'Теплый'} запуск: {(time.perf_counter() - started) * 1000:.1f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,152 +1,1101 @@
+import argparse
+import io
+import itertools
+import json
 import os
+import queue
+import threading
+import time
 import webbrowser
-from tkinter import Tk, Label, Frame, Entry, messagebox, PhotoImage, Canvas
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from tkinter import Tk, Label, Frame, Entry, Text, PhotoImage, Canvas
+
+from build_assets import target_geometry
+from auth import SessionCache
+from bundle import AssetBundle
+from daemon import DaemonError, DaemonServer
+from engine import Engine, EngineError
+from excuses import ExcusePicker, open_library
+from feedback import FeedbackStore
+from i18n import DEFAULT_LOCALE, Translator
+from profiling import Profiler
+from scenarios import DEFAULT_THEME, ExcuseSpec, LabelSpec, load_scenario
+from sms import SmsVerifier, create_backend
+from stallwatch import DEFAULT_THRESHOLD, Watchdog
+from telemetry import CLICK, SHOW, Telemetry
+from themes import Style, ThemeSet
+from tilemap import MapView, TileStore, tile_url
+from transitions import STYLES, Transition
+
+try:
+    from PIL import Image
+except ImportError:  # Без Pillow рабочие потоки только читают файлы
+    Image = None
+
+# Пути к ресурсам считаются от расположения main.py, а не от рабочей папки
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGES_DIR = os.path.join(BASE_DIR, "images")
+ASSETS_MANIFEST = os.path.join(BASE_DIR, "assets", "manifest.json")
+ASSETS_BUNDLE = os.path.join(BASE_DIR, "images.bundle")
+SCENARIOS_FILE = os.path.join(BASE_DIR, "scenarios.json")
+SCENARIOS_CACHE = os.path.join(BASE_DIR, "__pycache__", "scenarios.cache")
+
+
+ButtonSprite = namedtuple("ButtonSprite", "width height points normal active")
+
+
+@lru_cache(maxsize=None)
+def rounded_rect_points(x1, y1, x2, y2, radius):
+    """Вычисляет вершины закругленного прямоугольника (общий кэш на процесс)"""
+    return (
+        x1 + radius, y1,
+        x2 - radius, y1,
+        x2, y1,
+        x2, y1 + radius,
+        x2, y2 - radius,
+        x2, y2,
+        x2 - radius, y2,
+        x1 + radius, y2,
+        x1, y2,
+        x1, y2 - radius,
+        x1, y1 + radius,
+        x1, y1
+    )
+
+
+@lru_cache(maxsize=None)
+def button_sprite(width, height, style):
+    """Возвращает общий спрайт для кнопок с одинаковыми размером и стилем (стили интернированы)"""
+    return ButtonSprite(width, height, rounded_rect_points(0, 0, width, height, style.radius),
+                        (style.bg, style.fg), (style.active_bg, style.active_fg))
+
+
+# Стиль кнопок, созданных без явного стиля
+DEFAULT_STYLE = Style("primary", "green", "white", "dark green", "black")
 
 
 class RoundedButton(Canvas):
     """Класс для создания закругленных кнопок"""
-    def __init__(self, master=None, text="", radius=40, bg="green", fg="white",
-                 active_bg="dark green", active_fg="black", command=None, font=("Arial", 14), **kwargs):
+    # Счетчики задержки переключения состояний (общие для всех кнопок)
+    hover_count = 0
+    hover_time = 0.0
+    # Общий обработчик нажатий всех кнопок (телеметрия), вызывается до команды
+    click_listener = None
+    # Все существующие кнопки: смена темы перекрашивает их за один проход
+    instances = set()
+
+    def __init__(self, master=None, text="", style=DEFAULT_STYLE, command=None, **kwargs):
         super().__init__(master, highlightthickness=0, **kwargs)
         self.config(bg=master.cget("bg"))
-        self.radius = radius
-        self.bg = bg
-        self.fg = fg
-        self.active_bg = active_bg
-        self.active_fg = active_fg
+        # Ссылка на общий стиль вместо собственных копий цветов, радиуса и шрифта
+        self.style = style
         self.command = command
-        self.text = text
+        self.text = text  # Исходная подпись (ключ сообщения): по ней пишется телеметрия на любом языке
         self.is_active = False
-        self.font = font  # Добавляем параметр шрифта
         # Обработка событий
         self.bind("<Button-1>", self._on_click)
         self.bind("<Enter>", self._on_enter)
         self.bind("<Leave>", self._on_leave)
         # Отрисовка кнопки
         self.draw_button()
+        RoundedButton.instances.add(self)
 
     def draw_button(self):
-        """Отрисовывает закругленную кнопку"""
+        """Отрисовывает закругленную кнопку; дальше состояния переключаются только цветом"""
         self.delete("all")
         width = self.winfo_reqwidth()
         height = self.winfo_reqheight()
+        self.sprite = button_sprite(width, height, self.style)
+        bg_color, fg_color = self.sprite.active if self.is_active else self.sprite.normal
         # Рисуем закругленный прямоугольник
-        bg_color = self.active_bg if self.is_active else self.bg
-        self.create_rounded_rect(0, 0, width, height, radius=self.radius, fill=bg_color, outline="")
-        # Добавляем текст с использованием параметра font
-        fg_color = self.active_fg if self.is_active else self.fg
-        self.create_text(width // 2, height // 2, text=self.text, fill=fg_color, font=self.font)
+        self.shape = self.create_polygon(self.sprite.points, smooth=True, fill=bg_color, outline="")
+        # Добавляем текст шрифтом стиля
+        self.label = self.create_text(width // 2, height // 2, text=self.text, fill=fg_color, font=self.style.font)
+
+    def set_active(self, active):
+        """Переключает цвета кнопки без перерисовки элементов"""
+        if active == self.is_active:
+            return
+        started = time.perf_counter()
+        self.is_active = active
+        bg_color, fg_color = self.sprite.active if active else self.sprite.normal
+        self.itemconfig(self.shape, fill=bg_color)
+        self.itemconfig(self.label, fill=fg_color)
+        RoundedButton.hover_count += 1
+        RoundedButton.hover_time += time.perf_counter() - started
+
+    def set_text(self, text):
+        """Меняет показанную подпись (перевод), не трогая исходную"""
+        self.itemconfig(self.label, text=text)
+
+    def restyle(self, style):
+        """Переводит кнопку на другой стиль тех же размеров; элементы холста не пересоздаются"""
+        if style is self.style:
+            return
+        self.style = style
+        self.sprite = button_sprite(self.sprite.width, self.sprite.height, style)
+        bg_color, fg_color = self.sprite.active if self.is_active else self.sprite.normal
+        self.itemconfig(self.shape, fill=bg_color)
+        self.itemconfig(self.label, fill=fg_color)
+
+    @classmethod
+    def restyle_all(cls, theme):
+        """Перекрашивает все кнопки в текущую тему; новый стиль считается один раз на каждый старый"""
+        styles = {}
+        for button in cls.instances:
+            style = styles.get(button.style)
+            if style is None:
+                style = styles[button.style] = theme.restyle(button.style)
+            button.restyle(style)
+        return len(cls.instances)
+
+    def destroy(self):
+        RoundedButton.instances.discard(self)
+        super().destroy()
+
+    @classmethod
+    def hover_latency(cls):
+        """Средняя задержка переключения состояния кнопки, в секундах"""
+        return cls.hover_time / cls.hover_count if cls.hover_count else 0.0
 
     def _on_click(self, event):
         """Обработчик нажатия на кнопку"""
+        if RoundedButton.click_listener:
+            RoundedButton.click_listener(self)
         if self.command:
             self.command()
 
     def _on_enter(self, event):
         """Обработчик наведения курсора"""
-        self.is_active = True
-        self.draw_button()  # Перерисовываем кнопку с активными цветами
+        self.set_active(True)  # Переключаем кнопку на активные цвета
 
     def _on_leave(self, event):
         """Обработчик ухода курсора"""
-        self.is_active = False
-        self.draw_button()  # Перерисовываем кнопку с исходными цветами
+        self.set_active(False)  # Возвращаем исходные цвета
 
 
 # Добавляем метод create_rounded_rect в Canvas
 def create_rounded_rect(self, x1, y1, x2, y2, radius=40, **kwargs):
     """Создает закругленный прямоугольник на Canvas"""
-    points = [
-        x1 + radius, y1,
-        x2 - radius, y1,
-        x2, y1,
-        x2, y1 + radius,
-        x2, y2 - radius,
-        x2, y2,
-        x2 - radius, y2,
-        x1 + radius, y2,
-        x1, y2,
-        x1, y2 - radius,
-        x1, y1 + radius,
-        x1, y1
-    ]
-    return self.create_polygon(points, smooth=True, **kwargs)
+    return self.create_polygon(rounded_rect_points(x1, y1, x2, y2, radius), smooth=True, **kwargs)
 
 
 Canvas.create_rounded_rect = create_rounded_rect
 
+# Бюджет памяти под декодированные изображения (в мегабайтах)
+DEFAULT_IMAGE_BUDGET_MB = 8
+# Шаг округления размеров масштабированных копий: мелкие изменения окна не плодят новые копии
+SIZE_BUCKET = 50
+# Допустимое отличие масштаба от 1, при котором картинка не масштабируется
+SCALE_TOLERANCE = 0.1
+
+
+def size_bucket(size):
+    """Округляет размер до шага SIZE_BUCKET"""
+    return tuple(max(SIZE_BUCKET, round(value / SIZE_BUCKET) * SIZE_BUCKET) for value in size)
+
+
+def parse_variant(name):
+    """Разбирает имя варианта вида 'имя@800x1660' -> ('имя', (800, 1660)) или (имя, None)"""
+    base, _, size = name.partition("@")
+    if not size:
+        return name, None
+    width, _, height = size.partition("x")
+    return base, (int(width), int(height))
+
+
+def png_size(data):
+    """Размер PNG из заголовка IHDR без декодирования; None для других форматов"""
+    if bytes(data[:8]) != b"\x89PNG\r\n\x1a\n" or len(data) < 24:
+        return None
+    return int.from_bytes(data[16:20], "big"), int.from_bytes(data[20:24], "big")
+
+
+def scale_photo(img, size):
+    """Приближает PhotoImage к нужному размеру средствами Tk (только целые коэффициенты)"""
+    scale = min(size[0] / img.width(), size[1] / img.height())
+    if scale >= 2:
+        return img.zoom(int(scale))
+    if scale <= 0.5:
+        return img.subsample(int(1 / scale))
+    return img
+
+
+class ImageStore:
+    """Ленивое хранилище изображений с ограничением по памяти (LRU)"""
+    def __init__(self, directory, budget_mb=DEFAULT_IMAGE_BUDGET_MB, manifest=None, bundle=None, profiler=None):
+        self.directory = directory
+        self.profiler = profiler or Profiler()
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.bundle = None
+        # Имя изображения -> источник: путь к файлу или запись пакета (псевдонимы делят один источник)
+        self.sources = {}
+        # Имя -> кандидаты под размер окна, включая основной файл: [(ширина, высота, источник)]
+        self.variants = {}
+        # (Источник, размер или None) -> (PhotoImage, размер в байтах), от старых к новым
+        self.cache = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if bundle and os.path.exists(bundle):
+            self.load_bundle(bundle)
+        if not self.sources and manifest and os.path.exists(manifest):
+            self.load_manifest(manifest)
+        if not self.sources:
+            self.scan()
+        for variants in self.variants.values():
+            variants.sort()
+
+    def load_bundle(self, path):
+        """Открывает единый пакет изображений через mmap"""
+        try:
+            self.bundle = AssetBundle(path)
+            for name in self.bundle.names():
+                base, size = parse_variant(name)
+                if size is None:
+                    self.sources[name] = self.bundle.entry(name)
+                else:
+                    self.variants.setdefault(base, []).append((*size, self.bundle.entry(name)))
+            # Основной файл тоже кандидат: его размер читается из заголовка PNG в пакете
+            for name, variants in self.variants.items():
+                source = self.sources.get(name)
+                size = source and png_size(self.bundle.data(source)[:24])
+                if size:
+                    variants.append((*size, source))
+        except Exception as e:
+            print(f"Ошибка чтения пакета {path}: {str(e)}")
+            self.bundle = None
+            self.sources.clear()
+            self.variants.clear()
+
+    def load_manifest(self, path):
+        """Читает манифест пакета из build_assets вместо сканирования папки"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            base = os.path.dirname(path)
+            for name, digest in manifest["aliases"].items():
+                entry = manifest["files"][digest]
+                self.sources[name] = os.path.join(base, entry["file"])
+                variants = entry.get("variants")
+                if not variants:
+                    continue
+                # Основной файл - кандидат со своим размером (или размером сборки, если он не записан)
+                size = entry.get("size") or manifest.get("geometry")
+                candidates = self.variants.setdefault(name, [])
+                if size:
+                    candidates.append((size[0], size[1], self.sources[name]))
+                for size, filename in variants.items():
+                    width, _, height = size.partition("x")
+                    candidates.append((int(width), int(height), os.path.join(base, filename)))
+        except Exception as e:
+            print(f"Ошибка чтения манифеста {path}: {str(e)}")
+            self.sources.clear()
+            self.variants.clear()
+
+    def scan(self):
+        """Находит изображения в папке, не декодируя их"""
+        try:
+            for filename in os.listdir(self.directory):
+                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                    name = os.path.splitext(filename)[0]
+                    self.sources[name] = os.path.join(self.directory, filename)
+        except Exception as e:
+            print(f"Общая ошибка при поиске изображений: {str(e)}")
+
+    def __contains__(self, name):
+        return name in self.sources
+
+    def resolve(self, name, size=None):
+        """Выбирает источник под размер окна; возвращает (ключ кэша, источник, целевой размер)"""
+        source = self.sources.get(name)
+        if source is None:
+            return None, None, None
+        if size is None:
+            return (source, None), source, None
+        target = size_bucket(size)
+        # Наименьший кандидат (основной файл или вариант), покрывающий окно, иначе самый крупный
+        for width, height, variant in self.variants.get(name, ()):
+            source = variant
+            if width >= target[0] * (1 - SCALE_TOLERANCE) and height >= target[1] * (1 - SCALE_TOLERANCE):
+                break
+        return (source, target), source, target
+
+    def read_source(self, source):
+        """Читает байты изображения; безопасно вызывать из рабочих потоков"""
+        if isinstance(source, tuple):
+            return bytes(self.bundle.data(source))
+        with open(source, "rb") as f:
+            return f.read()
+
+    def lookup(self, name, size=None):
+        """Возвращает уже готовое изображение нужного размера или None, ничего не декодируя"""
+        key, _, _ = self.resolve(name, size)
+        if key is None or key not in self.cache:
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return self.cache[key][0]
+
+    def install(self, key, data, prefetch=False, target=None):
+        """Создает PhotoImage из заранее прочитанных байтов (только в главном потоке)"""
+        if key in self.cache:
+            return self.cache[key][0]
+        if not prefetch:
+            self.misses += 1
+        with self.profiler.span("image:install", "image") as span:
+            img = PhotoImage(data=data)
+            if target:
+                img = scale_photo(img, target)
+            span.args.update(source=str(key[0]), bytes=len(data), width=img.width(), height=img.height())
+        if not self.add(key, img, evict=not prefetch):
+            return None
+        return img
+
+    def add(self, key, img, evict=True):
+        """Кладет изображение в кэш; загрузка впрок не вытесняет уже показанные картинки"""
+        # Tk хранит фото в виде RGBA, по 4 байта на пиксель
+        size = img.width() * img.height() * 4
+        if not evict and self.used + size > self.budget:
+            return False
+        self.cache[key] = (img, size)
+        self.used += size
+        self.evict(keep=key)
+        return True
+
+    def release(self, name):
+        """Помечает все копии изображения первыми кандидатами на выгрузку (его экран уничтожен)"""
+        sources = {self.sources.get(name)} | {variant for _, _, variant in self.variants.get(name, ())}
+        for key in [key for key in self.cache if key[0] in sources]:
+            self.cache.move_to_end(key, last=False)
+
+    def evict(self, keep=None):
+        """Выгружает давно показанные изображения, пока не уложимся в бюджет"""
+        while self.used > self.budget and len(self.cache) > 1:
+            key = next(iter(self.cache))
+            if key == keep:
+                break
+            _, size = self.cache.pop(key)
+            self.used -= size
+            self.evictions += 1
+
+    def stats(self):
+        """Счетчики для подбора бюджета памяти"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "cached": len(self.cache),
+            "used_bytes": self.used,
+            "budget_bytes": self.budget,
+        }
+
+
+def predecode(data, target=None):
+    """Масштабирует картинку под окно (если нужно) и переводит PNG без прозрачности в PPM,
+    который Tk разбирает почти без затрат"""
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as img:
+        out_img = img
+        if target:
+            scale = min(target[0] / img.width, target[1] / img.height)
+            if abs(scale - 1) > SCALE_TOLERANCE:
+                scaled, crop = target_geometry(img.width, img.height, *target)
+                out_img = img.resize(scaled, getattr(Image, "Resampling", Image).LANCZOS)
+                if crop:
+                    out_img = out_img.crop(crop)
+        if "A" in out_img.getbands() and out_img.getchannel("A").getextrema()[0] < 255 \
+                or "transparency" in img.info:
+            if out_img is img:
+                return data
+            out = io.BytesIO()
+            out_img.save(out, format="PNG", compress_level=1)
+            return out.getvalue()
+        out = io.BytesIO()
+        out_img.convert("RGB").save(out, format="PPM")
+        return out.getvalue()
+
+
+class ImageLoader:
+    """Фоновое чтение изображений; PhotoImage создаются только в главном потоке Tk"""
+    def __init__(self, store, post, on_ready, workers=2):
+        self.store = store
+        self.post = post  # Потокобезопасная передача вызова в главный поток
+        self.on_ready = on_ready
+        self.tasks = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.requested = {}  # Ключ кэша -> приоритет (0 - срочно, 1 - впрок)
+        self.urgent = set()
+        self.workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self.work, name=f"image-loader-{i}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
+
+    def request(self, name, urgent=True, size=None):
+        """Ставит изображение в очередь; срочные обгоняют загрузку впрок"""
+        key, source, target = self.store.resolve(name, size)
+        if key is None or key in self.store.cache:
+            return
+        priority = 0 if urgent else 1
+        if urgent:
+            self.urgent.add(key)
+        if self.requested.get(key, 2) <= priority:
+            return
+        self.requested[key] = priority
+        self.tasks.put((priority, next(self.seq), key, name, source, target))
+
+    def work(self):
+        """Цикл рабочего потока: чтение и предварительное декодирование без обращения к Tk"""
+        while True:
+            _, _, key, name, source, target = self.tasks.get()
+            if source is None:
+                return
+            if key not in self.requested:
+                continue  # Уже загружено по более срочной заявке
+            try:
+                with self.store.profiler.span("image:read", "image") as span:
+                    data = predecode(self.store.read_source(source), target)
+                    span.args.update(name=name, bytes=len(data))
+                self.post(self.finish, key, name, target, data, None)
+            except Exception as e:
+                self.post(self.finish, key, name, target, None, e)
+
+    def finish(self, key, name, target, data, error):
+        """Создает PhotoImage в главном потоке и сообщает о готовности"""
+        if self.requested.pop(key, None) is None:
+            return
+        urgent = key in self.urgent
+        self.urgent.discard(key)
+        if error is not None:
+            print(f"Ошибка загрузки {name}: {str(error)}")
+            return
+        try:
+            img = self.store.install(key, data, prefetch=not urgent, target=target)
+        except Exception as e:
+            print(f"Ошибка декодирования {name}: {str(e)}")
+            return
+        if img is not None:
+            self.on_ready(name)
+
+    def stop(self):
+        """Останавливает рабочие потоки"""
+        for _ in self.workers:
+            self.tasks.put((3, next(self.seq), None, None, None, None))
+
+
+# Сколько построенных экранов держать в памяти по умолчанию
+DEFAULT_MAX_FRAMES = 8
+
+# Период опроса очереди вызовов из фоновых потоков и бюджет времени на один проход
+UI_QUEUE_POLL_MS = 15
+UI_QUEUE_BUDGET = 0.008
+
+# Базовый размер окна (при 96 dpi) и пауза после изменения размера перед перерисовкой фона
+WINDOW_WIDTH = 400
+WINDOW_HEIGHT = 830
+RESIZE_DEBOUNCE_MS = 120
+
+# Кнопки выбора тона под отмазкой: подпись и тег библиотеки
+EXCUSE_TONES = (("Вежливо", "polite"), ("Смешно", "funny"), ("Дерзко", "bold"))
+
+# Экран, на который ведет вход (и с которого открывается приложение при сохраненном входе)
+HOME_SCREEN = "choose_a_situation"
+
+
+def entry_value(entry):
+    """Текст поля ввода Entry или Text"""
+    if isinstance(entry, Text):
+        return entry.get("1.0", "end-1c")
+    return entry.get()
+
 
 class App(Tk):
-    def __init__(self):
+    def __init__(self, profiler=None, daemon=False, watchdog=False):
         super().__init__()
-        self.title("Гуляй, Вася!")
-        self.geometry(self.center_window(400, 830))  # Устанавливаем размеры и центрируем окно
-        self.frames = {}
+        if daemon:
+            self.withdraw()  # Резидентный экземпляр прогревается скрытым
+        # Профилирование запуска и навигации (VASYA_PROFILE или флаг --profile)
+        self.profiler = profiler or Profiler.from_env()
+        # Сторож зависаний главного цикла (VASYA_WATCHDOG=1 или флаг --watchdog); запускается
+        # до загрузки ресурсов, чтобы стеки долгого запуска тоже попали в отчет
+        self.watchdog = None
+        if watchdog or os.environ.get("VASYA_WATCHDOG", "0") != "0":
+            threshold = float(os.environ.get("VASYA_WATCHDOG_MS", DEFAULT_THRESHOLD * 1000)) / 1000
+            self.watchdog = Watchdog(self, threshold)
+        # Язык интерфейса (VASYA_LOCALE, дальше переключается на экране настроек); каталог
+        # перевода открывается при первом обращении, русскому каталог не нужен
+        try:
+            self.translator = Translator(os.environ.get("VASYA_LOCALE", DEFAULT_LOCALE))
+        except KeyError as e:
+            print(f"{e.args[0]}, используется русский")
+            self.translator = Translator()
+        self.bound_texts = {}  # Фрейм -> {виджет: (ключ сообщения, подстановки)}
+        self.title(self.tr("Гуляй, Вася!"))
+        # Размер окна с учетом плотности экрана (VASYA_UI_SCALE задает масштаб явно)
+        self.ui_scale = self.detect_scale()
+        self.window_size = (round(WINDOW_WIDTH * self.ui_scale), round(WINDOW_HEIGHT * self.ui_scale))
+        self.resize_job = None
+        self.pending_size = None
+        self.geometry(self.center_window(*self.window_size))  # Устанавливаем размеры и центрируем окно
+        self.frames = OrderedDict()  # Уже построенные фреймы, от давно показанных к недавним
+        self.pinned_frames = set()  # Фреймы, которые никогда не выгружаются
+        # Имя выгруженного фрейма -> (содержимое полей ввода, прочее состояние из frame.extra_state)
+        self.frame_state = {}
+        # Сколько построенных фреймов держать в памяти (0 - без ограничения)
+        self.max_frames = int(os.environ.get("VASYA_MAX_FRAMES", DEFAULT_MAX_FRAMES))
+        self.frame_builders = {}  # Имя фрейма -> функция настройки
+        self.frame_links = {}  # Имя фрейма -> экраны, доступные с него
         self.current_frame = None
-        self.images = {}  # Словарь для хранения изображений
-        # Создаем папку для изображений, если её нет
-        if not os.path.exists("images"):
-            os.makedirs("images")
+        self.current_name = None
+        # Вызовы из фоновых потоков, выполняемые в главном потоке Tk
+        self.ui_queue = queue.SimpleQueue()
+        # Фоновое построение соседних экранов (VASYA_PREFETCH=0 отключает)
+        self.prefetch_enabled = os.environ.get("VASYA_PREFETCH", "1") != "0"
+        self.prefetch_job = None
+        # Анимация смены экранов (VASYA_TRANSITION=slide|fade, по умолчанию без анимации)
+        style = os.environ.get("VASYA_TRANSITION", "none")
+        self.transition_style = style if style in STYLES else None
+        self.transition = None
+        self.transition_stats = {"count": 0, "frames": 0, "dropped": 0, "interrupted": 0}
+        self.backgrounds = {}  # Имя фрейма -> (Label фона, имя изображения)
+        self.sms = None  # Клиент проверки кодов, создается при первом запросе
+        self.tiles = None  # Кэш тайлов карты, создается при первом показе карты
+        self.map_view = None
+        self.feedback = None  # Хранилище отзывов, открывается при первом показе экрана отзыва
+        self.excuses = None  # Библиотека отмазок, открывается при построении первого экрана с ней
+        # Сохраненный вход (VASYA_AUTH=0 отключает): проверяется локально, без сети
+        self.auth = SessionCache() if os.environ.get("VASYA_AUTH", "1") != "0" else None
+        # Телеметрия навигации (VASYA_TELEMETRY=0 отключает)
+        self.telemetry = None
+        if os.environ.get("VASYA_TELEMETRY", "1") != "0":
+            try:
+                self.telemetry = Telemetry()
+                RoundedButton.click_listener = self.record_click
+            except OSError as e:
+                print(f"Телеметрия отключена: {str(e)}")
+        # Создаем папку для изображений, если её нет и нет собранного пакета
+        if not os.path.exists(IMAGES_DIR) and not os.path.exists(ASSETS_BUNDLE):
+            os.makedirs(IMAGES_DIR)
             print("Создана папка images. Поместите туда ваши изображения.")
-        # Загрузка изображений
-        self.load_images()
-        # Создание всех фреймов
-        self.create_frames()
-        # Показываем начальный экран
-        self.show_frame("Registration")
+        # Подготовка ленивого хранилища изображений
+        with self.profiler.span("load_images", "startup"):
+            self.load_images()
+        # Регистрация фреймов (строятся по требованию)
+        with self.profiler.span("create_frames", "startup"):
+            self.create_frames()
+        # Показываем начальный экран, остальные фоны догружаются постепенно
+        self.poll_ui_queue()
+        self.show_frame(self.start_screen)
+        self.preload_images(self.start_screen)
         # Привязка клавиши Esc к выходу из приложения
         self.bind("<Escape>", self.exit_app)
+        self.bind("<Configure>", self.on_configure)
+        # Резидентный режим: окно прячется вместо закрытия, команды приходят через Unix-сокет
+        self.daemon = None
+        if daemon:
+            try:
+                self.daemon = DaemonServer(self.post, self.handle_command)
+            except (DaemonError, OSError) as e:
+                print(f"Резидентный режим недоступен: {str(e)}")
+                self.deiconify()
+        self.protocol("WM_DELETE_WINDOW", lambda: self.exit_app(None))
+        self.after_idle(self.profiler.instant, "first_idle", "startup")
 
     def load_images(self):
-        """Загружает все PNG изображения из папки images"""
+        """Создает хранилище изображений; декодирование происходит при показе экрана"""
+        budget = float(os.environ.get("VASYA_IMAGE_BUDGET_MB", DEFAULT_IMAGE_BUDGET_MB))
+        budget *= self.ui_scale ** 2  # Фоны под плотный экран крупнее пропорционально площади
+        # Единый пакет или манифест из build_assets предпочтительнее, иначе читаем папку images как есть
+        self.images = ImageStore(IMAGES_DIR, budget, manifest=ASSETS_MANIFEST, bundle=ASSETS_BUNDLE,
+                                 profiler=self.profiler)
+        self.loader = ImageLoader(self.images, self.post, self.on_image_ready)
+        print(f"Найдено изображений: {len(self.images.sources)}")
+
+    def post(self, callback, *args):
+        """Передает вызов в главный поток Tk; можно вызывать из любого потока"""
+        self.ui_queue.put((callback, args))
+
+    def poll_ui_queue(self):
+        """Выполняет накопившиеся вызовы, не занимая главный поток дольше бюджета"""
+        deadline = time.perf_counter() + UI_QUEUE_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                callback, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            # Ошибка одного обработчика не должна останавливать доставку остальных результатов
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Ошибка в обработчике {getattr(callback, '__qualname__', callback)}: {str(e)}")
+        self.after(UI_QUEUE_POLL_MS, self.poll_ui_queue)
+
+    def preload_images(self, start):
+        """Заказывает фоны экранов впрок, начиная с ближайших к стартовому"""
+        seen = {start}
+        order = [start]
+        for name in order:
+            for link in self.frame_links.get(name, ()):
+                if link not in seen:
+                    seen.add(link)
+                    order.append(link)
+        for name in order[1:]:
+            self.loader.request(name, urgent=False, size=self.window_size)
+
+    def on_image_ready(self, image_name):
+        """Подставляет готовый фон, если его экран сейчас на виду"""
+        if self.current_name in self.backgrounds:
+            bg_label, name = self.backgrounds[self.current_name]
+            img = self.images.lookup(name, self.window_size) if name == image_name else None
+            if img is not None:  # Копия под прежний размер окна не подходит, ждем нужную
+                bg_label.config(image=img)
+
+    def attach_background(self, frame_name):
+        """Подставляет фон экрана под текущий размер окна или заказывает его загрузку"""
+        if frame_name not in self.backgrounds:
+            return
+        bg_label, image_name = self.backgrounds[frame_name]
+        img = self.images.lookup(image_name, self.window_size)
+        if img is not None:
+            bg_label.config(image=img)
+        else:
+            # Экран показывается сразу, фон подставится в on_image_ready
+            self.loader.request(image_name, size=self.window_size)
+
+    def on_configure(self, event):
+        """Запоминает новый размер окна; перерисовка откладывается до конца перетаскивания"""
+        if event.widget is not self:
+            return  # <Configure> корня приходит и от всех дочерних виджетов
+        size = (event.width, event.height)
+        if size == self.window_size or size == self.pending_size:
+            return
+        self.pending_size = size
+        if self.resize_job:
+            self.after_cancel(self.resize_job)
+        self.resize_job = self.after(RESIZE_DEBOUNCE_MS, self.apply_resize)
+
+    def apply_resize(self):
+        """Подбирает фон под новый размер, только если сменилась ступень размера"""
+        self.resize_job = None
+        size, self.pending_size = self.pending_size, None
+        changed = size_bucket(size) != size_bucket(self.window_size)
+        self.window_size = size
+        if changed:
+            with self.profiler.span("resize", "frame") as span:
+                span.args.update(width=size[0], height=size[1])
+                self.attach_background(self.current_name)
+
+    def detect_scale(self):
+        """Масштаб интерфейса: из VASYA_UI_SCALE или по плотности экрана (1.0 при 96 dpi)"""
+        scale = os.environ.get("VASYA_UI_SCALE")
+        if scale:
+            return float(scale)
         try:
-            for filename in os.listdir("images"):
-                if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    name = os.path.splitext(filename)[0]
-                    try:
-                        img = PhotoImage(file=os.path.join("images", filename))
-                        self.images[name] = img
-                        print(f"Успешно загружено: {filename}")
-                    except Exception as e:
-                        print(f"Ошибка загрузки {filename}: {str(e)}")
-        except Exception as e:
-            print(f"Общая ошибка при загрузке изображений: {str(e)}")
+            # tk scaling - пикселей на типографский пункт; 96 dpi соответствует 96 / 72
+            scale = float(self.tk.call("tk", "scaling")) * 72 / 96
+        except Exception:
+            return 1.0
+        # Ступенями по 0.25, не меньше 1 и так, чтобы окно помещалось на экране
+        fit = self.winfo_screenheight() / WINDOW_HEIGHT
+        return max(1.0, min(round(scale * 4) / 4, int(fit * 4) / 4))
+
+    def create_background(self, frame, name, image_name=None):
+        """Создает фоновую метку; картинка подставляется в show_frame"""
+        image_name = image_name or name
+        if image_name not in self.images:
+            return None
+        bg_label = Label(frame)
+        bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+        self.backgrounds[name] = (bg_label, image_name)
+        return bg_label
 
     def create_frames(self):
-        """Создает все фреймы приложения"""
-        self.create_frame("Registration", self.create_registration_ui)
-        self.create_frame("log_in_to_the_app", self.create_login_ui)
-        self.create_frame("choose_a_situation", self.create_choose_a_situation_ui)
-        self.create_frame("Save_me_from_my_boss", self.create_save_me_from_my_boss_ui)
-        self.create_frame("required_time", self.create_required_time_ui)
-        self.create_frame("I_m_not_going_to_work_on_Saturday", self.create_saturday_ui)
-        self.create_frame("To_a_bar_with_friends", self.create_bar_ui)
-        self.create_frame("Feedback_end", self.create_feedback_ui)
-        self.create_frame("Phone_loss", self.create_phone_loss_ui)
-        self.create_frame("settings", self.create_settings_ui)
-        self.create_frame("Chief_scam_1", self.create_chief_scam_1_ui)
-        self.create_frame("boss", self.boss_ui)
-
-
-    def create_frame(self, name, setup_func):
-        """Создает фрейм с указанной функцией настройки"""
-        frame = Frame(self)
-        self.frames[name] = frame
-        setup_func(frame)
+        """Регистрирует экраны из scenarios.json; сами фреймы создаются при первом показе"""
+        self.scenario = load_scenario(SCENARIOS_FILE, SCENARIOS_CACHE)
+        # Переходы проверяет движок сценария; окно - один из его фронтендов, с одной сессией
+        self.engine = Engine(self.scenario)
+        # При действующем входе регистрация и вход не строятся и их фоны не декодируются
+        self.start_screen = self.scenario.start
+        if self.auth is not None and HOME_SCREEN in self.scenario.screens and self.auth.load() is not None:
+            self.start_screen = HOME_SCREEN
+        self.session = self.engine.start(self.start_screen)
+        # Тема кнопок (VASYA_THEME задает начальную, дальше переключается на экране настроек)
+        self.theme = ThemeSet(self.scenario.themes, os.environ.get("VASYA_THEME", DEFAULT_THEME))
+        # Без источника тайлов карта открывается в браузере: экран карты не регистрируется,
+        # поэтому не строится, не заказывается впрок и не запускает загрузчик тайлов
+        hidden = set() if tile_url() else {"map"}
+        for name, screen in self.scenario.screens.items():
+            if name in hidden:
+                continue
+            links = tuple(link for link in screen.links if link not in hidden)
+            self.register_frame(name, lambda frame, screen=screen: self.build_screen(frame, screen), links,
+                                pinned=screen.pinned)
+
+    def build_screen(self, frame, screen):
+        """Строит экран по его декларативному описанию"""
+        if screen.background:
+            self.create_background(frame, screen.name, screen.background)
+        for widget in screen.widgets:
+            if isinstance(widget, LabelSpec):
+                label = Label(frame, font=widget.font)
+                label.place(relx=widget.relx, rely=widget.rely, anchor=widget.anchor)
+                self.bind_text(label, widget.text)
+                continue
+            if isinstance(widget, ExcuseSpec):
+                self.create_excuse(frame, widget)
+                continue
+            button = RoundedButton(
+                frame,
+                text=widget.text,
+                style=self.theme.style(widget.style, widget.radius, widget.font),
+                command=self.make_action(widget.action, widget.target),
+                width=widget.width,
+                height=widget.height
+            )
+            button.place(relx=widget.relx, rely=widget.rely, anchor=widget.anchor)
+            self.bind_text(button, widget.text)
+        if screen.builder:
+            # Экраны со своей логикой достраиваются методом create_<builder>_ui
+            getattr(self, f"create_{screen.builder}_ui")(frame)
+
+    def create_excuse(self, frame, spec):
+        """Отмазка из библиотеки по тегам экрана, кнопки тона и "Другая" """
+        box = Frame(frame)
+        box.place(relx=spec.relx, rely=spec.rely, anchor=spec.anchor)
+        text_label = Label(box, text="", font=spec.font, wraplength=spec.width, justify="center")
+        text_label.pack(pady=(0, 10))
+        tone = [None]
+
+        def show_next():
+            tags = spec.tags + ((tone[0],) if tone[0] else ())
+            # Отмазки не переводятся: ключ без перевода показывается как есть
+            self.bind_text(text_label, self.get_excuses().text(tags) or "Подходящих отмазок нет")
+
+        def set_tone(tag):
+            tone[0] = tag
+            show_next()
+
+        row = Frame(box)
+        row.pack()
+        style = self.theme.style("primary", radius=15, font=("Arial", 10))
+        for title, tag in EXCUSE_TONES + (("Другая", None),):
+            command = show_next if tag is None else lambda tag=tag: set_tone(tag)
+            button = RoundedButton(row, text=title, style=style, width=80, height=30, command=command)
+            button.pack(side="left", padx=3)
+            self.bind_text(button, title)
+        show_next()
+
+    def get_excuses(self):
+        """Возвращает выбор отмазок, открывая (и при необходимости пересобирая) индекс при первом вызове"""
+        if self.excuses is None:
+            with self.profiler.span("excuses:open", "startup"):
+                self.excuses = ExcusePicker(open_library())
+        return self.excuses
+
+    def make_action(self, action, target):
+        """Возвращает обработчик кнопки для действия из описания экрана"""
+        if action == "go":
+            return lambda: self.navigate(target)
+        if action == "url":
+            return lambda: webbrowser.open(target)
+        if action == "map":
+            return lambda: self.open_map(*target)
+        if action == "theme":
+            return lambda: self.apply_theme(target)
+        if action == "locale":
+            return lambda: self.apply_locale(target)
+        return None
+
+    def apply_theme(self, name):
+        """Перекрашивает кнопки всех построенных экранов без их пересборки; возвращает число кнопок"""
+        with self.profiler.span(f"theme:{name}", "frame"):
+            self.theme.switch(name)
+            return RoundedButton.restyle_all(self.theme)
+
+    def tr(self, key, **kwargs):
+        return self.translator.gettext(key, **kwargs)
+
+    def bind_text(self, widget, key, **kwargs):
+        """Показывает сообщение в виджете и запоминает привязку, чтобы сменить язык на месте"""
+        frame = widget
+        while frame.master is not self:
+            frame = frame.master
+        self.bound_texts.setdefault(frame, {})[widget] = (key, kwargs)
+        self.show_text(widget, self.tr(key, **kwargs))
+
+    @staticmethod
+    def show_text(widget, text):
+        if isinstance(widget, RoundedButton):
+            widget.set_text(text)
+        else:
+            widget.config(text=text)
+
+    def apply_locale(self, locale):
+        """Переводит заголовок и тексты всех построенных экранов без их пересборки; возвращает число текстов"""
+        with self.profiler.span(f"locale:{locale}", "frame"):
+            self.translator.switch(locale)
+            self.title(self.tr("Гуляй, Вася!"))
+            count = 0
+            for bindings in self.bound_texts.values():
+                for widget, (key, kwargs) in bindings.items():
+                    self.show_text(widget, self.tr(key, **kwargs))
+                count += len(bindings)
+            return count
+
+    def open_map(self, lat, lon, zoom, url=None):
+        """Показывает встроенную карту в заданной точке; без источника тайлов открывает url в браузере"""
+        if tile_url() is None:
+            webbrowser.open(url or f"https://yandex.ru/maps/?ll={lon}%2C{lat}&z={zoom}")
+            return
+        self.navigate("map")
+        if self.map_view is not None and self.map_view.winfo_exists():
+            self.map_view.set_view(lat, lon, zoom)
+
+    def register_frame(self, name, setup_func, links=(), pinned=False):
+        """Запоминает функцию настройки фрейма и экраны, на которые с него можно перейти"""
+        self.frame_builders[name] = setup_func
+        self.frame_links[name] = tuple(links)
+        if pinned:
+            self.pinned_frames.add(name)
+
+    def create_frame(self, name):
+        """Создает фрейм с помощью зарегистрированной функции настройки"""
+        with self.profiler.span(f"build:{name}", "frame"):
+            frame = Frame(self)
+            self.frames[name] = frame
+            self.frame_builders[name](frame)
+            if name in self.frame_state:
+                values, extra = self.frame_state.pop(name)
+                self.restore_entries(frame, values)
+                if extra is not None and hasattr(frame, "extra_state"):
+                    frame.extra_state[1](extra)
+        return frame
+
+    def evict_frames(self):
+        """Уничтожает давно не показанные фреймы сверх лимита; они пересоберутся при показе"""
+        if not self.max_frames:
+            return
+        for name in list(self.frames):
+            if len(self.frames) <= self.max_frames:
+                break
+            if name == self.current_name or name in self.pinned_frames:
+                continue
+            frame = self.frames.pop(name)
+            # Сохраняем введенный текст и выбор пользователя, чтобы пересобранный экран выглядел так же;
+            # состояние вне полей ввода фрейм отдает через frame.extra_state = (получить, восстановить)
+            values = [entry_value(entry) for entry in self.find_entries(frame)]
+            extra = frame.extra_state[0]() if hasattr(frame, "extra_state") else None
+            if any(values) or extra is not None:
+                self.frame_state[name] = (values, extra)
+            if name in self.backgrounds:
+                _, image_name = self.backgrounds.pop(name)
+                self.images.release(image_name)
+            self.bound_texts.pop(frame, None)
+            frame.destroy()
+
+    def find_entries(self, widget):
+        """Возвращает поля ввода фрейма (Entry и Text) в порядке создания"""
+        entries = []
+        for child in widget.winfo_children():
+            if isinstance(child, (Entry, Text)):
+                entries.append(child)
+            entries.extend(self.find_entries(child))
+        return entries
+
+    def restore_entries(self, frame, values):
+        """Возвращает сохраненный текст в поля ввода пересобранного фрейма"""
+        for entry, value in zip(self.find_entries(frame), values):
+            if isinstance(entry, Text):
+                entry.delete("1.0", "end")
+                entry.insert("1.0", value)
+            else:
+                entry.delete(0, "end")
+                entry.insert(0, value)
+
+    def get_frame(self, name):
+        """Возвращает фрейм, создавая его при первом обращении"""
+        if name in self.frames:
+            return self.frames[name]
+        if name in self.frame_builders:
+            return self.create_frame(name)
+        return None
+
+    def schedule_prefetch(self, frame_name):
+        """Планирует построение соседних экранов в моменты простоя"""
+        if not self.prefetch_enabled:
+            return
+        if self.prefetch_job:
+            self.after_cancel(self.prefetch_job)
+            self.prefetch_job = None
+        pending = [name for name in self.frame_links.get(frame_name, ()) if name not in self.frames]
+        if pending:
+            self.prefetch_job = self.after_idle(self.prefetch_next, pending)
+
+    def prefetch_next(self, pending):
+        """Строит один фрейм за проход простоя, чтобы не задерживать ввод"""
+        self.prefetch_job = None
+        if self.transition is not None:
+            # Построение экрана посреди анимации сорвало бы бюджет кадра
+            self.prefetch_job = self.after(UI_QUEUE_POLL_MS, self.prefetch_next, pending)
+            return
+        if self.max_frames and len(self.frames) >= self.max_frames:
+            return  # Впрок строим только в пределах лимита, чтобы не вытеснять показанные экраны
+        while pending:
+            name = pending.pop(0)
+            if name not in self.frames:
+                self.create_frame(name)
+                break
+        if pending:
+            self.prefetch_job = self.after_idle(self.prefetch_next, pending)
+
+    def navigate(self, target):
+        """Переход по графу сценария: движок проверяет ребро, окно показывает экран"""
+        try:
+            self.engine.go(self.session, target)
+        except EngineError as e:
+            print(f"Переход отклонен: {str(e)}")
+            return
+        self.show_frame(target)
 
     def show_frame(self, frame_name):
         """Показывает указанный фрейм"""
-        if frame_name not in self.frames:
-            print(f"Фрейм {frame_name} не найден!")
+        with self.profiler.span(f"show:{frame_name}", "frame"):
+            frame = self.get_frame(frame_name)
+            if frame is None:
+                print(f"Фрейм {frame_name} не найден!")
+                return
+            with self.profiler.span("show:swap", "frame"):
+                if self.transition is not None:
+                    self.transition.finish(interrupted=True)  # Новый переход во время анимации
+                self.attach_background(frame_name)
+                if self.transition_style and self.current_frame is not None and self.current_frame is not frame:
+                    self.transition = Transition(self, self.current_frame, frame, self.transition_style,
+                                                 on_done=self.on_transition_done).start()
+                else:
+                    if self.current_frame:
+                        self.current_frame.pack_forget()
+                    frame.pack(fill="both", expand=True)
+            if self.telemetry:
+                previous = self.telemetry.intern(self.current_name or "")
+                self.telemetry.record(SHOW, self.telemetry.intern(frame_name), previous)
+            self.current_frame = frame
+            self.current_name = frame_name
+            self.frames.move_to_end(frame_name)
+            self.evict_frames()
+            self.schedule_prefetch(frame_name)
+
+    def on_transition_done(self, transition):
+        """Учитывает кадры и пропуски завершенной анимации"""
+        if self.transition is transition:
+            self.transition = None
+        stats = self.transition_stats
+        stats["count"] += 1
+        stats["frames"] += transition.frames
+        stats["dropped"] += transition.dropped
+        stats["interrupted"] += transition.interrupted
+        self.profiler.complete(f"transition:{transition.style}", "frame", transition.started,
+                               time.perf_counter(), transition.stats())
+
+    def remember_login(self, phone):
+        """Сохраняет вход, чтобы следующий запуск открылся сразу на главном экране"""
+        if self.auth is None:
             return
-        if self.current_frame:
-            self.current_frame.pack_forget()
-        frame = self.frames[frame_name]
-        frame.pack(fill="both", expand=True)
-        self.current_frame = frame
+        try:
+            self.auth.save(phone)
+        except OSError as e:
+            print(f"Не удалось сохранить вход: {str(e)}")
+
+    def get_tiles(self):
+        """Возвращает кэш тайлов карты; он переживает пересборку экрана карты"""
+        if self.tiles is None:
+            self.tiles = TileStore(self.post)
+        return self.tiles
+
+    def record_click(self, button):
+        """Записывает нажатие кнопки в телеметрию"""
+        telemetry = self.telemetry
+        telemetry.record(CLICK, telemetry.intern(self.current_name), telemetry.intern(button.text))
+
+    def get_feedback(self):
+        """Возвращает хранилище отзывов, запуская фоновый писатель при первом вызове"""
+        if self.feedback is None:
+            self.feedback = FeedbackStore()
+        return self.feedback
+
+    def get_sms(self):
+        """Возвращает клиент проверки кодов из SMS, запуская его фоновый поток при первом вызове"""
+        if self.sms is None:
+            self.sms = SmsVerifier(create_backend(), self.post)
+        return self.sms
+
+    def handle_command(self, command):
+        """Команда резидентному экземпляру (выполняется в главном потоке)"""
+        cmd = command.get("cmd")
+        if cmd == "ping":
+            return {"ok": True, "screen": self.current_name, "visible": self.state() != "withdrawn"}
+        if cmd == "hide":
+            self.withdraw()
+            return {"ok": True}
+        if cmd == "quit":
+            self.after_idle(self.shutdown)
+            return {"ok": True}
+        if cmd != "show":
+            return {"ok": False, "error": f"Неизвестная команда {cmd}"}
+        frame_name = command.get("frame")
+        if frame_name:
+            if frame_name not in self.frame_builders:
+                return {"ok": False, "error": f"Экран {frame_name} не найден"}
+            self.open_screen(frame_name)
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        return {"ok": True, "screen": self.current_name}
+
+    def open_screen(self, frame_name):
+        """Открывает экран по внешней ссылке: новая сессия движка начинается с этого экрана"""
+        self.engine.end(self.session)
+        self.session = self.engine.start(frame_name)
+        self.show_frame(frame_name)
 
     def exit_app(self, event):
-        """Закрывает приложение при нажатии клавиши Esc"""
+        """Esc и закрытие окна: в резидентном режиме окно прячется, иначе приложение завершается"""
+        if self.daemon is not None:
+            self.withdraw()
+            return
+        self.shutdown()
+
+    def shutdown(self):
+        """Освобождает ресурсы и завершает приложение"""
+        if self.daemon is not None:
+            self.daemon.close()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+            print(self.watchdog.summary())
+            try:
+                path = self.watchdog.save()
+                if path:
+                    print(f"Отчет о зависаниях: {path}")
+            except OSError as e:
+                print(f"Не удалось сохранить отчет о зависаниях: {str(e)}")
+        print(f"Статистика изображений: {self.images.stats()}")
+        print(f"Средняя задержка наведения: {RoundedButton.hover_latency() * 1e6:.1f} мкс")
+        if self.transition_style:
+            print(f"Статистика переходов: {self.transition_stats}")
+        self.loader.stop()
+        if self.sms is not None:
+            self.sms.close()
+        if self.feedback is not None:
+            self.feedback.close()  # Дописываем очередь отзывов
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.tiles is not None:
+            print(f"Статистика тайлов: {self.tiles.stats()}")
+            self.tiles.close()
+        self.translator.close()
         self.destroy()
 
     def center_window(self, width, height):
@@ -157,84 +1106,93 @@ class App(Tk):
         y = (screen_height - height) // 2
         return f"{width}x{height}+{x}+{y}"
 
-    def create_registration_ui(self, frame):
-        """Настройка UI для экрана регистрации"""
-        if "Registration" in self.images:
-            bg_label = Label(frame, image=self.images["Registration"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-        RoundedButton(
-            frame,
-            text="Регистрация",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
-            radius=25,
-            command=lambda: self.show_frame("log_in_to_the_app"),
-            width=300,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
     def create_login_ui(self, frame):
-        """Настройка UI для входа"""
-        if "log_in_to_the_app" in self.images:
-            bg_label = Label(frame, image=self.images["log_in_to_the_app"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
+        """Поля ввода и кнопки экрана входа (фон задан в scenarios.json)"""
         # Поле ввода телефона
         phone_entry = Entry(frame, font=("Arial", 12))
         phone_entry.place(relx=0.6, rely=0.72, anchor="center", width=165, height=15)
         # Поле ввода кода из SMS
         sms_entry = Entry(frame, font=("Arial", 12))
         sms_entry.place(relx=0.55, rely=0.78, anchor="center", width=75, height=15)
+        # Строка состояния вместо модальных окон: главный цикл не блокируется
+        status_label = Label(frame, text="", font=("Arial", 10))
+        status_label.place(relx=0.5, rely=0.965, anchor="center")
+        pending = set()  # Запросы, ответ на которые еще не пришел
+
+        def show_status(key, color="black", **kwargs):
+            if status_label.winfo_exists():
+                self.bind_text(status_label, key, **kwargs)
+                status_label.config(fg=color)
+
         # Функция отправки кода
         def send_sms_code():
             phone = phone_entry.get().strip()
             if not phone:
-                messagebox.showerror("Ошибка", "Введите номер телефона")
-            else:
+                show_status("Введите номер телефона", "red")
+            elif "send" not in pending:
+                pending.add("send")
+                show_status("Отправляем код...")
+                self.get_sms().send_code(phone, lambda result, error: on_code_sent(phone, result, error))
+
+        # Ответы приходят асинхронно: экран входа мог быть выгружен, поэтому номер передается
+        # из момента запроса, а не читается из поля ввода
+        def on_code_sent(phone, result, error):
+            pending.discard("send")
+            if error is not None:
+                show_status(str(error), "red")
+                return
+            if result.get("code") and sms_entry.winfo_exists():
+                # Имитация сервиса возвращает код - подставляем его, как раньше
                 sms_entry.delete(0, "end")
-                sms_entry.insert(0, "1515")  # Имитация отправки кода
-                messagebox.showinfo("Успех", f"Код отправлен на номер: {phone}")
+                sms_entry.insert(0, result["code"])
+            show_status("Код отправлен на номер: {phone}", "dark green", phone=phone)
 
         # Кнопка отправки кода
         send_code_button = RoundedButton(
             frame,
             text="Отправить код по SMS",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
+            style=self.theme.style("primary"),
             command=send_sms_code,
             width=200,
             height=30
         )
         send_code_button.place(relx=0.5, rely=0.82, anchor="center")
+        self.bind_text(send_code_button, send_code_button.text)
 
         # Кнопка "Гоу ходить"
         def validate_and_proceed():
             phone_number = phone_entry.get().strip()
             code = sms_entry.get().strip()
             if not phone_number:
-                messagebox.showerror("Ошибка", "Введите номер телефона")
+                show_status("Введите номер телефона", "red")
             elif not code:
-                messagebox.showerror("Ошибка", "Введите код из SMS")
-            elif code != "1515":
-                messagebox.showerror("Ошибка", "Неверный код из SMS")
+                show_status("Введите код из SMS", "red")
+            elif "verify" not in pending:
+                pending.add("verify")
+                show_status("Проверяем код...")
+                self.get_sms().verify(phone_number, code, lambda ok, error: on_verified(phone_number, ok, error))
+
+        def on_verified(phone, ok, error):
+            pending.discard("verify")
+            if error is not None:
+                show_status(str(error), "red")
+            elif not ok:
+                show_status("Неверный код из SMS", "red")
             else:
-                self.show_frame("choose_a_situation")
+                show_status("")
+                self.remember_login(phone)
+                self.navigate(HOME_SCREEN)
 
         go_button = RoundedButton(
             frame,
             text="Гоу ходить",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
+            style=self.theme.style("primary"),
             command=validate_and_proceed,
             width=350,
             height=45
         )
         go_button.place(relx=0.5, rely=0.9, anchor="center")
+        self.bind_text(go_button, go_button.text)
 
         # Автоматический фокус при наведении на поле ввода телефона
         def focus_phone(event):
@@ -248,350 +1206,101 @@ class App(Tk):
 
         sms_entry.bind("<Enter>", focus_sms)  # Привязываем событие <Enter> к фокусу
 
-    def create_choose_a_situation_ui(self, frame):
-        """Настройка UI выбора ситуаций"""
-        if "choose_a_situation" in self.images:
-            bg_label = Label(frame, image=self.images["choose_a_situation"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-
-        # Кнопка настроек (шестерёнка)
-        def create_gear_button():
-            gear_button = RoundedButton(
-                frame,
-                text="⚙️",
-                bg="white",
-                fg="black",
-                active_bg="black",
-                active_fg="white",
-                radius=25,
-                command=lambda: self.show_frame("settings"),
-                width=20,
-                height=30
-            )
-            gear_button.place(relx=0.1, rely=0.07, anchor="center")
-
-        create_gear_button()
-
-        # Кнопка "Проспал на работу"
-        def create_late_for_work_button():
-            late_for_work_button = RoundedButton(
-                frame,
-                text="Проспал на работу",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("Save_me_from_my_boss"),
-                width=300,
-                height=50
-            )
-            late_for_work_button.place(relx=0.5, rely=0.2, anchor="center")
-
-        create_late_for_work_button()
-
-        # Кнопка "Горит дедлайн"
-        def create_deadline_button():
-            deadline_button = RoundedButton(
-                frame,
-                text="Горит дедлайн",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("required_time"),
-                width=300,
-                height=50
-            )
-            deadline_button.place(relx=0.5, rely=0.3, anchor="center")
-
-        create_deadline_button()
-
-        # Кнопка "Выход в субботу"
-        def create_saturday_button():
-            saturday_button = RoundedButton(
-                frame,
-                text="Выход в субботу",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("I_m_not_going_to_work_on_Saturday"),
-                width=300,
-                height=50
-            )
-            saturday_button.place(relx=0.5, rely=0.4, anchor="center")
-
-        create_saturday_button()
-
-        # Кнопка "Гуляем с друзьями"
-        def create_friends_button():
-            friends_button = RoundedButton(
-                frame,
-                text="Гуляем с друзьями",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("To_a_bar_with_friends"),
-                width=300,
-                height=50
-            )
-            friends_button.place(relx=0.5, rely=0.5, anchor="center")
-
-        create_friends_button()
-
-        # Кнопка "Оставить отзыв"
-        def create_feedback_button():
-            feedback_button = RoundedButton(
-                frame,
-                text="Оставить отзыв",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("Feedback_end"),
-                width=300,
-                height=50
-            )
-            feedback_button.place(relx=0.5, rely=0.6, anchor="center")
-
-        create_feedback_button()
-
-        # Кнопка "создать свою карту"
-        import webbrowser  # Импортируем модуль для работы с браузером
-
-        # Кнопка "Создать свою карту"
-        def create_custom_map_button():
-            def open_yandex_maps():
-                """Открывает Яндекс.Карты в браузере"""
-                webbrowser.open("https://yandex.ru/maps/ ")
-
-            custom_map_button = RoundedButton(
-                frame,
-                text="Создать свою карту",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                radius=25,
-                command=open_yandex_maps,  # Вызываем функцию для открытия Яндекс.Карт
-                width=300,
-                height=50
-            )
-            custom_map_button.place(relx=0.5, rely=0.7, anchor="center")
-
-        create_custom_map_button()
-        # Кнопка "Потерял телефон"
-        def create_phone_loss_button():
-            phone_loss_button = RoundedButton(
-                frame,
-                text="Потерял телефон",
-                bg="red",
-                fg="white",
-                active_bg="dark red",
-                active_fg="black",
-                radius=25,
-                command=lambda: self.show_frame("Phone_loss"),
-                width=300,
-                height=50
-            )
-            phone_loss_button.place(relx=0.5, rely=0.9, anchor="center")
-
-        create_phone_loss_button()
-    def create_save_me_from_my_boss_ui(self, frame):
-        """Экран 'Проспал на работу'"""
-        if "Save_me_from_my_boss" in self.images:
-            bg_label = Label(frame, image=self.images["Save_me_from_my_boss"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-
-
-
-        def create_custom_map_button():
-            def open_yandex_traffic():
-                """Открывает Яндекс.Пробки в браузере"""
-                url = "https://yandex.ru/maps/2/saint-petersburg/probki/?ll=30.314997%2C59.938784&z=11/ "
-                webbrowser.open(url)  # Открываем ссылку в браузере
-
-            custom_map_button = RoundedButton(
-                frame,
-                text="Выбрать самую большую пробку",
-                bg="green",
-                fg="white",
-                active_bg="dark green",
-                active_fg="black",
-                command=open_yandex_traffic,  # Вызываем функцию для открытия Яндекс.Пробок
-                width=350,
-                height=50
-            )
-            custom_map_button.place(relx=0.5, rely=0.8, anchor="center")
-
-        create_custom_map_button()
-
-        Label(frame, text="", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
-        RoundedButton(
-            frame,
-            text="Scam",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
-            command=lambda: self.show_frame("Chief_scam_1"),
-            width=350,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
-    def create_chief_scam_1_ui(self, frame):
-        """Настройка UI для экрана 'Chief_scam_1'"""
-        if "Chief_scam_1" in self.images:
-            bg_label = Label(frame, image=self.images["Chief_scam_1"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-
-        # Пример кнопки "Назад"
-        RoundedButton(
-            frame,
-            text="←",
-            bg="",
-            fg="black",
-            active_bg="",
-            active_fg="grey",
-            radius=25,
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=30,
-            height=30
-        ).place(relx=0.1, rely=0.1, anchor="center")
-
-        # Пример кнопки "Вы в пути"
-        RoundedButton(
-            frame,
-            text="Вы в пути",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
-            radius=25,
-            command=lambda: self.show_frame("boss"),
-            width=150,
-            height=30
-        ).place(relx=0.22, rely=0.71, anchor="center")
-
-    def boss_ui(self, frame):
-        """Настройка UI для экрана 'boss'"""
-        if "boss" in self.images:
-            bg_label = Label(frame, image=self.images["boss"])
-            bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-
-        # Пример кнопки "Назад" с уменьшенным шрифтом
-        RoundedButton(
-            frame,
-            text="Сидим с котом за столом,"
-                 "я и он, прямо в субботу",
-            bg="green",
-            fg="white",
-            active_bg="dark green",
-            active_fg="black",
-            radius=25,
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=370,
-            height=50,
-            font=("Arial", 12)  # Уменьшаем размер шрифта до 10 для этой кнопки
-        ).place(relx=0.5, rely=0.7, anchor="center")
-
-    def create_required_time_ui(self, frame):
-        """Экран 'Горит дедлайн'"""
-        Label(frame, text="Горит дедлайн", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
-        RoundedButton(
-            frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
-    def create_saturday_ui(self, frame):
-        """Экран 'Выход в субботу'"""
-        Label(frame, text="Выход в субботу", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
-        RoundedButton(
-            frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
-    def create_bar_ui(self, frame):
-        """Экран 'Гуляем с друзьями'"""
-        Label(frame, text="Гуляем с друзьями", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
-        RoundedButton(
-            frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
     def create_feedback_ui(self, frame):
-        """Экран 'Оставить отзыв'"""
-        Label(frame, text="Оставить отзыв", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
-        RoundedButton(
+        """Текст и оценка отзыва; запись идет в фоне и не задерживает интерфейс"""
+        text_box = Text(frame, font=("Arial", 12), wrap="word", height=8)
+        text_box.place(relx=0.5, rely=0.32, anchor="center", relwidth=0.85)
+        rating = {"value": None}
+        rating_label = Label(frame, font=("Arial", 12))
+        rating_label.place(relx=0.5, rely=0.49, anchor="center")
+        self.bind_text(rating_label, "Оценка: -")
+
+        def set_rating(value):
+            rating["value"] = value
+            self.bind_text(rating_label, "Оценка: {value}", value=value)
+
+        # Оценка не хранится в поле ввода: при выгрузке фрейма ее сохраняет evict_frames
+        frame.extra_state = (lambda: rating["value"], set_rating)
+
+        for value in range(1, 6):
+            RoundedButton(
+                frame,
+                text=str(value),
+                style=self.theme.style("gear", radius=20),
+                command=lambda value=value: set_rating(value),
+                width=40,
+                height=40
+            ).place(relx=0.2 + 0.15 * (value - 1), rely=0.56, anchor="center")
+
+        status_label = Label(frame, text="", font=("Arial", 10))
+        status_label.place(relx=0.5, rely=0.72, anchor="center")
+
+        def submit():
+            text = text_box.get("1.0", "end").strip()
+            if not text and rating["value"] is None:
+                self.bind_text(status_label, "Напишите отзыв или поставьте оценку")
+                status_label.config(fg="red")
+                return
+            self.get_feedback().submit(text, rating["value"])
+            text_box.delete("1.0", "end")
+            rating["value"] = None
+            self.bind_text(rating_label, "Оценка: -")
+            self.bind_text(status_label, "Спасибо за отзыв!")
+            status_label.config(fg="dark green")
+
+        submit_button = RoundedButton(
             frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
+            text="Отправить",
+            style=self.theme.style("primary"),
+            command=submit,
             width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
-    def create_phone_loss_ui(self, frame):
-        """Экран 'Потерял телефон'"""
-        Label(frame, text="Потерял телефон", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
+            height=40
+        )
+        submit_button.place(relx=0.5, rely=0.65, anchor="center")
+        self.bind_text(submit_button, submit_button.text)
+
+    def create_map_ui(self, frame):
+        """Встроенная карта вместо открытия Яндекс.Карт в браузере"""
+        view = MapView(frame, self.get_tiles())
+        view.place(x=0, y=0, relwidth=1, relheight=0.9)
+        self.map_view = view
+        # Кнопки масштаба поверх карты
         RoundedButton(
             frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
-
-    def create_settings_ui(self, frame):
-        """Экран 'Настройки'"""
-        Label(frame, text="Настройки", font=("Arial", 20)).place(relx=0.5, rely=0.1, anchor="center")
+            text="+",
+            style=self.theme.style("gear", radius=20),
+            command=lambda: view.zoom_by(1),
+            width=40,
+            height=40
+        ).place(relx=0.9, rely=0.06, anchor="center")
         RoundedButton(
             frame,
-            text="Назад",
-            bg="blue",
-            fg="white",
-            active_bg="dark blue",
-            active_fg="black",
-            command=lambda: self.show_frame("choose_a_situation"),
-            width=200,
-            height=50
-        ).place(relx=0.5, rely=0.9, anchor="center")
+            text="−",
+            style=self.theme.style("gear", radius=20),
+            command=lambda: view.zoom_by(-1),
+            width=40,
+            height=40
+        ).place(relx=0.9, rely=0.12, anchor="center")
+
+
+def parse_args(argv=None):
+    """Разбирает параметры командной строки"""
+    parser = argparse.ArgumentParser(description="Гуляй, Вася!")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="записать трассу запуска и навигации (.json - Chrome trace, .jsonl - по строкам)")
+    parser.add_argument("--logout", action="store_true", help="забыть сохраненный вход и начать с регистрации")
+    parser.add_argument("--watchdog", action="store_true",
+                        help="следить за зависаниями главного цикла и сохранить отчет со стеками")
+    parser.add_argument("--daemon", action="store_true",
+                        help="остаться в памяти скрытым и принимать команды launch.py через Unix-сокет")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    app = App()
-    app.mainloop()
\ No newline at end of file
+    args = parse_args()
+    if args.logout:
+        SessionCache().clear()
+    app = App(profiler=Profiler(args.profile) if args.profile else None, daemon=args.daemon,
+              watchdog=args.watchdog)
+    app.mainloop()
+    app.profiler.finish()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Замеры времени запуска и навигации в формате Chrome trace events.
+
+Включается переменной окружения VASYA_PROFILE=<файл> или флагом --profile <файл>.
+Файл с расширением .jsonl пишется построчно, иначе - как JSON для chrome://tracing и Perfetto.
+"""
+import json
+import os
+import threading
+import time
+
+
+class NullSpan:
+    """Пустой замер: используется, когда профилирование выключено"""
+    __slots__ = ()
+    args = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """Замер одной фазы; в args можно дописать подробности (размеры, имена)"""
+    __slots__ = ("profiler", "name", "category", "args", "started")
+
+    def __init__(self, profiler, name, category, args):
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.args = args
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.complete(self.name, self.category, self.started, time.perf_counter(), self.args)
+        return False
+
+
+class Profiler:
+    """Собирает длительности фаз и событий; при выключенном режиме почти ничего не стоит"""
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = path is not None
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("VASYA_PROFILE") or None)
+
+    def span(self, name, category="app", **args):
+        """Контекстный менеджер, замеряющий длительность блока"""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, category, args)
+
+    def complete(self, name, category, started, finished, args=None):
+        """Добавляет завершенную фазу (можно вызывать из любого потока)"""
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round((finished - started) * 1e6, 1),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    def instant(self, name, category="app", **args):
+        """Отмечает момент времени (например, первый простой главного цикла)"""
+        if not self.enabled:
+            return
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "i",
+            "s": "p",
+            "ts": round((time.perf_counter() - self.origin) * 1e6, 1),
+            "pid": self.pid,
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    def save(self):
+        """Записывает трассу в файл"""
+        if not self.enabled:
+            return
+        events = list(self.events)
+        with open(self.path, "w", encoding="utf-8") as f:
+            if self.path.endswith(".jsonl"):
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+            else:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+    def summary(self):
+        """Сводка по фазам: число вызовов, суммарное, среднее и максимальное время (мс)"""
+        rows = {}
+        for event in list(self.events):
+            if event["ph"] != "X":
+                continue
+            count, total, worst = rows.get(event["name"], (0, 0.0, 0.0))
+            duration = event["dur"] / 1000
+            rows[event["name"]] = (count + 1, total + duration, max(worst, duration))
+        lines = [f"{'Фаза':<40}{'Вызовов':>8}{'Всего, мс':>12}{'Среднее':>10}{'Макс':>10}"]
+        for name, (count, total, worst) in sorted(rows.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name[:40]:<40}{count:>8}{total:>12.2f}{total / count:>10.2f}{worst:>10.2f}")
+        for event in self.events:
+            if event["ph"] == "i":
+                lines.append(f"{event['name']}: {event['ts'] / 1000:.2f} мс от старта")
+        return "\n".join(lines)
+
+    def finish(self):
+        """Сохраняет трассу и печатает сводку при выходе"""
+        if not self.enabled:
+            return
+        self.save()
+        print(self.summary())
+        print(f"Трасса сохранена в {self.path}")
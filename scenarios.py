@@ -0,0 +1,166 @@
+"""Декларативное описание экранов: разбор scenarios.json и кэш скомпилированного графа"""
+import json
+import marshal
+import os
+from collections import namedtuple
+
+from i18n import LOCALES_DIR, locale_names
+
+# Увеличивается при любом изменении скомпилированного формата
+CACHE_VERSION = 5
+
+DEFAULT_FONT = ("Arial", 14)
+DEFAULT_RADIUS = 40
+DEFAULT_COLORS = {"bg": "green", "fg": "white", "active_bg": "dark green", "active_fg": "black"}
+# Тема из раздела styles; остальные темы (раздел themes) переопределяют ее роли
+DEFAULT_THEME = "classic"
+
+Scenario = namedtuple("Scenario", "start screens themes")
+Screen = namedtuple("Screen", "name background widgets builder links pinned")
+ButtonSpec = namedtuple(
+    "ButtonSpec",
+    "text style radius width height font relx rely anchor action target",
+)
+LabelSpec = namedtuple("LabelSpec", "text font relx rely anchor")
+# Случайная отмазка из библиотеки excuses по тегам, с выбором тона и кнопкой "Другая"
+ExcuseSpec = namedtuple("ExcuseSpec", "tags font relx rely anchor width")
+
+
+WIDGET_SPECS = {"button": ButtonSpec, "label": LabelSpec, "excuse": ExcuseSpec}
+
+
+def compile_colors(colors):
+    """Цвета стиля в порядке bg, fg, active_bg, active_fg"""
+    merged = dict(DEFAULT_COLORS)
+    merged.update(colors)
+    return (merged["bg"], merged["fg"], merged["active_bg"], merged["active_fg"])
+
+
+def compile_themes(data):
+    """Таблицы цветов тем: (имя темы, ((роль, цвета), ...)); роли без переопределения берутся из styles"""
+    base = {role: compile_colors(colors) for role, colors in data.get("styles", {}).items()}
+    themes = [(DEFAULT_THEME, tuple(base.items()))]
+    for name, styles in data.get("themes", {}).items():
+        unknown = set(styles) - set(base)
+        if unknown:
+            raise ValueError(f"Тема {name} переопределяет неизвестные стили: {', '.join(sorted(unknown))}")
+        table = dict(base)
+        table.update({role: compile_colors(dict(zip(DEFAULT_COLORS, base[role]), **colors))
+                      for role, colors in styles.items()})
+        themes.append((name, tuple(table.items())))
+    return tuple(themes)
+
+
+def compile_widget(screen_name, widget, styles, themes, locales):
+    """Переводит описание элемента в кортеж без словарей"""
+    kind = widget.get("type", "button")
+    relx, rely = widget.get("place", (0.5, 0.5))
+    anchor = widget.get("anchor", "center")
+    font = tuple(widget.get("font", DEFAULT_FONT))
+    if kind == "label":
+        return ("label", widget.get("text", ""), font, relx, rely, anchor)
+    if kind == "excuse":
+        return ("excuse", tuple(widget.get("tags", ())), font, relx, rely, anchor, widget.get("width", 340))
+    if kind != "button":
+        raise ValueError(f"Неизвестный тип элемента '{kind}' на экране {screen_name}")
+    # Цвета кнопок задаются только стилями: иначе кнопку нельзя перекрасить сменой темы
+    if any(key in widget for key in DEFAULT_COLORS):
+        raise ValueError(f"Цвета кнопки на экране {screen_name} задаются через styles, а не в самой кнопке")
+    style = widget.get("style", "primary")
+    if style not in styles:
+        raise ValueError(f"Неизвестный стиль '{style}' на экране {screen_name}")
+    if "go" in widget:
+        action, target = "go", widget["go"]
+    elif "map" in widget:
+        # Точка и масштаб для встроенной карты: [широта, долгота, zoom]; url открывается в браузере,
+        # если источник тайлов не настроен
+        action, target = "map", tuple(widget["map"]) + (widget.get("url"),)
+    elif "url" in widget:
+        action, target = "url", widget["url"]
+    elif "theme" in widget:
+        if widget["theme"] not in themes:
+            raise ValueError(f"Неизвестная тема '{widget['theme']}' на экране {screen_name}")
+        action, target = "theme", widget["theme"]
+    elif "locale" in widget:
+        if widget["locale"] not in locales:
+            raise ValueError(f"Нет перевода на язык '{widget['locale']}' на экране {screen_name}")
+        action, target = "locale", widget["locale"]
+    else:
+        action, target = None, None
+    return (
+        "button", widget.get("text", ""), style,
+        widget.get("radius", DEFAULT_RADIUS), widget.get("width", 200), widget.get("height", 50),
+        font, relx, rely, anchor, action, target,
+    )
+
+
+def compile_scenario(data, locales=None):
+    """Проверяет описание и сворачивает его в компактную форму из кортежей.
+
+    locales - языки, на которые могут переключать кнопки (по умолчанию из locales/)
+    """
+    if locales is None:
+        locales = locale_names()
+    styles = dict(data.get("styles", {}))
+    styles.setdefault("primary", DEFAULT_COLORS)
+    data = dict(data, styles=styles)
+    themes = compile_themes(data)
+    theme_names = {theme[0] for theme in themes}
+    screens = []
+    for name, spec in data["screens"].items():
+        widgets = tuple(compile_widget(name, widget, styles, theme_names, locales) for widget in spec.get("widgets", ()))
+        links = list(spec.get("links", ()))
+        for widget in widgets:
+            if widget[0] != "button":
+                continue
+            target = {"go": widget[-1], "map": "map"}.get(widget[-2])
+            if target and target not in links:
+                links.append(target)
+        screens.append((name, spec.get("background"), widgets, spec.get("builder"), tuple(links),
+                        bool(spec.get("pin", False))))
+    names = {screen[0] for screen in screens}
+    for name, _, _, _, links, _ in screens:
+        for link in links:
+            if link not in names:
+                raise ValueError(f"Экран {name} ссылается на неизвестный экран {link}")
+    start = data.get("start", screens[0][0] if screens else None)
+    if start not in names:
+        raise ValueError(f"Стартовый экран {start} не описан")
+    return (start, tuple(screens), themes)
+
+
+def inflate(compiled):
+    """Оборачивает скомпилированные кортежи в именованные"""
+    start, screens, themes = compiled
+    result = {}
+    for name, background, widgets, builder, links, pinned in screens:
+        specs = tuple(WIDGET_SPECS[widget[0]](*widget[1:]) for widget in widgets)
+        result[name] = Screen(name, background, specs, builder, links, pinned)
+    return Scenario(start, result, {name: dict(table) for name, table in themes})
+
+
+def load_scenario(path, cache_path=None, locales_dir=LOCALES_DIR):
+    """Загружает граф экранов, используя кэш, пока не менялись исходный файл и набор языков"""
+    stat = os.stat(path)
+    locales = locale_names(locales_dir)
+    key = (CACHE_VERSION, stat.st_mtime_ns, stat.st_size, tuple(sorted(locales)))
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached_key, compiled = marshal.load(f)
+            if cached_key == key:
+                return inflate(compiled)
+        except Exception as e:
+            print(f"Кэш сценариев поврежден, пересобираем: {str(e)}")
+    with open(path, encoding="utf-8") as f:
+        compiled = compile_scenario(json.load(f), locales)
+    if cache_path:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump((key, compiled), f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Не удалось сохранить кэш сценариев: {str(e)}")
+    return inflate(compiled)
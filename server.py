@@ -0,0 +1,303 @@
+"""Серверный режим: множество независимых сессий сценария по HTTP и WebSocket.
+
+API (JSON, HTTP/1.1 с keep-alive):
+    POST   /sessions               {"screen": необязательно} -> состояние новой сессии
+    GET    /sessions/<id>          -> состояние
+    POST   /sessions/<id>/go       {"target": экран}
+    POST   /sessions/<id>/press    {"index": номер кнопки}
+    DELETE /sessions/<id>
+    GET    /stats
+    GET    /ws                     WebSocket: {"op": "start" | "go" | "press" | "state", ...} -> состояние
+
+С --workers N соединения принимают N процессов с общим сокетом; сессия живет в процессе,
+который ее создал, поэтому клиент держит соединение открытым (keep-alive или WebSocket).
+id сессии содержит номер процесса и случайный токен: другой процесс отвечает на него 421,
+несуществующий или закрытый id - 404.
+
+Запуск: python -m server [--host 127.0.0.1] [--port 8770] [--workers 1]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import struct
+import sys
+
+from engine import PREFIX_BITS, Engine, EngineError, ForeignSession, UnknownSession
+from scenarios import load_scenario
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS_FILE = os.path.join(BASE_DIR, "scenarios.json")
+SCENARIOS_CACHE = os.path.join(BASE_DIR, "__pycache__", "scenarios.cache")
+DEFAULT_PORT = 8770
+SESSION_TTL = 1800  # Сессия без запросов дольше этого закрывается, с
+SWEEP_INTERVAL = 60
+MAX_BODY = 64 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+           413: "Payload Too Large", 421: "Misdirected Request"}
+
+# Коды операций WebSocket
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+
+
+def ws_accept_key(key):
+    return base64.b64encode(hashlib.sha1((key + WS_GUID).encode("ascii")).digest()).decode("ascii")
+
+
+def ws_frame(opcode, data):
+    """Кадр WebSocket от сервера (без маски, одним фрагментом)"""
+    length = len(data)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + data
+
+
+async def ws_read(reader):
+    """Читает кадр клиента; возвращает (код операции, данные без маски)"""
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise ValueError("Слишком длинное сообщение")
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    data = await reader.readexactly(length)
+    if mask and length:
+        # Снимаем маску одной операцией над большими целыми вместо цикла по байтам
+        key = (mask * (length // 4 + 1))[:length]
+        data = (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(length, "big")
+    return opcode, data
+
+
+class ScenarioServer:
+    """Сессии одного процесса и обработка их запросов"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.connections = 0
+        self.requests = 0
+
+    def command(self, op, session, payload):
+        """Общая логика HTTP и WebSocket; возвращает (статус, ответ)"""
+        engine = self.engine
+        self.requests += 1
+        if op == "start":
+            return 201, engine.view(engine.start(payload.get("screen")))
+        if op == "state":
+            return 200, engine.view(session)
+        if op == "go":
+            engine.go(session, str(payload["target"]))
+            return 200, engine.view(session)
+        if op == "press":
+            action, target = engine.press(session, int(payload["index"]))
+            view = engine.view(session)
+            view["action"], view["target"] = action, list(target) if isinstance(target, tuple) else target
+            return 200, view
+        if op == "end":
+            engine.end(session)
+            return 200, {"ok": True}
+        return 404, {"error": f"Неизвестная операция {op}"}
+
+    def safe_command(self, op, session, payload):
+        try:
+            return self.command(op, session, payload)
+        except ForeignSession as e:
+            return 421, {"error": str(e)}
+        except UnknownSession as e:
+            return 404, {"error": str(e)}
+        except EngineError as e:
+            return 409, {"error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"error": f"Некорректный запрос: {e}"}
+
+    def route(self, method, path, payload):
+        """Переводит HTTP-запрос в операцию движка"""
+        parts = path.split("?", 1)[0].strip("/").split("/")
+        if parts == ["stats"] and method == "GET":
+            return 200, self.stats()
+        if parts[0] != "sessions":
+            return 404, {"error": "Неизвестный адрес"}
+        if len(parts) == 1:
+            return self.safe_command("start", None, payload) if method == "POST" else (404, {"error": "Нет метода"})
+        session = parts[1]
+        if len(parts) == 2:
+            op = {"GET": "state", "DELETE": "end"}.get(method)
+        elif len(parts) == 3 and method == "POST":
+            op = parts[2] if parts[2] in ("go", "press") else None
+        else:
+            op = None
+        if op is None:
+            return 404, {"error": "Неизвестный адрес"}
+        return self.safe_command(op, session, payload)
+
+    def stats(self):
+        return {"pid": os.getpid(), "sessions": self.engine.sessions.live, "transitions": self.engine.transitions,
+                "requests": self.requests, "connections": self.connections}
+
+    async def handle(self, reader, writer):
+        """Соединение HTTP/1.1: запросы по очереди, пока клиент не закроет его"""
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self.websocket(reader, writer, headers)
+                    return
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    status, payload = 413, {"error": "Слишком большой запрос"}
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        payload = json.loads(body) if body else {}
+                        status, payload = self.route(method, path, payload if isinstance(payload, dict) else {})
+                    except ValueError:
+                        status, payload = 400, {"error": "Некорректный JSON"}
+                close = headers.get("connection", "").lower() == "close" or status == 413
+                self.reply(writer, status, payload, close)
+                await writer.drain()
+                if close:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    def reply(self, writer, status, payload, close=False):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode("ascii") + body
+        )
+
+    async def websocket(self, reader, writer, headers):
+        """Сессия, привязанная к соединению WebSocket; закрывается вместе с ним"""
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept_key(headers.get('sec-websocket-key', ''))}\r\n\r\n"
+            .encode("ascii")
+        )
+        session = None
+        try:
+            while True:
+                opcode, data = await ws_read(reader)
+                if opcode == WS_CLOSE:
+                    writer.write(ws_frame(WS_CLOSE, data[:2]))
+                    return
+                if opcode == WS_PING:
+                    writer.write(ws_frame(WS_PONG, data))
+                    continue
+                if opcode != WS_TEXT:
+                    continue
+                try:
+                    message = json.loads(data)
+                    op = message.get("op", "state")
+                except (ValueError, AttributeError):
+                    message, op = {}, None
+                if op == "start" and session is not None:
+                    self.safe_command("end", session, {})
+                status, payload = self.safe_command(op, session, message)
+                if op == "start" and status == 201:
+                    session = payload["session"]
+                payload["status"] = status
+                writer.write(ws_frame(WS_TEXT, json.dumps(payload, ensure_ascii=False).encode("utf-8")))
+                await writer.drain()
+        finally:
+            if session is not None:
+                self.safe_command("end", session, {})
+
+    async def sweep(self):
+        """Периодически закрывает брошенные сессии"""
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            self.engine.expire(SESSION_TTL)
+
+    async def run(self, sock):
+        server = await asyncio.start_server(self.handle, sock=sock, backlog=1024)
+        sweeper = asyncio.ensure_future(self.sweep())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            sweeper.cancel()
+
+
+def run_worker(sock, index=0):
+    """Процесс-обработчик: свой движок и своя таблица сессий, id сессий с номером процесса"""
+    engine = Engine(load_scenario(SCENARIOS_FILE, SCENARIOS_CACHE), prefix=index)
+    try:
+        asyncio.run(ScenarioServer(engine).run(sock))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, workers=1):
+    """Слушает порт; при workers > 1 соединения принимают дочерние процессы с общим сокетом"""
+    if workers > 1 << PREFIX_BITS:
+        raise SystemExit(f"Не больше {1 << PREFIX_BITS} процессов")
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.setblocking(False)
+    if workers > 1 and not hasattr(os, "fork"):
+        print("Несколько процессов поддерживаются только на системах с fork, запускается один")
+        workers = 1
+    print(f"Сервер сценария: http://{host}:{sock.getsockname()[1]} (процессов: {workers})")
+    if workers <= 1:
+        run_worker(sock)
+        return
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=run_worker, args=(sock, i), name=f"scenario-worker-{i}", daemon=True)
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    # Остановка главного процесса (Ctrl+C или SIGTERM) завершает и обработчики
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            process.terminate()
+    finally:
+        sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер сценария для множества сессий")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="число процессов-обработчиков")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""Проверка номера телефона по коду из SMS.
+
+Запросы выполняются в отдельном потоке с циклом asyncio, результаты возвращаются
+в главный поток Tk через App.post. Бэкенд выбирается переменной VASYA_SMS_URL:
+если она задана - HTTP-сервис, иначе - локальная имитация в том же процессе.
+
+Локальный сервер-заглушка для проверки: python -m sms --serve [--port 8765]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+CODE_TTL = 300  # Сколько секунд действует код
+MAX_SENDS = 3  # Не больше MAX_SENDS отправок на номер за SEND_PERIOD секунд
+SEND_PERIOD = 600
+MIN_SEND_INTERVAL = 30  # Пауза между отправками на один номер
+REPEAT_WINDOW = 60  # Сколько секунд повторная проверка уже принятого кода тоже успешна
+
+
+class SmsError(Exception):
+    """Ошибка отправки или проверки кода; текст показывается пользователю"""
+
+
+class SendUncertain(SmsError):
+    """Запрос на отправку ушел, но ответа нет: код мог быть отправлен"""
+
+
+class VerifyUncertain(SmsError):
+    """Запрос на проверку ушел, но ответа нет: код мог быть уже принят"""
+
+
+class ConnectFailed(ConnectionError):
+    """Соединение не установлено - запрос точно не дошел до сервера, его можно повторить"""
+
+
+class RateLimiter:
+    """Ограничение частоты отправок кода на один номер"""
+    def __init__(self, max_requests=MAX_SENDS, period=SEND_PERIOD, min_interval=MIN_SEND_INTERVAL):
+        self.max_requests = max_requests
+        self.period = period
+        self.min_interval = min_interval
+        self.history = {}  # Номер -> времена последних отправок
+
+    def acquire(self, phone, now=None):
+        """Возвращает 0, если отправка разрешена (и учитывает ее), иначе сколько секунд ждать"""
+        now = time.monotonic() if now is None else now
+        sent = self.history.setdefault(phone, deque())
+        while sent and now - sent[0] >= self.period:
+            sent.popleft()
+        wait = 0.0
+        if sent and now - sent[-1] < self.min_interval:
+            wait = self.min_interval - (now - sent[-1])
+        if len(sent) >= self.max_requests:
+            wait = max(wait, self.period - (now - sent[0]))
+        if wait > 0:
+            return wait
+        sent.append(now)
+        return 0.0
+
+    def cancel(self, phone, stamp):
+        """Отменяет учтенную в момент stamp отправку (сервис ее не принял)"""
+        sent = self.history.get(phone)
+        if sent and stamp in sent:
+            sent.remove(stamp)
+
+
+class CodeRegistry:
+    """Выданные коды с временем жизни (общая логика имитации и сервера-заглушки)"""
+    def __init__(self, ttl=CODE_TTL):
+        self.ttl = ttl
+        self.codes = {}  # Номер -> (код, срок действия)
+        self.confirmed = {}  # Номер -> (принятый код, до какого времени его можно проверить повторно)
+        self.lock = threading.Lock()
+
+    def issue(self, phone):
+        code = f"{random.randint(0, 9999):04d}"
+        with self.lock:
+            self.codes[phone] = (code, time.monotonic() + self.ttl)
+            self.confirmed.pop(phone, None)
+        return code
+
+    def check(self, phone, code):
+        now = time.monotonic()
+        with self.lock:
+            # Повтор проверки, ответ на которую потерялся, не должен превращаться в "неверный код"
+            confirmed, until = self.confirmed.get(phone, (None, 0))
+            if confirmed is not None and code == confirmed and now <= until:
+                return True
+            expected, expires = self.codes.get(phone, (None, 0))
+            if expected is None or now > expires or code != expected:
+                return False
+            del self.codes[phone]
+            self.confirmed[phone] = (code, now + REPEAT_WINDOW)
+            return True
+
+
+class LocalSmsBackend:
+    """Имитация сервиса в процессе: код не отправляется, а возвращается для автоподстановки"""
+    def __init__(self):
+        self.registry = CodeRegistry()
+
+    async def send_code(self, phone):
+        return {"sent": True, "code": self.registry.issue(phone)}
+
+    async def verify(self, phone, code):
+        return self.registry.check(phone, code)
+
+    async def close(self):
+        pass
+
+
+class ConnectionPool:
+    """Пул постоянных (keep-alive) HTTP/1.1 соединений к одному серверу"""
+    def __init__(self, host, port, size=4, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle = []  # Свободные соединения (reader, writer)
+        self.slots = asyncio.Semaphore(size)
+
+    async def acquire(self):
+        """Берет живое свободное соединение или открывает новое"""
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        try:
+            return await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectFailed(f"Не удалось подключиться к {self.host}:{self.port}: {e}") from e
+
+    async def request(self, method, path, payload):
+        """Выполняет запрос с JSON-телом; возвращает (статус, тело)"""
+        async with self.slots:
+            reader, writer = await self.acquire()
+            try:
+                status, body, keep_alive = await asyncio.wait_for(
+                    self.exchange(reader, writer, method, path, payload), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, body
+
+    async def exchange(self, reader, writer, method, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: keep-alive\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Сервер закрыл соединение")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        data = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, data, headers.get("connection", "").lower() != "close"
+
+    async def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+class HttpSmsBackend:
+    """Клиент HTTP-сервиса кодов: таймауты и повтор с экспоненциальной задержкой.
+
+    /send и /verify не идемпотентны: повтор отправки мог бы выслать второе SMS, а повтор
+    проверки - наткнуться на уже использованный код. Поэтому они повторяются только при ошибке
+    соединения или ответе 5xx, а если запрос ушел без ответа, результат сообщается как неизвестный.
+    """
+    def __init__(self, url, retries=3, backoff=0.2, timeout=5.0, pool_size=4):
+        parts = urlsplit(url)
+        self.prefix = parts.path.rstrip("/")
+        self.pool = ConnectionPool(parts.hostname, parts.port or 80, pool_size, timeout)
+        self.retries = retries
+        self.backoff = backoff
+
+    async def call(self, path, payload, uncertain=None):
+        """uncertain - исключение для неидемпотентного запроса, ушедшего без ответа; None - повторять"""
+        delay = self.backoff
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                status, body = await self.pool.request("POST", self.prefix + path, payload)
+                if status == 429:
+                    raise SmsError("Слишком много запросов, попробуйте позже")
+                if status < 500:
+                    return status, json.loads(body or b"{}")
+                error = SmsError(f"Сервер ответил {status}")
+            except ConnectFailed as e:
+                error = e
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                if uncertain is not None:
+                    raise uncertain from e
+                error = e
+            if attempt < self.retries:
+                await asyncio.sleep(delay * random.uniform(1.0, 1.2))
+                delay *= 2
+        raise SmsError(f"Сервис SMS недоступен: {error}")
+
+    async def send_code(self, phone):
+        status, data = await self.call(
+            "/send", {"phone": phone},
+            uncertain=SendUncertain("Сервис SMS не ответил, код мог уже прийти - проверьте сообщения"))
+        if status != 200:
+            raise SmsError(data.get("error", f"Не удалось отправить код ({status})"))
+        return data
+
+    async def verify(self, phone, code):
+        status, data = await self.call(
+            "/verify", {"phone": phone, "code": code},
+            uncertain=VerifyUncertain("Сервис SMS не ответил, проверьте код еще раз"))
+        if status != 200:
+            raise SmsError(data.get("error", f"Не удалось проверить код ({status})"))
+        return bool(data.get("ok"))
+
+    async def close(self):
+        await self.pool.close()
+
+
+def create_backend():
+    """Выбирает бэкенд по переменной окружения VASYA_SMS_URL"""
+    url = os.environ.get("VASYA_SMS_URL")
+    return HttpSmsBackend(url) if url else LocalSmsBackend()
+
+
+class SmsVerifier:
+    """Выполняет запросы бэкенда в фоновом цикле asyncio и отдает результаты в главный поток"""
+    def __init__(self, backend, post, limiter=None):
+        self.backend = backend
+        self.post = post  # Потокобезопасная передача вызова в главный поток
+        self.limiter = limiter or RateLimiter()
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="sms-client", daemon=True)
+        self.thread.start()
+
+    def submit(self, coro, callback):
+        """Запускает корутину; callback(result, error) будет вызван в главном потоке"""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        def done(f):
+            try:
+                self.post(callback, f.result(), None)
+            except Exception as e:
+                self.post(callback, None, e)
+
+        future.add_done_callback(done)
+        return future
+
+    async def limited_send(self, phone):
+        now = time.monotonic()
+        wait = self.limiter.acquire(phone, now)
+        if wait:
+            raise SmsError(f"Повторная отправка через {int(wait) + 1} с")
+        try:
+            return await self.backend.send_code(phone)
+        except SendUncertain:
+            raise  # Код мог уйти - отправка остается учтенной
+        except Exception:
+            # Сервис отправку не принял: номер не блокируется на MIN_SEND_INTERVAL
+            self.limiter.cancel(phone, now)
+            raise
+
+    def send_code(self, phone, callback):
+        return self.submit(self.limited_send(phone), callback)
+
+    def verify(self, phone, code, callback):
+        return self.submit(self.backend.verify(phone, code), callback)
+
+    def close(self):
+        """Закрывает соединения и останавливает фоновый цикл"""
+        if self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.backend.close(), self.loop).result(timeout=1)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
+
+
+class MockSmsHandler(BaseHTTPRequestHandler):
+    """Сервер-заглушка: /send выдает код (и возвращает его в ответе), /verify проверяет"""
+    protocol_version = "HTTP/1.1"  # Поддержка keep-alive
+
+    def do_POST(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self.reply(400, {"error": "Некорректный JSON"})
+        if random.random() < server.fail_rate:
+            return self.reply(503, {"error": "Временная ошибка"})
+        phone = str(payload.get("phone", "")).strip()
+        if not phone:
+            return self.reply(400, {"error": "Не указан номер телефона"})
+        if self.path.endswith("/send"):
+            with server.lock:
+                wait = server.limiter.acquire(phone)
+            if wait:
+                return self.reply(429, {"error": "Слишком много запросов"})
+            return self.reply(200, {"sent": True, "code": server.registry.issue(phone)})
+        if self.path.endswith("/verify"):
+            return self.reply(200, {"ok": server.registry.check(phone, str(payload.get("code", "")))})
+        self.reply(404, {"error": "Неизвестный адрес"})
+
+    def reply(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_mock_server(host="127.0.0.1", port=8765, latency=0.0, fail_rate=0.0, quiet=False):
+    """Создает сервер-заглушку (port=0 - любой свободный порт)"""
+    server = ThreadingHTTPServer((host, port), MockSmsHandler)
+    server.daemon_threads = True
+    server.registry = CodeRegistry()
+    server.limiter = RateLimiter()
+    server.lock = threading.Lock()
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер-заглушка для проверки кодов из SMS")
+    parser.add_argument("--serve", action="store_true", help="запустить сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="доля ответов 503")
+    args = parser.parse_args(argv)
+    if not args.serve:
+        parser.print_help()
+        return
+    server = make_mock_server(args.host, args.port, args.latency, args.fail_rate)
+    print(f"Сервер-заглушка SMS: http://{args.host}:{server.server_port} (VASYA_SMS_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Сторожевой поток главного цикла: ловит зависания Tk и снимает стеки главного потока.
+
+Главный поток раз в HEARTBEAT_MS отмечается через after(). Если отметки нет дольше
+периода плюс порога, сторожевой поток раз в SAMPLE_INTERVAL снимает стек главного
+потока через sys._current_frames. Когда цикл оживает, зависание попадает в гистограмму
+длительностей, а стеки - в свернутом виде ("a;b;c число") для построения flame graph.
+
+Включение: VASYA_WATCHDOG=1 (порог в мс - VASYA_WATCHDOG_MS) или python main.py --watchdog
+Сводка по сохраненным отчетам: python -m stallwatch report [папка] [--folded stacks.folded]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "vasya", "stalls")
+HEARTBEAT_MS = 50
+DEFAULT_THRESHOLD = 0.1  # Насколько отметка может опоздать, прежде чем это считается зависанием, с
+SAMPLE_INTERVAL = 0.01
+MAX_DEPTH = 64
+HISTOGRAM_MS = (100, 250, 500, 1000, 2500, 5000)  # Верхние границы корзин; последняя - все, что дольше
+TOP_STALLS = 20
+
+
+def bucket_label(index):
+    if index < len(HISTOGRAM_MS):
+        return f"<{HISTOGRAM_MS[index]}ms"
+    return f">={HISTOGRAM_MS[-1]}ms"
+
+
+def collapse(frame):
+    """Стек от корня к листу в виде 'файл:функция;...'"""
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Watchdog:
+    """Отметки главного цикла и выборка стеков при зависаниях"""
+    def __init__(self, root, threshold=DEFAULT_THRESHOLD, heartbeat_ms=HEARTBEAT_MS,
+                 sample_interval=SAMPLE_INTERVAL):
+        self.root = root
+        self.threshold = threshold
+        self.heartbeat_ms = heartbeat_ms
+        self.sample_interval = sample_interval
+        self.main_ident = threading.get_ident()
+        self.last_beat = time.perf_counter()  # Пишет только главный поток
+        self.histogram = [0] * (len(HISTOGRAM_MS) + 1)
+        self.stacks = Counter()  # Свернутый стек -> число выборок за все зависания
+        self.stalls = []  # Самые долгие зависания: (длительность, начало, главный стек)
+        self.total_stalls = 0
+        self.started = time.time()
+        self.stop_event = threading.Event()
+        self.job = self.root.after(self.heartbeat_ms, self.beat)
+        self.thread = threading.Thread(target=self.watch, name="stall-watchdog", daemon=True)
+        self.thread.start()
+
+    def beat(self):
+        """Отметка главного потока; вызывается через after()"""
+        self.last_beat = time.perf_counter()
+        self.job = self.root.after(self.heartbeat_ms, self.beat)
+
+    def watch(self):
+        limit = self.heartbeat_ms / 1000 + self.threshold
+        stall_beat = None  # Отметка, после которой началось текущее зависание
+        samples = Counter()
+        while not self.stop_event.wait(self.sample_interval):
+            last_beat = self.last_beat
+            now = time.perf_counter()
+            if stall_beat is not None and last_beat != stall_beat:
+                # Цикл ожил: отметка пришла с опозданием на длительность зависания
+                self.record(self.stall_duration(stall_beat, last_beat), samples)
+                stall_beat = None
+                samples = Counter()
+            if now - last_beat <= limit:
+                continue
+            stall_beat = last_beat
+            frame = sys._current_frames().get(self.main_ident)
+            if frame is not None:
+                samples[collapse(frame)] += 1
+            del frame  # Не держим кадры главного потока дольше нужного
+        if stall_beat is not None:
+            # Остановка во время зависания: считаем, что цикл оживает сейчас
+            self.record(self.stall_duration(stall_beat, time.perf_counter()), samples)
+
+    def stall_duration(self, stall_beat, end):
+        """Длительность зависания: насколько следующая отметка опоздала относительно периода"""
+        return max(0.0, end - stall_beat - self.heartbeat_ms / 1000)
+
+    def record(self, duration, samples):
+        """Учитывает завершившееся зависание"""
+        milliseconds = duration * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_MS) if milliseconds < bound), len(HISTOGRAM_MS))
+        self.histogram[index] += 1
+        self.total_stalls += 1
+        self.stacks.update(samples)
+        top = samples.most_common(1)[0][0] if samples else ""
+        self.stalls.append((round(milliseconds, 1), round(time.time() - duration, 3), top))
+        self.stalls.sort(reverse=True)
+        del self.stalls[TOP_STALLS:]
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join(timeout=1)
+        if self.job:
+            try:
+                self.root.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
+
+    def report(self):
+        return {
+            "version": 1,
+            "started": self.started,
+            "threshold_ms": self.threshold * 1000,
+            "stalls": self.total_stalls,
+            "histogram": {bucket_label(i): count for i, count in enumerate(self.histogram)},
+            "longest": [{"ms": ms, "at": at, "stack": stack} for ms, at, stack in self.stalls],
+            "stacks": dict(self.stacks),
+        }
+
+    def save(self, directory=DEFAULT_DIR):
+        """Пишет отчет (JSON) и свернутые стеки (.folded для flamegraph.pl / speedscope)"""
+        if not self.total_stalls:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"stalls-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=1)
+        write_folded(base + ".folded", self.stacks)
+        return base + ".json"
+
+    def summary(self):
+        parts = ", ".join(f"{bucket_label(i)}: {count}" for i, count in enumerate(self.histogram) if count)
+        return f"Зависаний главного цикла: {self.total_stalls}" + (f" ({parts})" if parts else "")
+
+
+def write_folded(path, stacks):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def merge_reports(directory):
+    """Складывает все отчеты из папки"""
+    histogram = Counter()
+    stacks = Counter()
+    longest = []
+    total = 0
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename), encoding="utf-8") as f:
+                report = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Пропущен отчет {filename}: {str(e)}")
+            continue
+        total += report["stalls"]
+        histogram.update(report["histogram"])
+        stacks.update(report["stacks"])
+        longest.extend(report["longest"])
+    longest.sort(key=lambda stall: -stall["ms"])
+    return total, histogram, stacks, longest[:TOP_STALLS]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчеты о зависаниях главного цикла")
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="гистограмма, самые долгие зависания и горячие стеки")
+    report.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    report.add_argument("--folded", help="записать объединенные свернутые стеки в файл")
+    args = parser.parse_args(argv)
+    total, histogram, stacks, longest = merge_reports(args.directory)
+    print(f"Зависаний: {total}")
+    for i in range(len(HISTOGRAM_MS) + 1):
+        label = bucket_label(i)
+        print(f"  {label:>10}{histogram.get(label, 0):>8}")
+    print("\nСамые долгие:")
+    for stall in longest[:10]:
+        print(f"  {stall['ms']:>9.1f} мс  {stall['stack'].rsplit(';', 3)[-1] if stall['stack'] else '?'}")
+    print("\nГорячие стеки (выборок):")
+    for stack, count in stacks.most_common(10):
+        print(f"  {count:>6}  {';'.join(stack.split(';')[-4:])}")
+    if args.folded:
+        write_folded(args.folded, stacks)
+        print(f"\nСвернутые стеки: {args.folded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Телеметрия навигации: события фиксированного размера в кольцевом буфере и пакетная запись.
+
+Событие занимает 16 байт (время в нс, тип, экран, цель) и пишется в заранее выделенный
+bytearray без блокировок. Фоновый поток раз в FLUSH_INTERVAL сбрасывает новые события
+блоками в ротируемые файлы events-<сессия>-<номер>.bin.
+
+Формат файла: заголовок (MAGIC, версия, id сессии), затем блоки:
+    число новых имен (u16), число событий (u32), имена (id u16, длина u16, UTF-8), события.
+
+Сводка по воронке и времени на экранах: python -m telemetry stats [папка] [--funnel a,b,c]
+"""
+import argparse
+import os
+import random
+import struct
+import threading
+import time
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "vasya", "telemetry")
+MAGIC = b"VTEL"
+VERSION = 1
+FILE_HEADER = struct.Struct("<4sHQ")
+BLOCK_HEADER = struct.Struct("<HI")
+NAME_HEADER = struct.Struct("<HH")
+EVENT = struct.Struct("<QBxHHxx")  # Время (нс), тип, экран, цель - 16 байт
+
+RING_EVENTS = 65536  # Емкость кольцевого буфера (в событиях)
+FLUSH_INTERVAL = 1.0  # Период сброса буфера на диск, с
+MAX_FILE_BYTES = 4 * 1024 * 1024  # Размер файла, после которого начинается следующий
+MAX_FILES = 64  # Сколько файлов хранить; самые старые удаляются
+
+# Типы событий
+START = 0
+SHOW = 1  # Экран показан: экран - новый, цель - предыдущий
+CLICK = 2  # Нажатие кнопки: экран - текущий, цель - текст кнопки
+END = 3
+
+DEFAULT_FUNNEL = ("Registration", "log_in_to_the_app", "choose_a_situation",
+                  "Save_me_from_my_boss", "Chief_scam_1", "boss")
+
+
+class Telemetry:
+    """Кольцевой буфер событий и фоновый поток записи"""
+    def __init__(self, directory=DEFAULT_DIR, capacity=RING_EVENTS, flush_interval=FLUSH_INTERVAL,
+                 max_file_bytes=MAX_FILE_BYTES, max_files=MAX_FILES):
+        self.directory = directory
+        self.capacity = capacity
+        self.ring = bytearray(capacity * EVENT.size)
+        self.head = 0  # Сколько событий записано за все время (пишет только главный поток)
+        self.tail = 0  # Сколько событий уже сброшено на диск (меняет только поток записи)
+        self.dropped = 0
+        self.names = {"": 0}  # Имя -> id
+        self.name_list = [""]
+        self.session = random.getrandbits(63)
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.file = None
+        self.file_seq = 0
+        self.names_written = 0
+        self.stop_event = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+        self.flusher = threading.Thread(target=self.flush_loop, name="telemetry-flusher", daemon=True)
+        self.flusher.start()
+        self.record(START)
+
+    def intern(self, name):
+        """Возвращает числовой id имени экрана или кнопки"""
+        name_id = self.names.get(name)
+        if name_id is None:
+            name_id = len(self.name_list)
+            if name_id > 0xFFFF:
+                return 0
+            self.name_list.append(name)
+            self.names[name] = name_id
+        return name_id
+
+    def record(self, kind, screen=0, target=0):
+        """Горячий путь: одна упаковка в заранее выделенный буфер, без блокировок"""
+        head = self.head
+        EVENT.pack_into(self.ring, (head % self.capacity) * EVENT.size, time.time_ns(), kind, screen, target)
+        self.head = head + 1
+
+    def flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Сбрасывает накопившиеся события одним блоком"""
+        head = self.head
+        tail = self.tail
+        if head == tail:
+            return
+        if head - tail > self.capacity:
+            self.dropped += head - tail - self.capacity
+            tail = head - self.capacity
+        start = (tail % self.capacity) * EVENT.size
+        end = (head % self.capacity) * EVENT.size
+        if start < end:
+            events = bytes(self.ring[start:end])
+        else:
+            events = bytes(self.ring[start:]) + bytes(self.ring[:end])
+        # Пока копировали, главный поток мог переписать самые старые ячейки
+        overwritten = self.head - self.capacity - tail
+        if overwritten > 0:
+            self.dropped += overwritten
+            events = events[overwritten * EVENT.size:]
+        self.tail = head
+        try:
+            self.write_block(events)
+        except OSError as e:
+            print(f"Ошибка записи телеметрии: {str(e)}")
+
+    def write_block(self, events):
+        if self.file is None or self.file.tell() >= self.max_file_bytes:
+            self.rotate()
+        names = self.name_list[self.names_written:]
+        parts = [BLOCK_HEADER.pack(len(names), len(events) // EVENT.size)]
+        for offset, name in enumerate(names, self.names_written):
+            encoded = name.encode("utf-8")[:0xFFFF]
+            parts.append(NAME_HEADER.pack(offset, len(encoded)))
+            parts.append(encoded)
+        parts.append(events)
+        self.file.write(b"".join(parts))
+        self.file.flush()
+        self.names_written += len(names)
+
+    def rotate(self):
+        """Начинает новый файл и удаляет самые старые сверх MAX_FILES"""
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, f"events-{self.session:016x}-{self.file_seq:05d}.bin")
+        self.file_seq += 1
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, self.session))
+        self.names_written = 0  # Каждый файл самодостаточен: таблица имен пишется заново
+        files = sorted((entry for entry in os.scandir(self.directory) if entry.name.endswith(".bin")),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:-self.max_files]:
+            os.remove(entry.path)
+
+    def close(self):
+        """Записывает событие завершения и дожидается последнего сброса"""
+        self.record(END)
+        self.stop_event.set()
+        self.flusher.join(timeout=5)
+        if self.file is not None:
+            self.file.close()
+
+
+def read_file(path):
+    """Потоково читает файл: выдает (id сессии, имена, события блока)"""
+    with open(path, "rb") as f:
+        header = f.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            return
+        magic, version, session = FILE_HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: неизвестный формат")
+        names = {}
+        while True:
+            block = f.read(BLOCK_HEADER.size)
+            if len(block) < BLOCK_HEADER.size:
+                return
+            name_count, event_count = BLOCK_HEADER.unpack(block)
+            for _ in range(name_count):
+                name_id, length = NAME_HEADER.unpack(f.read(NAME_HEADER.size))
+                names[name_id] = f.read(length).decode("utf-8")
+            data = f.read(event_count * EVENT.size)
+            if len(data) < event_count * EVENT.size:
+                return  # Недописанный блок (процесс был прерван)
+            yield session, names, EVENT.iter_unpack(data)
+
+
+class Aggregator:
+    """Воронка и время на экранах за один потоковый проход; память зависит от числа сессий, не событий"""
+    def __init__(self, funnel=DEFAULT_FUNNEL):
+        self.funnel = tuple(funnel)
+        self.sessions = {}  # Сессия -> [шаг воронки, текущий экран, время показа]
+        self.dwell = {}  # Экран -> [сумма нс, число показов]
+        self.visits = {}
+        self.clicks = {}  # (экран, кнопка) -> число нажатий
+        self.events = 0
+
+    def add(self, session, names, events):
+        state = self.sessions.get(session)
+        if state is None:
+            state = self.sessions[session] = [0, None, 0]
+        funnel = self.funnel
+        for timestamp, kind, screen_id, target_id in events:
+            self.events += 1
+            if kind == SHOW:
+                screen = names.get(screen_id, "?")
+                self.close_visit(state, timestamp)
+                state[1], state[2] = screen, timestamp
+                self.visits[screen] = self.visits.get(screen, 0) + 1
+                if state[0] < len(funnel) and funnel[state[0]] == screen:
+                    state[0] += 1
+            elif kind == CLICK:
+                key = (names.get(screen_id, "?"), names.get(target_id, "?"))
+                self.clicks[key] = self.clicks.get(key, 0) + 1
+            elif kind == END:
+                self.close_visit(state, timestamp)
+                state[1] = None
+
+    def close_visit(self, state, timestamp):
+        if state[1] is None:
+            return
+        total = self.dwell.setdefault(state[1], [0, 0])
+        total[0] += timestamp - state[2]
+        total[1] += 1
+
+    def report(self):
+        lines = [f"Событий: {self.events}, сессий: {len(self.sessions)}", "", "Воронка:"]
+        for step, screen in enumerate(self.funnel):
+            reached = sum(1 for state in self.sessions.values() if state[0] > step)
+            share = reached / len(self.sessions) if self.sessions else 0
+            lines.append(f"  {step + 1}. {screen:<40}{reached:>10}{share:>8.1%}")
+        lines += ["", f"{'Экран':<40}{'Показов':>10}{'Среднее время, с':>18}"]
+        for screen, visits in sorted(self.visits.items(), key=lambda item: -item[1]):
+            total, count = self.dwell.get(screen, (0, 0))
+            average = total / count / 1e9 if count else 0.0
+            lines.append(f"{screen:<40}{visits:>10}{average:>18.1f}")
+        lines += ["", "Нажатия:"]
+        for (screen, button), count in sorted(self.clicks.items(), key=lambda item: -item[1])[:20]:
+            lines.append(f"  {screen} / {button}: {count}")
+        return "\n".join(lines)
+
+
+def aggregate(directory, funnel=DEFAULT_FUNNEL):
+    """Обходит все файлы телеметрии в папке"""
+    aggregator = Aggregator(funnel)
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".bin"):
+            continue
+        try:
+            for session, names, events in read_file(os.path.join(directory, filename)):
+                aggregator.add(session, names, events)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Пропущен файл {filename}: {str(e)}")
+    return aggregator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Анализ телеметрии навигации")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="воронка, время на экранах и нажатия")
+    stats.add_argument("directory", nargs="?", default=DEFAULT_DIR)
+    stats.add_argument("--funnel", default=",".join(DEFAULT_FUNNEL), help="шаги воронки через запятую")
+    args = parser.parse_args(argv)
+    print(aggregate(args.directory, args.funnel.split(",")).report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from auth import CLOCK_SKEW, SessionCache, b64decode, b64encode
+
+NOW = 1_700_000_000
+
+
+class SessionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = SessionCache(os.path.join(self.tmp.name, "vasya"), ttl=3600)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_token(self):
+        with open(self.cache.token_path, "rb") as f:
+            return f.read().decode("ascii")
+
+    def write_token(self, token):
+        with open(self.cache.token_path, "wb") as f:
+            f.write(token.encode("ascii"))
+
+    def test_round_trip(self):
+        self.cache.save("+79990000000", now=NOW)
+        self.assertEqual(self.cache.load(now=NOW + 10)["phone"], "+79990000000")
+        self.assertEqual(os.stat(self.cache.token_path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(self.cache.key_path).st_mode & 0o777, 0o600)
+
+    def test_expiry(self):
+        self.cache.save("+79990000000", now=NOW)
+        self.assertIsNotNone(self.cache.load(now=NOW + 3599))
+        self.assertIsNone(self.cache.load(now=NOW + 3600))
+        # Токен из будущего (часы переведены назад) принимается только в пределах CLOCK_SKEW
+        self.assertIsNotNone(self.cache.load(now=NOW - CLOCK_SKEW))
+        self.assertIsNone(self.cache.load(now=NOW - CLOCK_SKEW - 1))
+
+    def test_tampered_payload(self):
+        self.cache.save("+79990000000", now=NOW)
+        payload_text, _, signature = self.read_token().partition(".")
+        payload = b64decode(payload_text).replace(b"+79990000000", b"+79991111111")
+        self.write_token(f"{b64encode(payload)}.{signature}")
+        self.assertIsNone(self.cache.load(now=NOW))
+
+    def test_garbage_token(self):
+        self.cache.save("+79990000000", now=NOW)
+        self.write_token("not a token")
+        self.assertIsNone(self.cache.load(now=NOW))
+
+    def test_clear_rotates_key(self):
+        self.cache.save("+79990000000", now=NOW)
+        token = self.read_token()
+        self.cache.clear()
+        self.assertIsNone(self.cache.load(now=NOW))
+        self.cache.key(create=True)
+        self.write_token(token)
+        self.assertIsNone(self.cache.load(now=NOW))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import build_assets
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "images")
+        self.out = os.path.join(self.tmp.name, "assets")
+        os.mkdir(self.src)
+        for name, data in (("a.png", b"first"), ("b.png", b"second"), ("copy.png", b"first")):
+            with open(os.path.join(self.src, name), "wb") as f:
+                f.write(data)
+        # Без Pillow файлы копируются как есть - масштабирование здесь не проверяется
+        patcher = mock.patch.object(build_assets, "Image", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, out=None):
+        return build_assets.build(self.src, out or self.out, (400, 830))
+
+    def test_dedupes_and_removes_only_stale_outputs(self):
+        manifest = self.build()
+        self.assertEqual(len(manifest["files"]), 2)
+        self.assertEqual(manifest["aliases"]["a"], manifest["aliases"]["copy"])
+        stale = os.path.join(self.out, "0123456789abcdef@600x1245.png")
+        notes = os.path.join(self.out, "notes.txt")
+        for path in (stale, notes):
+            with open(path, "wb") as f:
+                f.write(b"x")
+        os.mkdir(os.path.join(self.out, "keep"))
+        self.build()
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(notes))
+        self.assertTrue(os.path.isdir(os.path.join(self.out, "keep")))
+        self.assertEqual(len(os.listdir(self.src)), 3)
+
+    def test_refuses_source_dir(self):
+        with self.assertRaises(ValueError):
+            self.build(self.src)
+        self.assertEqual(len(os.listdir(self.src)), 3)
+
+    def test_refuses_foreign_dir(self):
+        os.mkdir(self.out)
+        with open(os.path.join(self.out, "module.py"), "w") as f:
+            f.write("")
+        with self.assertRaises(ValueError):
+            self.build()
+        self.assertEqual(os.listdir(self.out), ["module.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from daemon import DaemonError, DaemonServer, check_private_dir, send_command
+
+
+class PrivateDirTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "run")
+        os.mkdir(self.path, 0o700)
+        os.chmod(self.path, 0o700)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_accepts_own_private_dir(self):
+        check_private_dir(self.path)
+
+    def test_rejects_open_mode(self):
+        os.chmod(self.path, 0o755)
+        with self.assertRaises(DaemonError):
+            check_private_dir(self.path)
+
+    def test_rejects_symlink(self):
+        link = os.path.join(self.tmp.name, "link")
+        os.symlink(self.path, link)
+        with self.assertRaises(DaemonError):
+            check_private_dir(link)
+
+
+class DaemonServerTest(unittest.TestCase):
+    def test_command_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "vasya.sock")
+            server = DaemonServer(lambda func: func(), lambda command: {"ok": True, "echo": command["cmd"]}, path)
+            try:
+                self.assertEqual(send_command({"cmd": "ping"}, path), {"ok": True, "echo": "ping"})
+                with self.assertRaises(DaemonError):
+                    DaemonServer(lambda func: func(), lambda command: {}, path)
+            finally:
+                server.close()
+            self.assertIsNone(send_command({"cmd": "ping"}, path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+
+from engine import Engine, EngineError, ForeignSession, SessionTable, UnknownSession
+from scenarios import compile_scenario, inflate
+
+SCENARIO = {
+    "styles": {"back": {"bg": "blue"}},
+    "screens": {
+        "home": {"widgets": [{"text": "Дальше", "go": "next"}, {"text": "Карта", "map": [55.7, 37.6, 12]}]},
+        "next": {"widgets": [{"text": "Назад", "style": "back", "go": "home"}]},
+        "map": {"links": ["home"]},
+    },
+}
+
+
+class EngineTest(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.engine = Engine(inflate(compile_scenario(SCENARIO)), clock=lambda: self.now[0])
+
+    def test_go_follows_edges_only(self):
+        session = self.engine.start()
+        self.assertEqual(self.engine.go(session, "next"), "next")
+        with self.assertRaises(EngineError):
+            self.engine.go(session, "map")
+        self.assertEqual(self.engine.view(session)["steps"], 1)
+
+    def test_press(self):
+        session = self.engine.start()
+        self.assertEqual(self.engine.press(session, 1), ("map", (55.7, 37.6, 12, None)))
+        self.assertEqual(self.engine.screen(session), "map")
+        with self.assertRaises(EngineError):
+            self.engine.press(session, 5)
+
+    def test_released_slot_reuse_invalidates_old_id(self):
+        old = self.engine.start()
+        self.engine.end(old)
+        new = self.engine.start()
+        self.assertEqual(old[2:8], new[2:8])  # Та же ячейка
+        self.assertNotEqual(old, new)
+        with self.assertRaises(UnknownSession):
+            self.engine.screen(old)
+        self.assertEqual(self.engine.screen(new), "home")
+
+    def test_expire(self):
+        idle = self.engine.start()
+        self.now[0] = 100.0
+        active = self.engine.start()
+        self.assertEqual(self.engine.expire(50), 1)
+        with self.assertRaises(UnknownSession):
+            self.engine.screen(idle)
+        self.assertEqual(self.engine.screen(active), "home")
+
+
+class SessionTableTest(unittest.TestCase):
+    def test_grow_keeps_ids(self):
+        table = SessionTable(capacity=2)
+        ids = [table.create(0, 0.0) for _ in range(5)]
+        self.assertEqual(len(table.screens), 8)
+        self.assertEqual(sorted(table.slot(session) for session in ids), list(range(5)))
+
+    def test_ids_are_random_and_prefixed(self):
+        first = SessionTable(prefix=1)
+        second = SessionTable(prefix=2)
+        a, b = first.create(0, 0.0), second.create(0, 0.0)
+        self.assertEqual(a[2:8], b[2:8])
+        self.assertNotEqual(a[8:], b[8:])
+        with self.assertRaises(ForeignSession):
+            first.slot(b)
+
+    def test_guessed_token_rejected(self):
+        table = SessionTable()
+        session = table.create(0, 0.0)
+        forged = session[:8] + format(int(session[8:], 16) ^ 1, "016x")
+        for bad in (forged, "0", 12, "zz" * 12):
+            with self.assertRaises(UnknownSession):
+                table.slot(bad)
+
+
+if __name__ == "__main__":
+    unittest.main()
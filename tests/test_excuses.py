@@ -0,0 +1,115 @@
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from excuses import ExcuseLibrary, ExcusePicker, build_alias, open_library, write_index
+
+ENTRIES = [
+    ("Раз", ("u", "late"), 1.0),
+    ("Два", ("u", "late"), 3.0),
+    ("Три", ("u", "bar"), 1.0),
+    ("Четыре", ("bar",), 1.0),
+    ("Пять", ("late",), 2.0),
+]
+
+
+class ExcuseIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(self.tmp.name, "excuses.idx")
+        write_index(path, ENTRIES)
+        self.library = ExcuseLibrary(path)
+
+    def tearDown(self):
+        self.library.close()
+        self.tmp.cleanup()
+
+    def texts(self, tags):
+        return sorted(self.library.text(number) for number in self.library.query(tags).ids)
+
+    def test_round_trip_and_intersections(self):
+        self.assertEqual(self.library.size, 5)
+        self.assertEqual(self.texts(["u"]), ["Два", "Раз", "Три"])
+        self.assertEqual(self.texts(["u", "late"]), ["Два", "Раз"])
+        self.assertEqual(self.library.count(["u", "bar"]), 1)
+        self.assertEqual(self.library.count(["nope"]), 0)
+        self.assertEqual(self.library.query(["u", "nope"]).size, 0)
+        self.assertTrue(self.library.has_tags(0, ("u", "late", "short")))
+        self.assertFalse(self.library.has_tags(3, ("u",)))
+
+    def test_alias_sampling_follows_weights(self):
+        rng = random.Random(1)
+        selection = self.library.query(["u", "late"])
+        counts = {}
+        for _ in range(20000):
+            text = self.library.text(selection.pick(rng.random))
+            counts[text] = counts.get(text, 0) + 1
+        self.assertAlmostEqual(counts["Два"] / 20000, 0.75, delta=0.02)
+
+    def test_build_alias_total_probability(self):
+        weights = [1.0, 2.0, 3.0, 4.0]
+        prob, alias = build_alias(weights)
+        # Вероятность каждого элемента: своя доля колонки плюс доли колонок, где он псевдоним
+        share = [p / len(weights) for p in prob]
+        for column, target in enumerate(alias):
+            share[target] += (1 - prob[column]) / len(weights)
+        for value, weight in zip(share, weights):
+            self.assertAlmostEqual(value, weight / sum(weights))
+
+    def test_picker_never_repeats_last_entry(self):
+        picker = ExcusePicker(self.library, recent=4, rng=random.Random(3).random)
+        previous = None
+        for _ in range(200):
+            number = picker.pick(("u",))
+            self.assertNotEqual(number, previous)
+            previous = number
+
+    def test_unrelated_recent_entries_do_not_allow_repeats(self):
+        picker = ExcusePicker(self.library, recent=4, rng=random.Random(5).random)
+        for _ in range(3):
+            picker.pick(("bar",))
+        first = picker.pick(("u", "late"))
+        self.assertNotEqual(picker.pick(("u", "late")), first)
+
+
+class OpenLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "excuses.json")
+        with open(self.source, "w", encoding="utf-8") as f:
+            json.dump({"entries": [{"text": text, "tags": list(tags), "weight": weight}
+                                   for text, tags, weight in ENTRIES]}, f, ensure_ascii=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_builds_and_reuses_index(self):
+        index_path = os.path.join(self.tmp.name, "cache", "excuses.idx")
+        open_library(self.source, index_path).close()
+        built = os.stat(index_path).st_mtime_ns
+        library = open_library(self.source, index_path)
+        self.assertEqual(library.size, 5)
+        library.close()
+        self.assertEqual(os.stat(index_path).st_mtime_ns, built)
+
+    def test_unwritable_cache_falls_back_to_temporary_index(self):
+        # Папку кэша нельзя создать: на ее месте файл
+        blocker = os.path.join(self.tmp.name, "cache")
+        with open(blocker, "w") as f:
+            f.write("")
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            library = open_library(self.source, os.path.join(blocker, "excuses.idx"))
+        try:
+            self.assertEqual(library.size, 5)
+            self.assertEqual(library.text(library.query(["bar"]).ids[0]), "Три")
+        finally:
+            library.close()
+        self.assertIn("временный", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
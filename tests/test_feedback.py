@@ -0,0 +1,91 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from feedback import FeedbackStore, main
+
+
+class FeedbackStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "feedback.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self, **kwargs):
+        store = FeedbackStore(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_submit_flush_pages(self):
+        store = self.store(flush_interval=0.05)
+        for number in range(7):
+            store.submit(f"отзыв {number}", number % 5 + 1)
+        store.submit("без оценки")
+        store.flush()
+        pages = list(store.iter_pages(page_size=3))
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        rows = [row for page in pages for row in page]
+        self.assertEqual([row[3] for row in rows[:2]], ["отзыв 0", "отзыв 1"])
+        self.assertEqual(rows[-1][2:], (None, "без оценки"))
+        self.assertEqual([row[0] for row in rows], sorted(row[0] for row in rows))
+        self.assertEqual(store.count(), 8)
+        # Продолжение с известного id
+        self.assertEqual(len(list(store.iter_pages(page_size=100, after_id=rows[4][0]))[0]), 3)
+
+    def test_batching(self):
+        store = self.store(batch_size=4, flush_interval=1.0)
+        for number in range(10):
+            store.submit(str(number))
+        store.flush()
+        self.assertEqual(store.written, 10)
+        self.assertEqual(store.batches, 3)
+
+    def test_close_writes_queue(self):
+        store = FeedbackStore(self.path, flush_interval=5.0)
+        store.submit("последний")
+        store.close()
+        self.assertEqual(store.count(), 1)
+
+    def test_export(self):
+        store = self.store(flush_interval=0.05)
+        store.submit("Отлично", 5)
+        store.submit("Так себе", 3)
+        store.flush()
+        out_path = os.path.join(self.tmp.name, "out.jsonl")
+        self.assertEqual(store.export(out_path, page_size=1), 2)
+        with open(out_path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([(record["text"], record["rating"]) for record in records],
+                         [("Отлично", 5), ("Так себе", 3)])
+
+    def test_compact(self):
+        store = self.store(flush_interval=0.05)
+        store.submit("старый")
+        store.flush()
+        boundary = time.time()
+        time.sleep(0.01)
+        store.submit("новый")
+        store.flush()
+        self.assertEqual(store.compact(), 0)
+        self.assertEqual(store.compact(older_than=boundary), 1)
+        self.assertEqual([row[3] for page in store.iter_pages() for row in page], ["новый"])
+
+    def test_compact_zero_days_removes_everything(self):
+        store = self.store(flush_interval=0.05)
+        store.submit("отзыв")
+        store.flush()
+        time.sleep(0.01)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            main(["--db", self.path, "compact", "--older-than-days", "0"])
+        self.assertIn("Удалено отзывов: 1", output.getvalue())
+        self.assertEqual(store.count(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from i18n import Translator, catalog_path, locale_names, open_catalog
+from scenarios import compile_scenario
+
+
+class CatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source_dir = os.path.join(self.tmp.name, "locales")
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        os.mkdir(self.source_dir)
+        self.write("en", {"Назад": "Back", "Привет, {name}!": "Hi, {name}!", "Ёж": "Hedgehog"})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, locale, messages):
+        with open(os.path.join(self.source_dir, f"{locale}.json"), "w", encoding="utf-8") as f:
+            json.dump(messages, f, ensure_ascii=False)
+
+    def test_round_trip(self):
+        catalog = open_catalog("en", self.source_dir, self.cache_dir)
+        try:
+            self.assertEqual(catalog.lookup("Назад"), "Back")
+            self.assertEqual(catalog.lookup("Ёж"), "Hedgehog")
+            self.assertIsNone(catalog.lookup("Вперед"))
+        finally:
+            catalog.close()
+
+    def test_translator_formats_and_falls_back(self):
+        translator = Translator("en", self.source_dir, self.cache_dir)
+        try:
+            self.assertEqual(translator.gettext("Привет, {name}!", name="Вася"), "Hi, Вася!")
+            self.assertEqual(translator.gettext("Вперед"), "Вперед")
+            translator.switch("ru")
+            self.assertEqual(translator.gettext("Назад"), "Назад")
+            with self.assertRaises(KeyError):
+                translator.switch("de")
+        finally:
+            translator.close()
+
+    def test_rebuilds_stale_catalog(self):
+        open_catalog("en", self.source_dir, self.cache_dir).close()
+        built = os.stat(catalog_path("en", self.cache_dir)).st_mtime_ns
+        self.write("en", {"Назад": "Go back"})
+        os.utime(os.path.join(self.source_dir, "en.json"), ns=(built + 10**9, built + 10**9))
+        catalog = open_catalog("en", self.source_dir, self.cache_dir)
+        try:
+            self.assertEqual(catalog.lookup("Назад"), "Go back")
+            self.assertIsNone(catalog.lookup("Ёж"))
+        finally:
+            catalog.close()
+
+    def test_unwritable_cache_falls_back_to_temporary_catalog(self):
+        with open(self.cache_dir, "w") as f:
+            f.write("")
+        with contextlib.redirect_stdout(io.StringIO()):
+            translator = Translator("en", self.source_dir, self.cache_dir)
+            try:
+                self.assertEqual(translator.gettext("Назад"), "Back")
+            finally:
+                translator.close()
+
+    def test_locale_targets_are_checked(self):
+        locales = locale_names(self.source_dir)
+        self.assertEqual(locales, {"ru", "en"})
+        data = {"screens": {"main": {"widgets": [{"text": "EN", "locale": "en"}]}}}
+        compile_scenario(data, locales)
+        data["screens"]["main"]["widgets"][0]["locale"] = "de"
+        with self.assertRaises(ValueError):
+            compile_scenario(data, locales)
+
+
+if __name__ == "__main__":
+    unittest.main()
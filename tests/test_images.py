@@ -0,0 +1,61 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+
+from bundle import write_bundle
+from main import ImageStore, png_size
+
+
+def fake_png(width, height):
+    """Заголовок PNG с IHDR - достаточно для выбора кандидата, картинка не декодируется"""
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\0" * 16
+
+
+class ResolveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        files = {"base.png": (400, 830), "base@600.png": (600, 1245), "base@800.png": (800, 1660)}
+        for filename, size in files.items():
+            with open(os.path.join(self.dir, filename), "wb") as f:
+                f.write(fake_png(*size))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, store, source_of):
+        for window, expected in (((400, 830), "base.png"), ((600, 1245), "base@600.png"),
+                                 ((800, 1660), "base@800.png"), ((1600, 3320), "base@800.png")):
+            _, source, _ = store.resolve("Registration", window)
+            self.assertEqual(source_of(source), expected, window)
+
+    def test_manifest_prefers_base_file(self):
+        manifest = {"version": 1, "geometry": [400, 830], "aliases": {"Registration": "h"},
+                    "files": {"h": {"file": "base.png", "size": [400, 830],
+                                    "variants": {"600x1245": "base@600.png", "800x1660": "base@800.png"}}}}
+        path = os.path.join(self.dir, "manifest.json")
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        self.check(ImageStore(self.dir, manifest=path), os.path.basename)
+
+    def test_bundle_reads_base_size_from_png(self):
+        path = os.path.join(self.dir, "images.bundle")
+        write_bundle(path, [("Registration", os.path.join(self.dir, "base.png")),
+                            ("Registration@600x1245", os.path.join(self.dir, "base@600.png")),
+                            ("Registration@800x1660", os.path.join(self.dir, "base@800.png"))])
+        store = ImageStore(self.dir, bundle=path)
+        self.check(store, lambda source: {entry: name for name, entry in
+                                          (("base.png", store.bundle.entry("Registration")),
+                                           ("base@600.png", store.bundle.entry("Registration@600x1245")),
+                                           ("base@800.png", store.bundle.entry("Registration@800x1660")))}[source])
+        store.bundle.close()
+
+    def test_png_size(self):
+        self.assertEqual(png_size(fake_png(12, 34)), (12, 34))
+        self.assertIsNone(png_size(b"GIF89a" + b"\0" * 20))
+
+
+if __name__ == "__main__":
+    unittest.main()
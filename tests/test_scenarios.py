@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from scenarios import compile_scenario, inflate, load_scenario
+
+LOCALES = {"ru"}
+
+
+def scenario(*widgets, **extra):
+    data = {"screens": {"main": {"widgets": list(widgets), "links": ["other"]}, "other": {}}}
+    data.update(extra)
+    return data
+
+
+class CompileScenarioTest(unittest.TestCase):
+    def assertRejected(self, data):
+        with self.assertRaises(ValueError):
+            compile_scenario(data, LOCALES)
+
+    def test_compiles_links_and_targets(self):
+        data = scenario({"text": "Дальше", "go": "other"}, {"type": "label", "text": "Текст"})
+        compiled = inflate(compile_scenario(data, LOCALES))
+        self.assertEqual(compiled.start, "main")
+        button, label = compiled.screens["main"].widgets
+        self.assertEqual((button.action, button.target, button.style), ("go", "other", "primary"))
+        self.assertEqual(label.text, "Текст")
+
+    def test_rejects_unknown_style(self):
+        self.assertRejected(scenario({"text": "A", "style": "missing"}))
+
+    def test_rejects_button_colors(self):
+        self.assertRejected(scenario({"text": "A", "bg": "red"}))
+
+    def test_rejects_unknown_theme(self):
+        self.assertRejected(scenario({"text": "A", "theme": "missing"}))
+        data = scenario({"text": "A", "theme": "dark"}, themes={"dark": {"primary": {"bg": "black"}}})
+        compile_scenario(data, LOCALES)
+
+    def test_rejects_unknown_widget_type(self):
+        self.assertRejected(scenario({"type": "slider"}))
+
+    def test_rejects_unknown_link(self):
+        self.assertRejected(scenario({"text": "A", "go": "missing"}))
+
+    def test_rejects_unknown_start(self):
+        self.assertRejected(scenario(start="missing"))
+
+
+class LoadScenarioTest(unittest.TestCase):
+    def test_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scenarios.json")
+            cache_path = os.path.join(tmp, "cache", "scenarios.bin")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"screens": {"main": {"widgets": [{"text": "Привет"}]}}}')
+            first = load_scenario(path, cache_path, tmp)
+            self.assertTrue(os.path.exists(cache_path))
+            self.assertEqual(load_scenario(path, cache_path, tmp), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
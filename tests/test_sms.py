@@ -0,0 +1,127 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from sms import (CodeRegistry, HttpSmsBackend, RateLimiter, SendUncertain, SmsError, SmsVerifier, VerifyUncertain,
+                 make_mock_server)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_min_interval_and_period(self):
+        limiter = RateLimiter(max_requests=2, period=100, min_interval=10)
+        self.assertEqual(limiter.acquire("1", now=0), 0.0)
+        self.assertAlmostEqual(limiter.acquire("1", now=4), 6)
+        self.assertEqual(limiter.acquire("1", now=10), 0.0)
+        self.assertAlmostEqual(limiter.acquire("1", now=30), 70)
+        self.assertEqual(limiter.acquire("2", now=30), 0.0)
+        self.assertEqual(limiter.acquire("1", now=100), 0.0)
+
+    def test_cancel(self):
+        limiter = RateLimiter(min_interval=10)
+        limiter.acquire("1", now=5)
+        limiter.cancel("1", 5)
+        self.assertEqual(limiter.acquire("1", now=6), 0.0)
+
+
+class CodeRegistryTest(unittest.TestCase):
+    def test_repeated_check_of_accepted_code(self):
+        registry = CodeRegistry()
+        code = registry.issue("+7900")
+        self.assertFalse(registry.check("+7900", "bad"))
+        self.assertTrue(registry.check("+7900", code))
+        self.assertTrue(registry.check("+7900", code))
+        registry.issue("+7900")
+        self.assertFalse(registry.check("+7900", code))
+
+
+class MockServerTest(unittest.TestCase):
+    def start(self, **kwargs):
+        server = make_mock_server(port=0, quiet=True, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def backend(self, server, **kwargs):
+        backend = HttpSmsBackend(f"http://127.0.0.1:{server.server_port}", backoff=0.01, **kwargs)
+        backend.attempts = 0
+        request = backend.pool.request
+
+        async def counted(*args):
+            backend.attempts += 1
+            return await request(*args)
+
+        backend.pool.request = counted
+        return backend
+
+    def run_backend(self, backend, coro):
+        async def run():
+            try:
+                return await coro
+            finally:
+                await backend.close()
+        return asyncio.run(run())
+
+    def test_send_and_verify(self):
+        server = self.start()
+        backend = self.backend(server)
+
+        async def flow():
+            sent = await backend.send_code("+7900")
+            return await backend.verify("+7900", "bad"), await backend.verify("+7900", sent["code"])
+
+        self.assertEqual(self.run_backend(backend, flow()), (False, True))
+
+    def test_5xx_is_retried_then_fails(self):
+        server = self.start(fail_rate=1.0)
+        backend = self.backend(server, retries=2)
+        with self.assertRaisesRegex(SmsError, "недоступен"):
+            self.run_backend(backend, backend.verify("+7900", "0000"))
+        self.assertEqual(backend.attempts, 3)
+
+    def test_send_not_retried_after_request_went_out(self):
+        server = self.start(latency=0.5)
+        backend = self.backend(server, timeout=0.2)
+        with self.assertRaises(SendUncertain):
+            self.run_backend(backend, backend.send_code("+7900"))
+        self.assertEqual(backend.attempts, 1)
+        time.sleep(0.6)
+        self.assertEqual(len(server.limiter.history["+7900"]), 1)
+
+    def test_verify_not_retried_after_request_went_out(self):
+        server = self.start(latency=0.5)
+        code = server.registry.issue("+7900")
+        backend = self.backend(server, timeout=0.2)
+        with self.assertRaises(VerifyUncertain):
+            self.run_backend(backend, backend.verify("+7900", code))
+        self.assertEqual(backend.attempts, 1)
+        time.sleep(0.6)
+        # Код принят первым запросом; повтор пользователем тоже успешен
+        backend = self.backend(server)
+        self.assertTrue(self.run_backend(backend, backend.verify("+7900", code)))
+
+    def test_rejected_send_does_not_lock_phone(self):
+        server = self.start(fail_rate=1.0)
+        results = []
+        done = threading.Event()
+        verifier = SmsVerifier(self.backend(server, retries=0), lambda func, *args: func(*args))
+
+        def callback(result, error):
+            results.append(error)
+            done.set()
+
+        verifier.send_code("+7900", callback)
+        self.assertTrue(done.wait(5))
+        verifier.close()
+        self.assertIsInstance(results[0], SmsError)
+        self.assertEqual(verifier.limiter.acquire("+7900"), 0.0)
+
+    def test_connect_failure_is_retried(self):
+        backend = HttpSmsBackend("http://127.0.0.1:9", retries=2, backoff=0.01, timeout=1.0)
+        with self.assertRaisesRegex(SmsError, "недоступен"):
+            self.run_backend(backend, backend.send_code("+7900"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from collections import Counter
+
+from stallwatch import HISTOGRAM_MS, Watchdog, bucket_label, merge_reports
+
+
+class FakeRoot:
+    """Корень Tk без цикла событий: отметки в тестах ставятся вручную"""
+    def after(self, ms, func):
+        return "job"
+
+    def after_cancel(self, job):
+        pass
+
+
+class WatchdogTest(unittest.TestCase):
+    def watchdog(self, **kwargs):
+        watchdog = Watchdog(FakeRoot(), **kwargs)
+        self.addCleanup(watchdog.stop)
+        return watchdog
+
+    def test_record_buckets(self):
+        watchdog = self.watchdog(sample_interval=60)
+        for ms in (0, 99, 100, 300, 5000, 60000):
+            watchdog.record(ms / 1000, Counter())
+        self.assertEqual(watchdog.total_stalls, 6)
+        self.assertEqual(watchdog.histogram, [2, 1, 1, 0, 0, 0, 2])
+        self.assertEqual(len(watchdog.histogram), len(HISTOGRAM_MS) + 1)
+        self.assertEqual(watchdog.report()["histogram"][bucket_label(0)], 2)
+        self.assertEqual(watchdog.stalls[0][0], 60000.0)
+
+    def test_record_keeps_stacks_and_top_stack(self):
+        watchdog = self.watchdog(sample_interval=60)
+        watchdog.record(0.2, Counter({"main:a;main:b": 3, "main:a;main:c": 1}))
+        watchdog.record(0.3, Counter({"main:a;main:b": 2}))
+        self.assertEqual(watchdog.stacks["main:a;main:b"], 5)
+        self.assertEqual(watchdog.stalls[0][2], "main:a;main:b")
+
+    def test_recovery_and_stop_measure_the_same_way(self):
+        # Зависание, после которого цикл ожил
+        watchdog = self.watchdog(threshold=0.05, heartbeat_ms=10, sample_interval=0.005)
+        time.sleep(0.2)
+        watchdog.last_beat = time.perf_counter()
+        time.sleep(0.02)  # Меньше порога: новое зависание не успевает начаться
+        watchdog.stop()
+        self.assertEqual(watchdog.total_stalls, 1)
+        recovered = watchdog.stalls[0][0]
+
+        # Зависание, прерванное остановкой
+        watchdog = self.watchdog(threshold=0.05, heartbeat_ms=10, sample_interval=0.005)
+        time.sleep(0.2)
+        watchdog.stop()
+        self.assertEqual(watchdog.total_stalls, 1)
+        stopped = watchdog.stalls[0][0]
+        # Оба случая - время сверх периода отметки (~190 мс), без лишних heartbeat_ms
+        self.assertAlmostEqual(recovered, stopped, delta=40)
+        self.assertTrue(watchdog.stacks)
+
+
+class MergeReportsTest(unittest.TestCase):
+    def test_merge(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = Watchdog(FakeRoot(), sample_interval=60)
+            first.record(0.05, Counter({"a;b": 2}))
+            first.record(1.5, Counter({"a;c": 1}))
+            first.stop()
+            second = Watchdog(FakeRoot(), sample_interval=60)
+            second.record(0.06, Counter({"a;b": 4}))
+            second.stop()
+            for number, watchdog in enumerate((first, second)):
+                with open(os.path.join(directory, f"stalls-{number}.json"), "w", encoding="utf-8") as f:
+                    json.dump(watchdog.report(), f)
+            with open(os.path.join(directory, "broken.json"), "w") as f:
+                f.write("{")
+            total, histogram, stacks, longest = merge_reports(directory)
+        self.assertEqual(total, 3)
+        self.assertEqual(histogram[bucket_label(0)], 2)
+        self.assertEqual(histogram[bucket_label(4)], 1)
+        self.assertEqual(stacks, {"a;b": 6, "a;c": 1})
+        self.assertEqual([stall["ms"] for stall in longest], [1500.0, 60.0, 50.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from telemetry import CLICK, SHOW, Telemetry, aggregate, read_file
+
+
+class TelemetryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def telemetry(self, **kwargs):
+        # Фоновый поток не сбрасывает буфер сам: в тестах сброс только явный или при close()
+        return Telemetry(self.directory, flush_interval=3600, **kwargs)
+
+    def show(self, telemetry, screen, previous=""):
+        telemetry.record(SHOW, telemetry.intern(screen), telemetry.intern(previous))
+
+    def test_write_aggregate_round_trip(self):
+        telemetry = self.telemetry()
+        self.show(telemetry, "Registration")
+        telemetry.record(CLICK, telemetry.intern("Registration"), telemetry.intern("Войти"))
+        self.show(telemetry, "log_in_to_the_app", "Registration")
+        telemetry.close()
+        aggregator = aggregate(self.directory, funnel=("Registration", "log_in_to_the_app", "boss"))
+        self.assertEqual(aggregator.events, 5)  # START, 2 SHOW, CLICK, END
+        self.assertEqual(list(aggregator.sessions), [telemetry.session])
+        self.assertEqual(aggregator.sessions[telemetry.session][0], 2)
+        self.assertEqual(aggregator.visits, {"Registration": 1, "log_in_to_the_app": 1})
+        self.assertEqual(aggregator.clicks, {("Registration", "Войти"): 1})
+        self.assertEqual(aggregator.dwell["log_in_to_the_app"][1], 1)
+        self.assertIn("Воронка", aggregator.report())
+
+    def test_names_are_written_once_per_file(self):
+        telemetry = self.telemetry()
+        self.show(telemetry, "Registration")
+        telemetry.flush()
+        self.show(telemetry, "Registration")
+        telemetry.close()
+        (filename,) = os.listdir(self.directory)
+        blocks = list(read_file(os.path.join(self.directory, filename)))
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[-1][1][1], "Registration")
+
+    def test_ring_overflow_drops_oldest(self):
+        telemetry = self.telemetry(capacity=4)
+        for _ in range(10):
+            self.show(telemetry, "Registration")
+        telemetry.close()
+        self.assertEqual(telemetry.dropped, 8)  # 12 событий вместе со START и END
+        self.assertEqual(aggregate(self.directory).events, 4)
+
+    def test_rotation_keeps_newest_files(self):
+        telemetry = self.telemetry(max_file_bytes=1, max_files=2)
+        for _ in range(4):
+            self.show(telemetry, "Registration")
+            telemetry.flush()
+        telemetry.close()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        self.assertEqual(telemetry.file_seq, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
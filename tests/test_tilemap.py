@@ -0,0 +1,55 @@
+import contextlib
+import io
+import queue
+import tempfile
+import unittest
+
+from tilemap import RETRY_DELAY, DiskTileCache, TileStore
+
+KEY = (3, 1, 2)
+
+
+class BackoffTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = [0.0]
+        self.calls = queue.SimpleQueue()
+        # Порт 9 на localhost закрыт: каждая загрузка заканчивается ошибкой соединения
+        self.store = TileStore(lambda func, *args: self.calls.put((func, args)), "http://127.0.0.1:9/{z}/{x}/{y}.png",
+                               disk=DiskTileCache(self.tmp.name), workers=1, timeout=1.0,
+                               clock=lambda: self.now[0])
+        self.store.want([KEY])
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def load_once(self):
+        self.store.request(KEY)
+        func, args = self.calls.get(timeout=5)
+        func(*args)
+
+    def test_failed_tile_is_not_requested_again_until_delay(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.load_once()
+            self.store.request(KEY)
+            self.assertEqual(self.store.misses, 1)
+            self.assertNotIn(KEY, self.store.inflight)
+            self.now[0] = RETRY_DELAY + 0.1
+            self.load_once()
+        self.assertEqual(self.store.misses, 2)
+        self.assertEqual(self.store.failed[KEY][0], 2)
+        self.assertAlmostEqual(self.store.failed[KEY][1], self.now[0] + 2 * RETRY_DELAY)
+        self.assertEqual(output.getvalue().count("Ошибка загрузки тайла"), 1)
+
+    def test_without_url_only_disk_is_used(self):
+        store = TileStore(lambda func, *args: self.calls.put((func, args)), disk=DiskTileCache(self.tmp.name))
+        store.url_template = None
+        store.want([KEY])
+        self.assertIsNone(store.load(KEY))
+        store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import contextlib
+import io
+import queue
+import unittest
+from types import SimpleNamespace
+
+from main import App
+
+
+class PollUiQueueTest(unittest.TestCase):
+    def test_failing_callback_does_not_stop_polling(self):
+        calls = []
+        scheduled = []
+        app = SimpleNamespace(ui_queue=queue.Queue(), after=lambda ms, func: scheduled.append(func))
+        app.poll_ui_queue = lambda: App.poll_ui_queue(app)
+
+        def broken():
+            raise RuntimeError("сломался")
+
+        app.ui_queue.put((broken, ()))
+        app.ui_queue.put((calls.append, ("дошло",)))
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            App.poll_ui_queue(app)
+        self.assertEqual(calls, ["дошло"])
+        self.assertIn("сломался", output.getvalue())
+        self.assertEqual(len(scheduled), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
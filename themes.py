@@ -0,0 +1,57 @@
+"""Темы оформления кнопок: неизменяемые интернированные стили и переключение темы.
+
+Кнопка хранит ссылку на один объект Style вместо собственных копий цветов, радиуса
+и шрифта; одинаковые стили - один и тот же объект. Смена темы сводится к замене
+ссылок: новый стиль вычисляется один раз на каждый старый, а не на каждую кнопку.
+"""
+from scenarios import DEFAULT_COLORS, DEFAULT_FONT, DEFAULT_RADIUS, DEFAULT_THEME
+
+COLOR_FIELDS = ("bg", "fg", "active_bg", "active_fg")
+
+
+class Style:
+    """Стиль кнопки: роль (primary, danger, back...), цвета, радиус и шрифт"""
+    __slots__ = ("role", "bg", "fg", "active_bg", "active_fg", "radius", "font")
+    interned = {}  # Поля -> единственный объект с такими полями
+
+    def __new__(cls, role, bg, fg, active_bg, active_fg, radius=DEFAULT_RADIUS, font=DEFAULT_FONT):
+        key = (role, bg, fg, active_bg, active_fg, radius, tuple(font))
+        style = cls.interned.get(key)
+        if style is None:
+            style = object.__new__(cls)
+            for name, value in zip(cls.__slots__, key):
+                object.__setattr__(style, name, value)
+            cls.interned[key] = style
+        return style
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Стиль неизменяем")
+
+    def __repr__(self):
+        return f"Style({self.role!r}, {self.bg!r}, {self.fg!r}, radius={self.radius})"
+
+
+class ThemeSet:
+    """Таблицы цветов всех тем и текущая тема"""
+    def __init__(self, themes, name=DEFAULT_THEME):
+        self.themes = themes  # Имя темы -> {роль: (bg, fg, active_bg, active_fg)}
+        self.name = name if name in themes else DEFAULT_THEME
+
+    def names(self):
+        return tuple(self.themes)
+
+    def style(self, role="primary", radius=DEFAULT_RADIUS, font=DEFAULT_FONT):
+        """Стиль роли в текущей теме"""
+        colors = self.themes[self.name].get(role)
+        if colors is None:
+            colors = tuple(DEFAULT_COLORS[field] for field in COLOR_FIELDS)
+        return Style(role, *colors, radius, font)
+
+    def restyle(self, style):
+        """Тот же стиль (роль, радиус, шрифт) в цветах текущей темы"""
+        return self.style(style.role, style.radius, style.font)
+
+    def switch(self, name):
+        if name not in self.themes:
+            raise KeyError(f"Неизвестная тема {name}")
+        self.name = name
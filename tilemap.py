@@ -0,0 +1,384 @@
+"""Встроенный просмотр карты из растровых тайлов вместо запуска браузера.
+
+Тайлы берутся по шаблону адреса VASYA_TILE_URL и кэшируются на двух уровнях: PhotoImage
+в памяти (LRU) и файлы на диске z/x/y.png со сроком годности.
+Загрузка идет в пуле потоков, PhotoImage создаются только в главном потоке Tk. Тайл, который
+не удалось загрузить, повторно запрашивается не раньше, чем через растущую паузу.
+Без VASYA_TILE_URL встроенная карта не используется: кнопки карты открывают браузер.
+
+Сервер-заглушка тайлов для проверки: python -m tilemap --serve [--port 8766],
+затем VASYA_TILE_URL=http://127.0.0.1:8766/{z}/{x}/{y}.png
+"""
+import argparse
+import math
+import os
+import struct
+import threading
+import time
+import urllib.request
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from tkinter import Canvas, PhotoImage
+
+TILE_SIZE = 256
+MIN_ZOOM = 0
+MAX_ZOOM = 19
+MAX_LATITUDE = 85.0511
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vasya", "tiles")
+DISK_MAX_AGE = 7 * 24 * 3600  # Сколько секунд тайл на диске считается свежим
+MEMORY_TILES = 128  # Сколько декодированных тайлов держать в памяти
+PREFETCH_MARGIN = 1  # Сколько рядов тайлов вокруг видимой области загружать впрок
+RETRY_DELAY = 5.0  # Пауза перед повторной загрузкой тайла после первой ошибки, с
+MAX_RETRY_DELAY = 300.0  # Пауза удваивается с каждой ошибкой до этого предела
+
+
+def tile_url():
+    """Шаблон адреса тайлов из VASYA_TILE_URL или None, если источник тайлов не настроен"""
+    return os.environ.get("VASYA_TILE_URL") or None
+
+
+def latlon_to_pixels(lat, lon, zoom):
+    """Переводит широту и долготу в пиксели мировой карты (проекция Меркатора)"""
+    size = TILE_SIZE * 2 ** zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0 * size
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * size
+    return x, y
+
+
+def pixels_to_latlon(x, y, zoom):
+    """Обратное преобразование к latlon_to_pixels"""
+    size = TILE_SIZE * 2 ** zoom
+    lon = x / size * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / size))))
+    return lat, lon
+
+
+class DiskTileCache:
+    """Тайлы на диске в папках z/x/y.png; устаревшие считаются отсутствующими"""
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_age=DISK_MAX_AGE):
+        self.directory = directory
+        self.max_age = max_age
+
+    def path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), f"{y}.png")
+
+    def get(self, z, x, y):
+        path = self.path(z, x, y)
+        try:
+            if time.time() - os.stat(path).st_mtime > self.max_age:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, z, x, y, data):
+        path = self.path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class TileStore:
+    """Двухуровневый кэш тайлов с параллельной загрузкой"""
+    def __init__(self, post, url_template=None, disk=None, memory_tiles=MEMORY_TILES, workers=4, timeout=5.0,
+                 clock=time.monotonic):
+        self.post = post  # Потокобезопасная передача вызова в главный поток
+        self.url_template = url_template or tile_url()  # None - только тайлы с диска
+        self.clock = clock
+        self.disk = disk or DiskTileCache()
+        self.memory_tiles = memory_tiles
+        self.timeout = timeout
+        self.memory = OrderedDict()  # (z, x, y) -> PhotoImage, от давно нужных к недавним
+        self.inflight = set()
+        self.failed = {}  # (z, x, y) -> (число ошибок подряд, время, раньше которого не повторять)
+        self.wanted = frozenset()  # Тайлы, нужные текущему виду; остальные заявки пропускаются
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tile")
+        self.on_ready = None  # Вызывается в главном потоке с ключом готового тайла
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.errors = 0
+
+    def get(self, key):
+        """Возвращает тайл из памяти или None"""
+        img = self.memory.get(key)
+        if img is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+        return img
+
+    def want(self, keys):
+        """Запоминает набор тайлов, нужных текущему виду"""
+        self.wanted = frozenset(keys)
+
+    def request(self, key):
+        """Ставит тайл в очередь загрузки, если его нет в памяти и он еще не грузится"""
+        if key in self.memory or key in self.inflight:
+            return
+        failure = self.failed.get(key)
+        if failure is not None and self.clock() < failure[1]:
+            return
+        self.misses += 1
+        self.inflight.add(key)
+        future = self.executor.submit(self.load, key)
+        future.add_done_callback(lambda f, key=key: self.post(self.finish, key, f))
+
+    def load(self, key):
+        """Рабочий поток: диск, затем сеть; устаревшие заявки пропускаются"""
+        if key not in self.wanted:
+            return None
+        z, x, y = key
+        data = self.disk.get(z, x, y)
+        if data is not None:
+            self.disk_hits += 1
+            return data
+        if self.url_template is None:
+            return None  # Только диск: экран карты без источника тайлов не показывается
+        url = self.url_template.format(z=z, x=x, y=y)
+        request = urllib.request.Request(url, headers={"User-Agent": "vasya-tiles/1.0"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            data = response.read()
+        self.disk.put(z, x, y, data)
+        return data
+
+    def finish(self, key, future):
+        """Главный поток: декодирует тайл и кладет его в память"""
+        self.inflight.discard(key)
+        try:
+            data = future.result()
+        except Exception as e:
+            self.fail(key, f"Ошибка загрузки тайла {key}: {str(e)}")
+            return
+        if data is None:
+            return
+        try:
+            self.memory[key] = PhotoImage(data=data)
+        except Exception as e:
+            self.fail(key, f"Ошибка декодирования тайла {key}: {str(e)}")
+            return
+        self.failed.pop(key, None)
+        while len(self.memory) > self.memory_tiles:
+            self.memory.popitem(last=False)
+        if self.on_ready:
+            self.on_ready(key)
+
+    def fail(self, key, message):
+        """Откладывает повтор тайла; сообщение печатается только для первой ошибки подряд"""
+        self.errors += 1
+        count = self.failed.get(key, (0, 0.0))[0] + 1
+        delay = min(MAX_RETRY_DELAY, RETRY_DELAY * 2 ** (count - 1))
+        self.failed[key] = (count, self.clock() + delay)
+        if count == 1:
+            print(message)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "disk_hits": self.disk_hits,
+                "errors": self.errors, "in_memory": len(self.memory),
+                "backed_off": len(self.failed)}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MapView(Canvas):
+    """Карта на Canvas: перетаскивание мышью и масштаб колесом, без ожидания загрузки"""
+    def __init__(self, master, store, lat=59.938784, lon=30.314997, zoom=11, **kwargs):
+        super().__init__(master, highlightthickness=0, bg="#e8e4d8", **kwargs)
+        self.store = store
+        store.on_ready = self.on_tile_ready
+        self.zoom = zoom
+        self.center = latlon_to_pixels(lat, lon, zoom)
+        self.items = {}  # (z, x, y) -> элемент Canvas
+        self.visible = set()
+        self.drag_from = None
+        self.redraw_job = None
+        self.bind("<ButtonPress-1>", self._on_press)
+        self.bind("<B1-Motion>", self._on_motion)
+        self.bind("<ButtonRelease-1>", self._on_release)
+        self.bind("<MouseWheel>", self._on_wheel)
+        self.bind("<Button-4>", lambda event: self.zoom_by(1, event.x, event.y))
+        self.bind("<Button-5>", lambda event: self.zoom_by(-1, event.x, event.y))
+        self.bind("<Configure>", lambda event: self.schedule_redraw())
+
+    def set_view(self, lat, lon, zoom):
+        """Перемещает карту к точке с заданным масштабом"""
+        self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        self.center = latlon_to_pixels(lat, lon, self.zoom)
+        self.clear_tiles()
+        self.schedule_redraw()
+
+    def clear_tiles(self):
+        self.delete("tile")
+        self.items.clear()
+
+    def origin(self):
+        """Мировые координаты левого верхнего угла видимой области"""
+        return self.center[0] - self.winfo_width() / 2, self.center[1] - self.winfo_height() / 2
+
+    def tile_range(self, margin=0):
+        """Тайлы, покрывающие видимую область (с запасом margin по краям)"""
+        left, top = self.origin()
+        count = 2 ** self.zoom
+        x0 = max(0, int(left // TILE_SIZE) - margin)
+        y0 = max(0, int(top // TILE_SIZE) - margin)
+        x1 = min(count - 1, int((left + self.winfo_width()) // TILE_SIZE) + margin)
+        y1 = min(count - 1, int((top + self.winfo_height()) // TILE_SIZE) + margin)
+        return {(self.zoom, x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)}
+
+    def schedule_redraw(self):
+        """Объединяет частые события (перетаскивание, resize) в одну перерисовку"""
+        if self.redraw_job is None:
+            self.redraw_job = self.after_idle(self.redraw)
+
+    def redraw(self):
+        """Размещает готовые тайлы, заказывает недостающие и соседние"""
+        self.redraw_job = None
+        self.visible = self.tile_range()
+        nearby = self.tile_range(PREFETCH_MARGIN)
+        self.store.want(nearby)
+        for key in list(self.items):
+            if key not in self.visible:
+                self.delete(self.items.pop(key))
+        # Сначала видимые тайлы, затем соседние - пул берет заявки по порядку
+        for key in sorted(self.visible, key=self.distance):
+            if key in self.items:
+                continue
+            img = self.store.get(key)
+            if img is not None:
+                self.place_tile(key, img)
+            else:
+                self.store.request(key)
+        for key in sorted(nearby - self.visible, key=self.distance):
+            self.store.request(key)
+
+    def distance(self, key):
+        """Расстояние от центра экрана до центра тайла (для порядка загрузки)"""
+        _, x, y = key
+        return abs((x + 0.5) * TILE_SIZE - self.center[0]) + abs((y + 0.5) * TILE_SIZE - self.center[1])
+
+    def place_tile(self, key, img):
+        left, top = self.origin()
+        _, x, y = key
+        self.items[key] = self.create_image(x * TILE_SIZE - left, y * TILE_SIZE - top,
+                                            image=img, anchor="nw", tags="tile")
+
+    def on_tile_ready(self, key):
+        """Тайл загружен: показываем, если он все еще в видимой области"""
+        if not self.winfo_exists() or key not in self.visible or key in self.items:
+            return
+        img = self.store.get(key)
+        if img is not None:
+            self.place_tile(key, img)
+
+    def zoom_by(self, delta, x=None, y=None):
+        """Меняет масштаб, сохраняя точку под курсором на месте"""
+        zoom = max(MIN_ZOOM, min(MAX_ZOOM, self.zoom + delta))
+        if zoom == self.zoom:
+            return
+        if x is None:
+            x, y = self.winfo_width() / 2, self.winfo_height() / 2
+        left, top = self.origin()
+        factor = 2 ** (zoom - self.zoom)
+        anchor_x, anchor_y = (left + x) * factor, (top + y) * factor
+        self.center = (anchor_x - x + self.winfo_width() / 2, anchor_y - y + self.winfo_height() / 2)
+        self.zoom = zoom
+        self.clear_tiles()
+        self.schedule_redraw()
+
+    def _on_press(self, event):
+        self.drag_from = (event.x, event.y)
+
+    def _on_motion(self, event):
+        if self.drag_from is None:
+            return
+        dx, dy = event.x - self.drag_from[0], event.y - self.drag_from[1]
+        self.drag_from = (event.x, event.y)
+        # Сдвигаем уже нарисованные тайлы, новые догрузятся при перерисовке
+        self.move("tile", dx, dy)
+        self.center = (self.center[0] - dx, self.center[1] - dy)
+        self.schedule_redraw()
+
+    def _on_release(self, event):
+        self.drag_from = None
+
+    def _on_wheel(self, event):
+        self.zoom_by(1 if event.delta > 0 else -1, event.x, event.y)
+
+
+def make_png(width, height, rows):
+    """Собирает RGB PNG из готовых строк пикселей (по width * 3 байта)"""
+    raw = b"".join(b"\0" + row for row in rows)
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw, 6))
+            + chunk(b"IEND", b""))
+
+
+def render_stub_tile(z, x, y):
+    """Тайл-заглушка: цвет зависит от координат, по краям - сетка"""
+    base = bytes(((x * 67 + y * 131 + z * 29) % 80 + 150, (x * 23 + z * 11) % 60 + 180, (y * 41 + z * 7) % 60 + 170))
+    grid = bytes((120, 120, 120))
+    edge = grid * TILE_SIZE
+    row = grid + base * (TILE_SIZE - 1)
+    return make_png(TILE_SIZE, TILE_SIZE, [edge] + [row] * (TILE_SIZE - 1))
+
+
+class StubTileHandler(BaseHTTPRequestHandler):
+    """Отдает тайлы-заглушки по адресам /z/x/y.png"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        parts = self.path.strip("/").removesuffix(".png").split("/")
+        try:
+            z, x, y = (int(part) for part in parts[-3:])
+        except ValueError:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = render_stub_tile(z, x, y)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "max-age=604800")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер-заглушка растровых тайлов")
+    parser.add_argument("--serve", action="store_true", help="запустить сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    args = parser.parse_args(argv)
+    if not args.serve:
+        parser.print_help()
+        return
+    server = ThreadingHTTPServer((args.host, args.port), StubTileHandler)
+    server.daemon_threads = True
+    server.latency = args.latency
+    print(f"Сервер тайлов: http://{args.host}:{server.server_port}/{{z}}/{{x}}/{{y}}.png (VASYA_TILE_URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
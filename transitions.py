@@ -0,0 +1,118 @@
+"""Анимированная смена экранов: сдвиг и затухание по таймеру after() с бюджетом на кадр.
+
+Новый экран строится и размещается за пределами окна заранее, затем анимация двигает
+оба экрана. Положение вычисляется по прошедшему времени, поэтому при нагрузке
+промежуточные кадры пропускаются (и учитываются в dropped), а длительность не растягивается.
+Повторный переход во время анимации сразу доводит текущую до конца.
+
+Стиль выбирается переменной VASYA_TRANSITION: slide, fade или none (по умолчанию).
+"""
+import time
+
+from tkinter import TclError
+
+FRAME_BUDGET = 0.016  # Целевая длительность кадра, с
+DURATIONS = {"slide": 0.22, "fade": 0.18}
+FADE_MIN_ALPHA = 0.2
+STYLES = ("slide", "fade")
+
+
+def ease_out(progress):
+    """Плавное замедление к концу анимации"""
+    return 1 - (1 - progress) ** 3
+
+
+class Transition:
+    """Одна анимация смены экрана old -> new"""
+    def __init__(self, root, old, new, style="slide", duration=None, budget=FRAME_BUDGET, on_done=None):
+        self.root = root
+        self.old = old
+        self.new = new
+        self.style = style
+        self.duration = duration or DURATIONS[style]
+        self.budget = budget
+        self.on_done = on_done
+        self.job = None
+        self.started = 0.0
+        self.slot = 0  # Номер последнего отрисованного слота бюджета
+        self.frames = 0
+        self.dropped = 0
+        self.interrupted = False
+        self.done = False
+        self.swapped = False  # Для затухания: новый экран уже подставлен
+
+    def start(self):
+        """Размещает новый экран вне окна и запускает анимацию"""
+        if self.style == "slide":
+            self.old.place(x=0, y=0, relx=0, relwidth=1, relheight=1)
+            self.new.place(x=0, y=0, relx=1, relwidth=1, relheight=1)
+        self.root.update_idletasks()  # Геометрия нового экрана считается до первого кадра
+        self.started = time.perf_counter()
+        self.job = self.root.after(1, self.tick)
+        return self
+
+    def tick(self):
+        """Кадр анимации; следующий планируется на ближайшую непрошедшую границу бюджета"""
+        self.job = None
+        now = time.perf_counter()
+        progress = min(1.0, (now - self.started) / self.duration)
+        if not self.draw(progress):
+            self.finish(interrupted=True)
+            return
+        self.frames += 1
+        if progress >= 1.0:
+            self.finish()
+            return
+        elapsed = time.perf_counter() - self.started
+        slot = int(elapsed / self.budget) + 1
+        self.dropped += max(0, slot - self.slot - 1)
+        self.slot = slot
+        delay = self.started + slot * self.budget - time.perf_counter()
+        self.job = self.root.after(max(1, int(delay * 1000)), self.tick)
+
+    def draw(self, progress):
+        """Отрисовывает состояние анимации; False, если экраны уже уничтожены"""
+        if not (self.new.winfo_exists() and self.old.winfo_exists()):
+            return False
+        eased = ease_out(progress)
+        if self.style == "slide":
+            self.old.place_configure(relx=-eased)
+            self.new.place_configure(relx=1 - eased)
+            return True
+        if progress >= 0.5 and not self.swapped:
+            self.old.pack_forget()
+            self.new.pack(fill="both", expand=True)
+            self.swapped = True
+        depth = 1 - abs(1 - 2 * progress)  # 0 -> 1 -> 0
+        self.set_alpha(1 - (1 - FADE_MIN_ALPHA) * depth)
+        return True
+
+    def set_alpha(self, alpha):
+        try:
+            self.root.attributes("-alpha", alpha)
+        except TclError:
+            pass  # Оконный менеджер без поддержки прозрачности: затухание сводится к смене экрана
+
+    def finish(self, interrupted=False):
+        """Доводит анимацию до конечного состояния (в том числе при прерывании)"""
+        if self.done:
+            return
+        self.done = True
+        self.interrupted = interrupted
+        if self.job:
+            self.root.after_cancel(self.job)
+            self.job = None
+        if self.old.winfo_exists():
+            self.old.place_forget()
+            self.old.pack_forget()
+        if self.new.winfo_exists():
+            self.new.place_forget()
+            self.new.pack(fill="both", expand=True)
+        if self.style == "fade":
+            self.set_alpha(1.0)
+        if self.on_done:
+            self.on_done(self)
+
+    def stats(self):
+        return {"style": self.style, "frames": self.frames, "dropped": self.dropped,
+                "interrupted": self.interrupted}